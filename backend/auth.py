@@ -1,31 +1,98 @@
 
 import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from fastapi import HTTPException, Security, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from firebase_admin import auth, credentials, initialize_app
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize Firebase Admin SDK
-# Note: In production, you would use a service account credential file
-# For local dev/emulator, this might look different
-try:
-    # Check if app is already initialized
-    initialize_app(options={
-        'storageBucket': os.getenv('FIREBASE_STORAGE_BUCKET')
-    })
-except ValueError:
-    pass
-
 security = HTTPBearer()
 
+_firebase_ready = False
+_firebase_lock = threading.Lock()
+
+def init_firebase():
+    """
+    Initializes the Firebase Admin SDK. Runs on the first token verification
+    (every Firestore and Storage call comes after one) or from the warm-up,
+    so starting the server doesn't load the SDK.
+    """
+    global _firebase_ready
+    if _firebase_ready:
+        return
+    with _firebase_lock:
+        if _firebase_ready:
+            return
+        from firebase_admin import initialize_app
+
+        # Note: In production, you would use a service account credential file
+        # For local dev/emulator, this might look different
+        try:
+            initialize_app(options={
+                'storageBucket': os.getenv('FIREBASE_STORAGE_BUCKET')
+            })
+        except ValueError:
+            # Check if app is already initialized
+            pass
+        _firebase_ready = True
+
+# Verified tokens are reused until they expire or until the revocation check
+# is this many seconds old, so a revoked token stops working within that window.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_REVOCATION_CHECK_SECONDS = int(os.getenv("TOKEN_REVOCATION_CHECK_SECONDS", "300"))
+
+_token_cache = OrderedDict()  # sha256(token) -> (decoded_token, checked_at)
+_token_cache_lock = threading.Lock()
+_token_cache_stats = {"hits": 0, "misses": 0}
+
+def _get_cached_token(key: bytes, now: float) -> dict | None:
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is not None:
+            decoded_token, checked_at = entry
+            if now < decoded_token.get("exp", 0) and now - checked_at < TOKEN_REVOCATION_CHECK_SECONDS:
+                _token_cache.move_to_end(key)
+                _token_cache_stats["hits"] += 1
+                return decoded_token
+            del _token_cache[key]
+        _token_cache_stats["misses"] += 1
+        return None
+
+def _cache_token(key: bytes, decoded_token: dict, now: float):
+    with _token_cache_lock:
+        _token_cache[key] = (decoded_token, now)
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+def get_token_cache_stats() -> dict:
+    """
+    Hit/miss counters and current size of the verified-token cache.
+    """
+    with _token_cache_lock:
+        return {**_token_cache_stats, "size": len(_token_cache)}
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
     token = credentials.credentials
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    now = time.time()
+
+    cached_token = _get_cached_token(key, now)
+    if cached_token is not None:
+        return cached_token
+
+    init_firebase()
+    from firebase_admin import auth
+
     try:
         # Verify the ID token while checking if the token is revoked by
         # passing check_revoked=True.
         decoded_token = auth.verify_id_token(token, check_revoked=True)
+        _cache_token(key, decoded_token, now)
         return decoded_token
     except auth.RevokedIdTokenError:
         # Token revoked, inform the user to re-authenticate or signOut().
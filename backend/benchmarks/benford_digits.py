@@ -0,0 +1,64 @@
+
+"""
+Benchmarks leading-digit extraction: the legacy string path against the
+arithmetic NumPy engine in services.analysis_engine.
+
+Usage (from backend/):
+    python -m benchmarks.benford_digits [--rows 10000000] [--repeat 3]
+"""
+import argparse
+import glob
+import os
+import time
+import numpy as np
+import pandas as pd
+from services.analysis_engine import leading_digit_histogram
+
+REAL_DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "real-data")
+
+def load_amounts(rows: int) -> pd.Series:
+    """
+    Loads the Amount column of every real-data CSV and tiles it up to `rows` values.
+    """
+    frames = [pd.read_csv(path, usecols=["amount"]) for path in sorted(glob.glob(os.path.join(REAL_DATA_DIR, "*.csv")))]
+    amounts = pd.concat(frames, ignore_index=True)["amount"].to_numpy(dtype=np.float64)
+    repeats = -(-rows // len(amounts))
+    return pd.Series(np.tile(amounts, repeats)[:rows])
+
+def string_histogram(series: pd.Series) -> np.ndarray:
+    """
+    The previous implementation: str(value)[0] per row.
+    """
+    clean_series = series.dropna().abs()
+    clean_series = clean_series[clean_series > 0]
+    leading = clean_series.astype(str).str[0].astype(int)
+    return np.bincount(leading[leading.between(1, 9)], minlength=10)
+
+def arithmetic_histogram(series: pd.Series) -> np.ndarray:
+    return leading_digit_histogram(series.to_numpy(dtype=np.float64, na_value=np.nan))
+
+def best_of(fn, series: pd.Series, repeat: int) -> tuple[float, np.ndarray]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(series)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in sorted({min(100_000, args.rows), min(1_000_000, args.rows), args.rows}):
+        series = load_amounts(rows)
+        string_time, string_counts = best_of(string_histogram, series, args.repeat)
+        arith_time, arith_counts = best_of(arithmetic_histogram, series, args.repeat)
+
+        print(f"{rows:>11,} rows | string {string_time:8.3f}s | arithmetic {arith_time:8.3f}s "
+              f"| speedup {string_time / arith_time:6.1f}x "
+              f"| histograms match: {np.array_equal(string_counts[1:], arith_counts[1:])}")
+
+if __name__ == "__main__":
+    main()
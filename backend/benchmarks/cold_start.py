@@ -0,0 +1,156 @@
+"""
+Benchmarks cold start: a fresh interpreter imports main, runs the app's
+startup and answers GET /health (through the ASGI interface, no server).
+
+Fails (exit status 1) when `import main` exceeds --budget seconds, when
+/health isn't answered within --health-budget seconds of process start, or
+when a heavy module (pandas, Firebase, Gemini, reportlab...) was loaded to
+get there; those must load on first use.
+
+Usage (from backend/):
+    python -m benchmarks.cold_start [--runs 5] [--budget 1.0] [--health-budget 1.5]
+        [--warmup] [--profile]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Modules that must not be imported by `import main` and /health
+HEAVY_MODULES = [
+    "pandas",
+    "numpy",
+    "pyarrow",
+    "openpyxl",
+    "firebase_admin",
+    "google.cloud.firestore",
+    "google.cloud.storage",
+    "google.generativeai",
+    "reportlab",
+]
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# Runs in the child process; prints one JSON line
+PROBE = """
+import asyncio, json, sys, time
+started = time.time()
+clock = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def probe():
+    lifespan_inbox = asyncio.Queue()
+    ready = asyncio.Event()
+
+    async def lifespan_send(message):
+        if message["type"] == "lifespan.startup.complete":
+            ready.set()
+
+    await lifespan_inbox.put({"type": "lifespan.startup"})
+    lifespan = asyncio.create_task(main.app({"type": "lifespan", "asgi": {"version": "3.0"}}, lifespan_inbox.get, lifespan_send))
+    await ready.wait()
+    started_up = time.perf_counter()
+
+    sent = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        sent.append(message)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/health", "raw_path": b"/health", "root_path": "",
+        "query_string": b"", "headers": [], "server": ("localhost", 80), "client": ("localhost", 1),
+    }
+    await main.app(scope, receive, send)
+    answered = time.perf_counter()
+    answered_at = time.time()
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    await lifespan_inbox.put({"type": "lifespan.shutdown"})
+    await lifespan
+    return {
+        "started_at": started,
+        "import_s": imported - clock,
+        "startup_s": started_up - imported,
+        "health_s": answered - started_up,
+        "health_at": answered_at,
+        "status": sent[0]["status"],
+        "heavy_modules": loaded,
+    }
+
+print(json.dumps(asyncio.run(probe())))
+"""
+
+def run_probe(warmup: bool) -> dict:
+    env = dict(os.environ, WARMUP_ON_STARTUP="1" if warmup else "0")
+    launched = time.time()
+    output = subprocess.run(
+        [sys.executable, "-c", f"HEAVY_MODULES = {HEAVY_MODULES!r}\n{PROBE}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["interpreter_s"] = result["started_at"] - launched
+    result["process_to_health_s"] = result["health_at"] - launched
+    return result
+
+def profile_imports(top: int = 15):
+    """
+    Prints the slowest imports of `import main` (python -X importtime).
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                rows.append((int(cumulative), name.rstrip()))
+    print(f"\nSlowest imports (cumulative):")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds allowed for `import main`")
+    parser.add_argument("--health-budget", type=float, default=1.5, help="seconds from process start to /health")
+    parser.add_argument("--warmup", action="store_true", help="start with WARMUP_ON_STARTUP=1")
+    parser.add_argument("--profile", action="store_true", help="list the slowest imports")
+    args = parser.parse_args()
+
+    results = [run_probe(args.warmup) for _ in range(args.runs)]
+    for name in ("interpreter_s", "import_s", "startup_s", "health_s", "process_to_health_s"):
+        values = sorted(r[name] for r in results)
+        print(f"{name:<20} median {values[len(values) // 2] * 1000:8.1f} ms   max {values[-1] * 1000:8.1f} ms")
+
+    if args.profile:
+        profile_imports()
+
+    import_s = sorted(r["import_s"] for r in results)[len(results) // 2]
+    health_s = sorted(r["process_to_health_s"] for r in results)[len(results) // 2]
+    heavy = sorted({name for r in results for name in r["heavy_modules"]})
+    failures = []
+    if import_s > args.budget:
+        failures.append(f"import main took {import_s:.2f} s (budget {args.budget} s)")
+    if health_s > args.health_budget:
+        failures.append(f"/health answered {health_s:.2f} s after process start (budget {args.health_budget} s)")
+    if any(r["status"] != 200 for r in results):
+        failures.append("/health did not return 200")
+    if heavy and not args.warmup:
+        # With warm-up they load in the background, which is the point
+        failures.append(f"loaded at startup: {', '.join(heavy)}")
+
+    print()
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    if not failures:
+        print("PASS  cold start within budget")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
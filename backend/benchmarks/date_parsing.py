@@ -0,0 +1,51 @@
+"""
+Benchmarks Date column parsing: pd.to_datetime without a format (the previous
+implementation) against services.date_parser.parse_dates, on unique
+timestamps in several export formats, each with one malformed first row.
+
+Usage (from backend/):
+    python -m benchmarks.date_parsing [--rows 1000000]
+"""
+import argparse
+import time
+import warnings
+import pandas as pd
+from services.date_parser import parse_dates
+
+FORMATS = ["%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M", "%d %b %Y %H:%M"]
+
+def make_column(rows: int, date_format: str) -> pd.Series:
+    """
+    One timestamp per minute (so no two values repeat), with a junk first row
+    like the footnotes and "n/a" cells real exports have.
+    """
+    values = pd.Series(pd.date_range("2020-01-01", periods=rows, freq="min").strftime(date_format))
+    values.iloc[0] = "n/a"
+    return values
+
+def legacy_parse(values: pd.Series) -> pd.Series:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return pd.to_datetime(values, errors="coerce")
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    for date_format in FORMATS:
+        values = make_column(args.rows, date_format)
+        legacy_time, legacy = timed(legacy_parse, values)
+        new_time, (dates, unparsed) = timed(parse_dates, values)
+        print(
+            f"{date_format:<20} legacy {legacy_time:7.2f} s ({int(legacy.isna().sum()):,} NaT)   "
+            f"parse_dates {new_time:6.2f} s ({unparsed:,} unparsed)   {legacy_time / new_time:5.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
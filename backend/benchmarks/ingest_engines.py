@@ -0,0 +1,74 @@
+"""
+Benchmarks parse_and_analyze end to end on the same data as CSV with the
+pandas C reader, CSV with the Arrow reader (PARSE_ENGINE=pyarrow), and as
+Parquet and Feather uploads.
+
+Usage (from backend/):
+    python -m benchmarks.ingest_engines [--rows 1000000 2000000]
+"""
+import argparse
+import glob
+import io
+import os
+import time
+import pandas as pd
+from services import parsing_service
+
+REAL_DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "real-data")
+
+def load_frame(rows: int) -> pd.DataFrame:
+    """
+    Tiles the real-data exports up to `rows` rows.
+    """
+    frames = [pd.read_csv(path) for path in sorted(glob.glob(os.path.join(REAL_DATA_DIR, "*.csv")))]
+    data = pd.concat(frames, ignore_index=True)
+    repeats = -(-rows // len(data))
+    return pd.concat([data] * repeats, ignore_index=True).head(rows)
+
+def encode(df: pd.DataFrame, kind: str) -> bytes:
+    buffer = io.BytesIO()
+    if kind == "csv":
+        df.to_csv(buffer, index=False)
+    elif kind == "parquet":
+        df.to_parquet(buffer)
+    else:
+        df.to_feather(buffer)
+    return buffer.getvalue()
+
+def run(content: bytes, filename: str, engine: str, streaming: bool, repeat: int) -> float:
+    parsing_service.PARSE_ENGINE = engine
+    parsing_service._arrow_engine = None
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parsing_service.parse_and_analyze(content, filename, streaming=streaming, workers=1)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 2_000_000])
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df = load_frame(rows)
+        files = {kind: encode(df, kind) for kind in ("csv", "parquet", "feather")}
+        print(f"{rows:,} rows (csv {len(files['csv']) / 1e6:.0f} MB, parquet {len(files['parquet']) / 1e6:.0f} MB, feather {len(files['feather']) / 1e6:.0f} MB)")
+
+        cases = [
+            ("csv, pandas C reader", files["csv"], "data.csv", "c", False),
+            ("csv, Arrow reader", files["csv"], "data.csv", "pyarrow", False),
+            ("csv streamed, pandas C", files["csv"], "data.csv", "c", True),
+            ("csv streamed, Arrow", files["csv"], "data.csv", "pyarrow", True),
+            ("parquet", files["parquet"], "data.parquet", "c", False),
+            ("feather", files["feather"], "data.feather", "c", False),
+        ]
+        baseline = None
+        for label, content, filename, engine, streaming in cases:
+            seconds = run(content, filename, engine, streaming, args.repeat)
+            baseline = baseline or seconds
+            print(f"  {label:<24} {seconds:6.2f} s  ({baseline / seconds:4.1f}x)")
+
+if __name__ == "__main__":
+    main()
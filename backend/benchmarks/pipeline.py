@@ -0,0 +1,292 @@
+"""
+Benchmarks each stage of the upload pipeline on synthetic data scaled from
+the real-data exports, and checks the PRD performance targets.
+
+Stages: parse (the two-phase CSV read), standardize_columns,
+calculate_benford_stats, calculate_spending_summary, detect_anomalies,
+preview_file end to end (parse_and_analyze: AI insights are a network call
+and are left out), serialize (make_serializable + JSON encoding of the
+preview) and PDFService.generate_report. Each reports wall time, peak RSS
+and rows per second.
+
+Variants:
+    clean      the real-data rows, tiled
+    messy      renamed headers, mixed date formats, padded and
+               currency-formatted amounts
+    corrupted  messy, plus non-numeric and missing amounts, unparseable
+               dates and short rows
+
+Gates (Prd.md): a 10 MB messy upload analysed in under 10 s, and 50k
+corrupted rows in under 60 s. The exit status is 1 if a gate fails.
+
+Peak RSS is this process's high-water mark, reset before each stage where
+Linux allows it (/proc/self/clear_refs); elsewhere it is the running peak.
+Worker processes used by streamed uploads are not included.
+
+Usage (from backend/):
+    python -m benchmarks.pipeline [--rows 10000 100000 1000000 10000000]
+        [--variants clean messy corrupted] [--output results.json]
+        [--compare previous.json] [--gates-only]
+"""
+import argparse
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import numpy as np
+import pandas as pd
+from services import parsing_service
+from services.analysis_engine import calculate_benford_stats, calculate_spending_summary
+from services.detection_engine import detect_anomalies
+from services.pdf_service import PDFService
+from services.standardizer import standardize_columns
+from utils.serialization import dumps, make_serializable
+
+REAL_DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "real-data")
+VARIANTS = ("clean", "messy", "corrupted")
+
+# Prd.md performance targets: (name, variant, size, limit in seconds)
+GATES = [
+    ("10 MB upload under 10 s", "messy", {"bytes": 10 * 1024 * 1024}, 10.0),
+    ("50k rows under 60 s", "corrupted", {"rows": 50_000}, 60.0),
+]
+
+# Rows generated per block, so 10M-row files never exist as one DataFrame
+GENERATE_BLOCK_ROWS = 500_000
+
+MESSY_COLUMNS = {"date": "Txn Date", "amount": "Amount (USD)", "vendor": "Payee",
+                 "category": "Type", "description": "Memo"}
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%b %d, %Y", "%Y%m%d"]
+
+def load_seed() -> pd.DataFrame:
+    """
+    The three real-data exports, on their common columns.
+    """
+    frames = [pd.read_csv(path) for path in sorted(glob.glob(os.path.join(REAL_DATA_DIR, "*.csv")))]
+    columns = [c for c in frames[0].columns if all(c in frame.columns for frame in frames)]
+    return pd.concat([frame[columns] for frame in frames], ignore_index=True)
+
+def generate_block(seed: pd.DataFrame, rows: int, variant: str, rng: np.random.Generator) -> pd.DataFrame:
+    """
+    `rows` rows sampled from the seed, with amounts jittered so the number of
+    distinct values grows with the file, then messed up per variant.
+    """
+    df = seed.iloc[rng.integers(0, len(seed), rows)].reset_index(drop=True)
+    amounts = pd.to_numeric(df["amount"], errors="coerce").to_numpy()
+    df["amount"] = np.round(amounts * rng.lognormal(0, 0.05, rows), 2)
+    if variant == "clean":
+        return df
+
+    dates = pd.to_datetime(df["date"], errors="coerce")
+    formats = rng.integers(0, len(DATE_FORMATS), rows)
+    text = pd.Series(index=df.index, dtype=object)
+    for i, date_format in enumerate(DATE_FORMATS):
+        mask = formats == i
+        text[mask] = dates[mask].dt.strftime(date_format)
+    df["date"] = text
+
+    amount_text = pd.Series(df["amount"].map("{:,.2f}".format), dtype=object)
+    currency = rng.random(rows) < 0.3
+    amount_text[currency] = "$" + amount_text[currency]
+    padded = rng.random(rows) < 0.2
+    amount_text[padded] = " " + amount_text[padded] + " "
+    df["amount"] = amount_text
+
+    if variant == "corrupted":
+        broken = rng.random(rows)
+        df.loc[broken < 0.05, "amount"] = rng.choice(["N/A", "#REF!", "abc", "--"], int((broken < 0.05).sum()))
+        df.loc[(broken >= 0.05) & (broken < 0.08), "amount"] = None
+        df.loc[rng.random(rows) < 0.05, "date"] = "not a date"
+        # Short rows: trailing fields missing entirely
+        short = rng.random(rows) < 0.02
+        for column in df.columns[-2:]:
+            df[column] = df[column].astype(object)
+            df.loc[short, column] = None
+
+    return df.rename(columns=MESSY_COLUMNS)
+
+def generate_csv(seed: pd.DataFrame, rows: int, variant: str, random_seed: int = 0) -> bytes:
+    """
+    A synthetic CSV upload of `rows` rows, generated block by block.
+    """
+    rng = np.random.default_rng(random_seed)
+    buffer = io.StringIO()
+    for start in range(0, rows, GENERATE_BLOCK_ROWS):
+        block = generate_block(seed, min(GENERATE_BLOCK_ROWS, rows - start), variant, rng)
+        block.to_csv(buffer, index=False, header=start == 0)
+    return buffer.getvalue().encode("utf-8")
+
+def rows_for_bytes(seed: pd.DataFrame, size: int, variant: str) -> int:
+    sample = generate_csv(seed, 10_000, variant)
+    return -(-size * 10_000 // len(sample))
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def measure(fn, repeat: int = 1):
+    """
+    Runs fn `repeat` times. Returns (result, best seconds, peak RSS in MB).
+    """
+    seconds = []
+    peak = 0.0
+    result = None
+    for _ in range(repeat):
+        result = None
+        _reset_peak_rss()
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+        peak = max(peak, _peak_rss_mb())
+    return result, min(seconds), peak
+
+def run_stages(content: bytes, rows: int, repeat: int) -> list[dict]:
+    """
+    Times every stage on one generated file.
+    """
+    results = []
+
+    def record(stage, fn):
+        value, seconds, peak = measure(fn, repeat)
+        results.append({
+            "stage": stage,
+            "seconds": round(seconds, 4),
+            "peak_rss_mb": round(peak, 1),
+            "rows_per_s": round(rows / seconds) if seconds else None,
+        })
+        return value
+
+    def parse():
+        plan = parsing_service._plan_csv(io.BytesIO(content), 1)
+        return parsing_service._read_csv_columns(plan["stream"], plan["read_options"])
+
+    df = record("parse", parse)
+    df_standardized, _ = record("standardize", lambda: standardize_columns(df))
+    record("benford", lambda: calculate_benford_stats(df_standardized["Amount"]))
+    record("spending", lambda: calculate_spending_summary(df_standardized))
+    record("detection", lambda: detect_anomalies(df_standardized))
+    del df, df_standardized
+
+    preview = record("preview_file", lambda: parsing_service.parse_and_analyze(content, "upload.csv"))
+    record("serialize", lambda: dumps(make_serializable(preview)))
+    # As stored: the PDF is rendered from the serialized (string-keyed) report
+    stored = make_serializable(preview)
+    document = {
+        "filename": "upload.csv",
+        "timestamp": datetime.datetime.now().isoformat(),
+        "status": "analyzed",
+        "row_count": stored["row_count"],
+        "analysis_report": stored["analysis_report"],
+    }
+    record("pdf", lambda: PDFService.generate_report(document))
+    return results
+
+def run_gates(seed: pd.DataFrame) -> list[dict]:
+    results = []
+    for name, variant, size, limit in GATES:
+        rows = size.get("rows") or rows_for_bytes(seed, size["bytes"], variant)
+        content = generate_csv(seed, rows, variant)
+        _, seconds, peak = measure(lambda: parsing_service.parse_and_analyze(content, "upload.csv"))
+        results.append({
+            "gate": name,
+            "variant": variant,
+            "rows": rows,
+            "bytes": len(content),
+            "seconds": round(seconds, 4),
+            "peak_rss_mb": round(peak, 1),
+            "limit_s": limit,
+            "passed": seconds < limit,
+        })
+    return results
+
+def compare(previous: dict, current: dict):
+    """
+    Prints the per-stage time ratio against a previous run's JSON.
+    """
+    before = {(r["variant"], r["rows"], r["stage"]): r for r in previous.get("stages", [])}
+    print(f"\nCompared with {previous['meta'].get('timestamp')}:")
+    matched = [r for r in current["stages"] if (r["variant"], r["rows"], r["stage"]) in before]
+    if not matched:
+        print("  no stages in common (different --rows or --variants)")
+    for r in matched:
+        old = before[(r["variant"], r["rows"], r["stage"])]
+        if old["seconds"]:
+            ratio = r["seconds"] / old["seconds"]
+            marker = "  slower" if ratio > 1.1 else ""
+            print(f"  {r['variant']:<10} {r['rows']:>10,} {r['stage']:<13} "
+                  f"{old['seconds']:8.3f} s -> {r['seconds']:8.3f} s  ({ratio:4.2f}x){marker}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="a previous --output file")
+    parser.add_argument("--gates-only", action="store_true")
+    args = parser.parse_args()
+
+    seed = load_seed()
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "peak_rss_per_stage": _reset_peak_rss(),
+        },
+        "stages": [],
+        "gates": [],
+    }
+
+    if not args.gates_only:
+        for variant in args.variants:
+            for rows in args.rows:
+                content = generate_csv(seed, rows, variant)
+                print(f"{variant} {rows:,} rows, {len(content) / 1e6:.1f} MB")
+                for result in run_stages(content, rows, args.repeat):
+                    report["stages"].append({"variant": variant, "rows": rows, "bytes": len(content), **result})
+                    print(f"  {result['stage']:<13} {result['seconds']:8.3f} s  {result['peak_rss_mb']:8.1f} MB  "
+                          f"{result['rows_per_s'] or 0:>12,} rows/s")
+                del content
+
+    report["gates"] = run_gates(seed)
+    print("\nGates:")
+    for gate in report["gates"]:
+        status = "PASS" if gate["passed"] else "FAIL"
+        print(f"  {status}  {gate['gate']:<26} {gate['seconds']:7.2f} s  ({gate['rows']:,} rows, {gate['bytes'] / 1e6:.1f} MB)")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+    sys.exit(0 if all(gate["passed"] for gate in report["gates"]) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmarks the CSV read: every column with default dtypes (the previous
+path) against the two-phase read in services.parsing_service, which loads
+only the mapped analysis columns with compact dtypes.
+
+Usage (from backend/):
+    python -m benchmarks.read_path [--rows 1000000]
+"""
+import argparse
+import glob
+import io
+import os
+import time
+import pandas as pd
+from services.parsing_service import _plan_csv, _read_csv_columns
+
+REAL_DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "real-data")
+
+def load_csv(rows: int) -> bytes:
+    """
+    Tiles the real-data exports up to `rows` rows and returns them as CSV bytes.
+    """
+    frames = [pd.read_csv(path) for path in sorted(glob.glob(os.path.join(REAL_DATA_DIR, "*.csv")))]
+    data = pd.concat(frames, ignore_index=True)
+    repeats = -(-rows // len(data))
+    return pd.concat([data] * repeats, ignore_index=True).head(rows).to_csv(index=False).encode("utf-8")
+
+def full_read(content: bytes) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(content))
+
+def pruned_read(content: bytes) -> pd.DataFrame:
+    plan = _plan_csv(io.BytesIO(content), 1)
+    return _read_csv_columns(plan["stream"], plan["read_options"])
+
+def best_of(fn, content: bytes, repeat: int) -> tuple[float, pd.DataFrame]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = fn(content)
+        timings.append(time.perf_counter() - start)
+    return min(timings), df
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    content = load_csv(args.rows)
+    print(f"{args.rows:,} rows, {len(content) / 1e6:.1f} MB")
+
+    results = {}
+    for name, fn in (("all columns", full_read), ("analysis columns", pruned_read)):
+        seconds, df = best_of(fn, content, args.repeat)
+        memory = df.memory_usage(deep=True).sum()
+        results[name] = (seconds, memory)
+        print(f"{name:<18} {seconds:6.2f} s  {memory / 1e6:8.1f} MB  columns={list(df.columns)}")
+
+    (full_s, full_mb), (pruned_s, pruned_mb) = results["all columns"], results["analysis columns"]
+    print(f"speedup {full_s / pruned_s:.1f}x, memory {full_mb / pruned_mb:.1f}x smaller")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+
+"""
+Benchmarks report serialization: the previous recursive make_serializable
+against utils.serialization (make_serializable and FastJSONResponse).
+
+The synthetic report mirrors analysis_report, with large monthly_trend and
+top_categories maps holding NumPy scalars.
+
+Usage (from backend/):
+    python -m benchmarks.serialization [--months 5000] [--categories 20000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from utils.serialization import make_serializable, FastJSONResponse
+
+def legacy_make_serializable(obj):
+    """
+    The previous implementation: isinstance chain and pd.isna on every leaf.
+    """
+    if isinstance(obj, dict):
+        return {str(k): legacy_make_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [legacy_make_serializable(v) for v in obj]
+    elif isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        if np.isnan(obj):
+            return None
+        return float(obj)
+    elif isinstance(obj, np.bool_):
+        return bool(obj)
+    elif isinstance(obj, np.ndarray):
+        return legacy_make_serializable(obj.tolist())
+    elif isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    elif pd.isna(obj):
+        return None
+    else:
+        return obj
+
+def build_report(months: int, categories: int) -> dict:
+    rng = np.random.default_rng(0)
+    month_keys = pd.period_range("1900-01", periods=months, freq="M").strftime("%Y-%m")
+    monthly_trend = dict(zip(month_keys, rng.normal(1e5, 2e4, months).astype(np.float64)))
+
+    sums = rng.normal(1e4, 5e3, categories)
+    sums[rng.random(categories) < 0.01] = np.nan
+    top_categories = {
+        f"Category {i}": {"sum": np.float64(s), "count": np.int64(c)}
+        for i, (s, c) in enumerate(zip(sums, rng.integers(1, 1000, categories)))
+    }
+
+    return {
+        "benford_analysis": {
+            "distribution": {d: {"actual": np.float64(0.1), "expected": np.float64(0.1)} for d in range(1, 10)},
+            "mad_score": np.float64(0.01),
+            "verdict": "Pass",
+            "total_rows_analyzed": np.int64(1_000_000)
+        },
+        "spending_summary": {
+            "total_volume": np.float64(1e9),
+            "net_flow": np.float64(5e8),
+            "transaction_count": 1_000_000,
+            "avg_transaction": np.float64(500.0),
+            "date_range": {"start": pd.Timestamp("1900-01-01"), "end": pd.Timestamp("2024-01-01")},
+            "monthly_trend": monthly_trend,
+            "top_categories": top_categories
+        }
+    }
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, default=5000)
+    parser.add_argument("--categories", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    report = build_report(args.months, args.categories)
+    assert legacy_make_serializable(report) == make_serializable(report)
+
+    results = {
+        "legacy make_serializable": best_of(lambda: legacy_make_serializable(report), args.repeat),
+        "make_serializable": best_of(lambda: make_serializable(report), args.repeat),
+        "legacy make_serializable + json.dumps": best_of(lambda: json.dumps(legacy_make_serializable(report)).encode(), args.repeat),
+        "FastJSONResponse.render": best_of(lambda: FastJSONResponse(report), args.repeat),
+    }
+
+    baseline = results["legacy make_serializable"]
+    print(f"report: {args.months:,} months, {args.categories:,} categories")
+    for name, seconds in results.items():
+        print(f"{name:<40} {seconds * 1000:9.2f} ms  ({baseline / seconds:5.1f}x vs legacy make_serializable)")
+
+if __name__ == "__main__":
+    main()
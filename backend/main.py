@@ -1,11 +1,37 @@
-from fastapi import FastAPI, Depends
+import os
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from auth import get_current_user
-from routers import analysis, history, export
+from fastapi.responses import PlainTextResponse
+from auth import get_current_user, get_token_cache_stats
+from routers import analysis, history, export, portfolio
 # from services.pdf_service import PDFService
-from utils.serialization import make_serializable
+from utils.serialization import make_serializable, FastJSONResponse
+from utils.executors import shutdown_executors
+from utils import timing, uploads
+from services import admission, job_service, warmup
 
-app = FastAPI()
+# Bearer token required to scrape /metrics ("" leaves it open, e.g. behind
+# a private network)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_service.start_workers()
+    # Runs alongside the first requests; startup itself stays fast
+    warmup_task = asyncio.create_task(warmup.warm_up()) if warmup.WARMUP_ON_STARTUP else None
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await job_service.stop_workers()
+    shutdown_executors()
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Innermost, so oversized uploads are refused with the CORS headers still set
+app.add_middleware(uploads.BodySizeLimitMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -19,6 +45,7 @@ app.add_middleware(
 app.include_router(analysis.router)
 app.include_router(history.router)
 app.include_router(export.router)
+app.include_router(portfolio.router)
 
 origins = [
     "http://localhost:5173",
@@ -31,16 +58,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Outermost, so the total covers the whole request
+app.add_middleware(timing.TimingMiddleware)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Fin-Analysis API"}
 
 @app.get("/health")
-def health_check():
+async def health_check():
+    # async: answered on the event loop, without starting the threadpool
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(authorization: str | None = Header(None)):
+    """
+    Prometheus metrics: per-stage duration histograms by endpoint (with
+    p50/p95/p99 of recent requests), the verified-token cache counters and
+    the admission queue and rejections.
+    """
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token"
+        )
+
+    token_cache = get_token_cache_stats()
+    lines = [
+        "# HELP finanalysis_token_cache_requests_total Token verifications by cache result.",
+        "# TYPE finanalysis_token_cache_requests_total counter",
+        f'finanalysis_token_cache_requests_total{{result="hit"}} {token_cache["hits"]}',
+        f'finanalysis_token_cache_requests_total{{result="miss"}} {token_cache["misses"]}',
+        "# HELP finanalysis_token_cache_size Verified tokens currently cached.",
+        "# TYPE finanalysis_token_cache_size gauge",
+        f'finanalysis_token_cache_size {token_cache["size"]}',
+    ]
+    return timing.render_metrics() + "\n".join(lines) + "\n" + admission.render_metrics()
+
 @app.get("/api/protected")
 def protected_route(user: dict = Depends(get_current_user)):
     return {"message": "You are authenticated", "user_id": user.get("uid")}
@@ -1,21 +1,191 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from services import parsing_service
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from starlette.datastructures import UploadFile
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from services import admission, job_service, upload_service
 from auth import verify_token
+from utils.executors import run_io
+from utils import timing, uploads
+from utils.serialization import FastJSONResponse
 
 router = APIRouter(
     prefix="/api/analyze",
     tags=["analysis"]
 )
 
-@router.post("/upload")
+# The upload endpoints read their multipart body themselves (see _spool);
+# this documents it as the "file" form field.
+_UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+async def _rate_limited(token: dict = Depends(verify_token)) -> str:
+    """
+    The caller's uid, once a token is taken from their rate bucket.
+    FastAPI parses form parameters before it runs dependencies, so the upload
+    endpoints take no File parameter: this check runs before any of the body
+    is received, and a limited client gets its 429 without the upload being
+    read or spooled.
+    """
+    uid = token.get("uid")
+    if not uid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid user token"
+        )
+    admission.check_rate(uid)
+    return uid
+
+@router.post("/upload", openapi_extra=_UPLOAD_FORM)
 async def analyze_upload(
-    file: UploadFile = File(...), 
-    token: dict = Depends(verify_token)
+    request: Request,
+    background: bool = False,
+    all_sheets: bool = False,
+    uid: str = Depends(_rate_limited)
 ):
     """
     Triggers analysis for a direct file upload.
     Verifies user token, parses the uploaded file directly, and returns a preview.
+    With background=true the upload is queued instead and a job id is returned
+    right away; poll /api/analyze/jobs/{job_id} for progress.
+    With all_sheets=true every sheet of an .xlsx workbook is analysed
+    (one report per sheet plus a combined report).
+    The upload is spooled to a temporary file and analysed from there, so it
+    never has to fit in memory (its size is capped by MAX_UPLOAD_BYTES).
+    Requests are rate limited per user and admitted against a global budget
+    weighted by upload size; past either, the response is 429 with Retry-After.
+    """
+    # Spool the upload to a file the parsers (and workers) read in place
+    filename, spooled = await _spool(uid, request)
+
+    if background:
+        # The job owns the spooled file from here and deletes it when done
+        try:
+            job = await job_service.submit_job(uid, filename, spooled, all_sheets)
+        except BaseException:
+            spooled.close()
+            raise
+        return FastJSONResponse(_job_status(job), status_code=status.HTTP_202_ACCEPTED)
+    
+    # Parse and analyze on the process pool (or reuse the cached result);
+    # the Firestore write is blocking I/O and goes to the thread pool.
+    try:
+        parsing_service = await _parsing_service()
+        async with admission.reserve(spooled.size, uid=uid):
+            preview_data = await parsing_service.preview_file_async(spooled.path, filename, all_sheets=all_sheets)
+    finally:
+        spooled.close()
+    
+    upload_id = await run_io(upload_service.save_upload_metadata, uid, filename, preview_data)
+    if upload_id:
+        preview_data["upload_id"] = upload_id
+    
+    return FastJSONResponse(preview_data)
+
+@router.post("/uploads/{upload_id}/append", openapi_extra=_UPLOAD_FORM)
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    uid: str = Depends(_rate_limited)
+):
+    """
+    Appends a new batch of transactions (e.g. next month's export) to a saved
+    analysis. Only the new rows are parsed; their statistics are merged into
+    the stored ones and the report is rebuilt, so the cost doesn't grow with
+    the size of the ledger.
+    """
+    # Checked before the body is read; a refused request keeps its rate token
+    try:
+        upload = await run_io(_load_upload, upload_id)
+        if upload is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Analysis not found"
+            )
+        if upload.get("uid") != uid:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+    except HTTPException:
+        admission.refund(uid)
+        raise
+
+    filename, spooled = await _spool(uid, request)
+    try:
+        parsing_service = await _parsing_service()
+        async with admission.reserve(spooled.size, uid=uid):
+            batch = await parsing_service.analyze_batch_async(spooled.path, filename)
+    finally:
+        spooled.close()
+    try:
+        result = await run_io(upload_service.append_to_upload, uid, upload_id, upload, filename, batch)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error appending to upload {upload_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to append to analysis"
+        )
+    return FastJSONResponse(result)
+
+async def _spool(uid: str, request: Request) -> tuple[str, uploads.SpooledUpload]:
+    """
+    Reads the multipart body and spools its "file" part on the I/O pool,
+    returning the file name and the spooled upload. An upload refused here
+    (malformed, too large, missing or empty) gives the user back the rate
+    token it was charged.
+    """
+    try:
+        async with request.form() as form:
+            file = form.get("file")
+            if not isinstance(file, UploadFile):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="No file uploaded"
+                )
+            with timing.stage("upload_read"):
+                return file.filename, await run_io(uploads.spool, file)
+    except StarletteHTTPException:
+        admission.refund(uid)
+        raise
+
+async def _parsing_service():
+    """
+    parsing_service, imported on the first upload rather than at startup (it
+    loads pandas); the import runs on the I/O pool so it never stalls the event loop.
+    """
+    from importlib import import_module
+    return await run_io(import_module, "services.parsing_service")
+
+def _load_upload(upload_id: str) -> dict | None:
+    try:
+        return upload_service.get_upload(upload_id)
+    except Exception as e:
+        print(f"Error fetching upload {upload_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch analysis"
+        )
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, token: dict = Depends(verify_token)):
+    """
+    Reports the status and per-stage progress of a background analysis.
+    Once the job is analyzed the response also carries the preview (while the
+    job is still held by this server; afterwards use /api/history/{job_id}).
     """
     uid = token.get("uid")
     if not uid:
@@ -23,52 +193,59 @@ async def analyze_upload(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid user token"
         )
-        
-    # Read file content
-    content = await file.read()
-    
-    # Parse and preview
-    preview_data = parsing_service.preview_file(content, file.filename)
-    
-    # SAVE METADATA TO FIRESTORE
+
+    job = job_service.get_job(job_id)
+    if job is None:
+        # Queued by another server process (or before a restart): read the uploads document
+        job = await run_io(_load_job_from_firestore, job_id)
+
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    if job.get("uid") != uid:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+
+    return FastJSONResponse(_job_status(job))
+
+def _job_status(job: dict) -> dict:
+    status_data = {
+        "job_id": job["job_id"],
+        "upload_id": job["upload_id"],
+        "status": job["status"],
+        "stages": job["stages"],
+        "error": job.get("error")
+    }
+    if job.get("result") is not None:
+        status_data["result"] = job["result"]
+    return status_data
+
+def _load_job_from_firestore(job_id: str) -> dict | None:
     try:
         from firebase_admin import firestore
-        from utils.serialization import make_serializable
-        import traceback
-        
-        db = firestore.client()
-        
-        # Prepare data for Firestore (remove NumPy types)
-        firestore_data = {
-            "uid": uid,
-            "filename": file.filename,
-            "upload_type": "direct_upload",
-            "timestamp": firestore.SERVER_TIMESTAMP,
-            "status": "analyzed",
-            "row_count": preview_data.get("row_count") or len(preview_data.get("preview_rows", [])),
-            "columns": preview_data.get("mapped_columns"),
-            "missing_columns": preview_data.get("missing_required_columns"),
-            "analysis_report": make_serializable(preview_data.get("analysis_report"))
-        }
-
-        doc_ref = db.collection("uploads").document()
-        doc_ref.set(firestore_data)
-        
-        preview_data["upload_id"] = doc_ref.id
-        
+        doc = firestore.client().collection("uploads").document(job_id).get(
+            field_paths=["uid", "status", "stages", "error"]
+        )
     except Exception as e:
-        error_msg = f"Failed to save metadata to Firestore: {e}"
-        print(error_msg)
-        traceback.print_exc()
-        
-        # Write to a log file we can read
-        try:
-            with open("debug_firestore_error.log", "w") as f:
-                f.write(error_msg + "\n")
-                f.write(traceback.format_exc())
-        except:
-            pass
-            
-        # Continue even if saving metadata fails
-    
-    return preview_data
+        print(f"Error fetching job {job_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch job status"
+        )
+
+    if not doc.exists:
+        return None
+
+    data = doc.to_dict()
+    return {
+        "job_id": job_id,
+        "upload_id": job_id,
+        "uid": data.get("uid"),
+        "status": data.get("status"),
+        "stages": data.get("stages") or {stage: "done" for stage in job_service.STAGES},
+        "error": data.get("error")
+    }
@@ -1,19 +1,41 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import re
+import asyncio
+import zipfile
+import datetime
+from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.responses import StreamingResponse
 from auth import verify_token
-from firebase_admin import firestore
-from services.pdf_service import PDFService
+from services import pdf_cache, report_store
+from utils.executors import ANALYSIS_WORKERS, run_cpu, run_io
 
 router = APIRouter(
     prefix="/api/export",
     tags=["export"]
 )
 
+# Bulk export limits: reports per archive, documents fetched per Firestore
+# batch, and PDFs rendered concurrently.
+BULK_EXPORT_MAX_REPORTS = 500
+BULK_EXPORT_FETCH_BATCH = 20
+BULK_EXPORT_CONCURRENCY = max(1, ANALYSIS_WORKERS)
+
+class BulkExportRequest(BaseModel):
+    """
+    Either explicit doc_ids, or every analysis uploaded between
+    start_date and end_date (inclusive, UTC).
+    """
+    doc_ids: list[str] | None = None
+    start_date: datetime.date | None = None
+    end_date: datetime.date | None = None
+
 @router.get("/{doc_id}/pdf")
-async def export_pdf(doc_id: str, token: dict = Depends(verify_token)):
+async def export_pdf(doc_id: str, request: Request, token: dict = Depends(verify_token)):
     """
     Generates and downloads a PDF report for the specified analysis.
+    PDFs are cached per document version and served with an ETag, so
+    revalidations get a 304 and repeat downloads skip rendering.
     """
     uid = token.get("uid")
     if not uid:
@@ -23,9 +45,11 @@ async def export_pdf(doc_id: str, token: dict = Depends(verify_token)):
         )
         
     try:
+        from firebase_admin import firestore
         db = firestore.client()
         doc_ref = db.collection("uploads").document(doc_id)
-        doc = doc_ref.get()
+        # Only the owner field is needed to authorize and version the report
+        doc = await run_io(doc_ref.get, field_paths=["uid"])
         
         if not doc.exists:
              raise HTTPException(
@@ -33,24 +57,41 @@ async def export_pdf(doc_id: str, token: dict = Depends(verify_token)):
                 detail="Analysis not found"
             )
             
-        data = doc.to_dict()
-        
         # Verify ownership
-        if data.get("uid") != uid:
+        if doc.get("uid") != uid:
              raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied"
             )
+
+        version = pdf_cache.pdf_version(doc_id, doc.update_time)
+        etag = f'"{version}"'
+        filename = f"Analysis_Report_{doc_id[:8]}.pdf"
+        headers = {
+            "ETag": etag,
+            # Browsers keep the file but revalidate before reuse
+            "Cache-Control": "private, no-cache",
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+
+        if_none_match = _parse_if_none_match(request.headers.get("if-none-match"))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        pdf_bytes = await run_io(pdf_cache.get, version)
+        if pdf_bytes is None:
+            data = (await run_io(doc_ref.get)).to_dict()
+            data = await run_io(report_store.hydrate, data)
         
-        # Generate PDF
-        pdf_buffer = PDFService.generate_report(data)
+            # Generate PDF
+            pdf_bytes = await run_cpu(pdf_cache.render_pdf, data)
+            await run_io(pdf_cache.put, version, pdf_bytes)
         
         # Return as downloadable file
-        filename = f"Analysis_Report_{doc_id[:8]}.pdf"
-        return StreamingResponse(
-            pdf_buffer,
+        return Response(
+            content=pdf_bytes,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers=headers
         )
 
     except HTTPException:
@@ -61,3 +102,178 @@ async def export_pdf(doc_id: str, token: dict = Depends(verify_token)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate PDF report"
         )
+
+def _parse_if_none_match(value: str | None) -> set[str]:
+    """
+    Returns the ETags listed in an If-None-Match header (weak prefixes dropped).
+    """
+    if not value:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in value.split(",")}
+
+@router.post("/bulk")
+async def export_bulk(body: BulkExportRequest, token: dict = Depends(verify_token)):
+    """
+    Streams a ZIP of PDF reports for several analyses.
+    Documents are fetched in batches and rendered concurrently on the process
+    pool; each PDF is written to the archive as soon as it is ready.
+    """
+    uid = token.get("uid")
+    if not uid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid user token"
+        )
+
+    if body.doc_ids:
+        doc_ids = list(dict.fromkeys(body.doc_ids))
+        if any(not doc_id or "/" in doc_id for doc_id in doc_ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid document id"
+            )
+    elif body.start_date and body.end_date:
+        doc_ids = await run_io(_doc_ids_in_range, uid, body.start_date, body.end_date)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide doc_ids or start_date and end_date"
+        )
+
+    if len(doc_ids) > BULK_EXPORT_MAX_REPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_EXPORT_MAX_REPORTS} reports can be exported at once"
+        )
+
+    filename = f"Analysis_Reports_{datetime.date.today().isoformat()}.zip"
+    return StreamingResponse(
+        _stream_zip(uid, doc_ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+def _doc_ids_in_range(uid: str, start_date: datetime.date, end_date: datetime.date) -> list[str]:
+    start = datetime.datetime.combine(start_date, datetime.time.min, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min, tzinfo=datetime.timezone.utc)
+
+    from firebase_admin import firestore
+    db = firestore.client()
+    # Ordered by the composite index uploads(uid ASC, timestamp DESC), see
+    # firestore.indexes.json; ascending order would need an index of its own.
+    docs = db.collection("uploads")\
+             .where("uid", "==", uid)\
+             .where("timestamp", ">=", start)\
+             .where("timestamp", "<", end)\
+             .order_by("timestamp", direction=firestore.Query.DESCENDING)\
+             .select(["uid"])\
+             .limit(BULK_EXPORT_MAX_REPORTS + 1)\
+             .stream()
+    # The zip lists the oldest report first
+    return [doc.id for doc in docs][::-1]
+
+class _ZipStream:
+    """
+    Write-only, unseekable sink for zipfile: collects the bytes written since
+    the last drain() so they can be streamed out entry by entry.
+    """
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def _stream_zip(uid: str, doc_ids: list[str]):
+    from firebase_admin import firestore
+
+    sink = _ZipStream()
+    skipped = []
+    used_names = set()
+    pending = set()
+
+    async def write_finished(archive):
+        nonlocal pending
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            doc_id, name, pdf_bytes = task.result()
+            if pdf_bytes is None:
+                skipped.append(f"{doc_id}: failed to render")
+                continue
+            archive.writestr(_unique_name(name, used_names), pdf_bytes)
+
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            db = firestore.client()
+            for start in range(0, len(doc_ids), BULK_EXPORT_FETCH_BATCH):
+                refs = [db.collection("uploads").document(doc_id) for doc_id in doc_ids[start:start + BULK_EXPORT_FETCH_BATCH]]
+                snapshots = await run_io(lambda: list(db.get_all(refs)))
+
+                for doc in snapshots:
+                    data = doc.to_dict() if doc.exists else None
+                    if data is None or data.get("uid") != uid:
+                        skipped.append(f"{doc.id}: not found")
+                        continue
+
+                    # Bound the renders in flight (and the PDFs held in memory)
+                    while len(pending) >= BULK_EXPORT_CONCURRENCY:
+                        await write_finished(archive)
+                        yield sink.drain()
+
+                    pending.add(asyncio.create_task(_render_cached(doc.id, doc.update_time, data)))
+
+            while pending:
+                await write_finished(archive)
+                yield sink.drain()
+
+            if skipped:
+                archive.writestr("skipped.txt", "\n".join(skipped) + "\n")
+
+        yield sink.drain()
+
+    finally:
+        # Client went away mid-stream: stop the remaining renders
+        for task in pending:
+            task.cancel()
+
+async def _render_cached(doc_id: str, update_time, data: dict):
+    """
+    Returns (doc_id, archive name, PDF bytes or None), using the PDF cache.
+    """
+    name = f"{_safe_name(data.get('filename') or 'analysis')}_{doc_id[:8]}.pdf"
+    version = pdf_cache.pdf_version(doc_id, update_time)
+    try:
+        pdf_bytes = await run_io(pdf_cache.get, version)
+        if pdf_bytes is None:
+            data = await run_io(report_store.hydrate, data)
+            pdf_bytes = await run_cpu(pdf_cache.render_pdf, data)
+            await run_io(pdf_cache.put, version, pdf_bytes)
+        return doc_id, name, pdf_bytes
+    except Exception as e:
+        print(f"Error generating PDF for {doc_id}: {e}")
+        return doc_id, name, None
+
+def _safe_name(filename: str) -> str:
+    stem = filename.rsplit(".", 1)[0]
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", stem)[:80] or "analysis"
+
+def _unique_name(name: str, used_names: set) -> str:
+    candidate, counter = name, 1
+    while candidate in used_names:
+        counter += 1
+        candidate = name.replace(".pdf", f"_{counter}.pdf")
+    used_names.add(candidate)
+    return candidate
@@ -1,17 +1,38 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from auth import verify_token
-from firebase_admin import firestore
+from services import portfolio_service, report_store, upload_service
+from utils.executors import run_io
+from utils.serialization import FastJSONResponse
 
 router = APIRouter(
     prefix="/api/history",
     tags=["history"]
 )
 
+# Page size bounds for the history listing
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+# Only the fields the list view needs; the full report comes from get_history_item
+HISTORY_LIST_FIELDS = [
+    "filename",
+    "timestamp",
+    "status",
+    "row_count",
+    "analysis_report.benford_analysis.verdict",
+    "analysis_report.spending_summary.total_volume",
+]
+
 @router.get("/")
-async def get_history(token: dict = Depends(verify_token)):
+async def get_history(
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    token: dict = Depends(verify_token)
+):
     """
-    Fetches the user's upload history from Firestore.
+    Fetches a page of the user's upload history from Firestore, newest first.
+    Pass the returned next_cursor to fetch the following page.
     """
     uid = token.get("uid")
     if not uid:
@@ -21,31 +42,11 @@ async def get_history(token: dict = Depends(verify_token)):
         )
         
     try:
-        db = firestore.client()
-        # Query uploads collection for current user
-        # Note: We removed .order_by("timestamp") to avoid needing a composite index manually created.
-        # We will sort in Python instead.
-        docs = db.collection("uploads")\
-                 .where("uid", "==", uid)\
-                 .stream()
-                 
-        history = []
-        for doc in docs:
-            data = doc.to_dict()
-            # Convert timestamp to ISO string if it exists
-            if data.get("timestamp"):
-                data["timestamp"] = data["timestamp"].isoformat()
-            
-            # Add ID
-            data["id"] = doc.id
-            history.append(data)
-            
-        # Sort in-memory (newest first)
-        # We use 'timestamp' string (ISO) for sorting, which works correctly for dates.
-        history.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-            
-        return history
+        # The Firestore queries block: run them on the I/O pool
+        return FastJSONResponse(await run_io(_history_page, uid, limit, cursor))
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching history: {e}")
         raise HTTPException(
@@ -53,10 +54,75 @@ async def get_history(token: dict = Depends(verify_token)):
             detail="Failed to fetch history"
         )
 
+def _history_page(uid: str, limit: int, cursor: str | None) -> dict:
+    from firebase_admin import firestore
+    db = firestore.client()
+    # Ordered and projected on the server. Needs the composite index
+    # uploads(uid ASC, timestamp DESC), see firestore.indexes.json.
+    query = db.collection("uploads")\
+              .where("uid", "==", uid)\
+              .order_by("timestamp", direction=firestore.Query.DESCENDING)\
+              .select(HISTORY_LIST_FIELDS)
+
+    if cursor:
+        cursor_doc = db.collection("uploads").document(cursor).get(field_paths=["uid", "timestamp"])
+        if not cursor_doc.exists or cursor_doc.get("uid") != uid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.start_after(cursor_doc)
+
+    # Fetch one extra document to know whether another page exists
+    docs = list(query.limit(limit + 1).stream())
+    
+    history = []
+    for doc in docs[:limit]:
+        data = doc.to_dict()
+        report = data.get("analysis_report") or {}
+        history.append({
+            "id": doc.id,
+            "filename": data.get("filename"),
+            # Convert timestamp to ISO string if it exists
+            "timestamp": data["timestamp"].isoformat() if data.get("timestamp") else None,
+            "status": data.get("status"),
+            "row_count": data.get("row_count"),
+            "verdict": (report.get("benford_analysis") or {}).get("verdict"),
+            "total_volume": (report.get("spending_summary") or {}).get("total_volume"),
+        })
+
+    return {
+        "items": history,
+        "next_cursor": history[-1]["id"] if len(docs) > limit else None
+    }
+
+def _get_owned_upload(doc_id: str, uid: str) -> dict:
+    """
+    Reads an uploads document (blocking), checking it exists and belongs to uid.
+    """
+    from firebase_admin import firestore
+    doc = firestore.client().collection("uploads").document(doc_id).get()
+
+    if not doc.exists:
+         raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis not found"
+        )
+        
+    data = doc.to_dict()
+    
+    # Verify ownership
+    if data.get("uid") != uid:
+         raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    return data
+
 @router.get("/{doc_id}")
 async def get_history_item(doc_id: str, token: dict = Depends(verify_token)):
     """
-    Fetches a specific upload document by ID.
+    Fetches a specific upload document by ID, with its full report.
     Ensures the document belongs to the requesting user.
     """
     uid = token.get("uid")
@@ -67,31 +133,17 @@ async def get_history_item(doc_id: str, token: dict = Depends(verify_token)):
         )
         
     try:
-        db = firestore.client()
-        doc_ref = db.collection("uploads").document(doc_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Analysis not found"
-            )
-            
-        data = doc.to_dict()
-        
-        # Verify ownership
-        if data.get("uid") != uid:
-             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied"
-            )
+        data = await run_io(_get_owned_upload, doc_id, uid)
             
+        # The document holds the report summary; load the full report
+        data = await run_io(report_store.hydrate, data)
+
         # Convert timestamp
         if data.get("timestamp"):
             data["timestamp"] = data["timestamp"].isoformat()
             
-        data["id"] = doc.id
-        return data
+        data["id"] = doc_id
+        return FastJSONResponse(data)
         
     except HTTPException:
         raise
@@ -115,24 +167,12 @@ async def delete_history_item(doc_id: str, token: dict = Depends(verify_token)):
         )
 
     try:
-        db = firestore.client()
-        doc_ref = db.collection("uploads").document(doc_id)
-        doc = doc_ref.get()
-
-        if not doc.exists:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Analysis not found"
-            )
+        data = await run_io(_get_owned_upload, doc_id, uid)
             
-        # Verify ownership
-        if doc.to_dict().get("uid") != uid:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied"
-            )
-            
-        doc_ref.delete()
+        # Removes its share from the portfolio in the same transaction
+        data = await run_io(upload_service.delete_upload, uid, doc_id) or data
+        await run_io(report_store.delete, data.get("report_blob"))
+        await run_io(report_store.delete, data.get("state_blob"))
         return {"message": "Analysis deleted successfully"}
         
     except HTTPException:
@@ -157,22 +197,12 @@ async def clear_history(token: dict = Depends(verify_token)):
         )
         
     try:
-        db = firestore.client()
-        # Batch delete is more efficient
-        batch = db.batch()
-        docs = db.collection("uploads").where("uid", "==", uid).stream()
-        
-        count = 0
-        for doc in docs:
-            batch.delete(doc.reference)
-            count += 1
-            if count >= 450: # Firestore batch limit is 500
-                 batch.commit()
-                 batch = db.batch()
-                 count = 0
-                 
-        if count > 0:
-            batch.commit()
+        # The uploads go in several batches: until the portfolio is deleted
+        # too, any read rebuilds it from what is left
+        await run_io(portfolio_service.mark_stale, uid)
+        await run_io(_delete_uploads, uid)
+        await run_io(report_store.delete_user_reports, uid)
+        await run_io(portfolio_service.delete, uid)
             
         return {"message": "History cleared successfully"}
         
@@ -182,3 +212,22 @@ async def clear_history(token: dict = Depends(verify_token)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to clear history"
         )
+
+def _delete_uploads(uid: str):
+    from firebase_admin import firestore
+    db = firestore.client()
+    # Batch delete is more efficient
+    batch = db.batch()
+    docs = db.collection("uploads").where("uid", "==", uid).stream()
+    
+    count = 0
+    for doc in docs:
+        batch.delete(doc.reference)
+        count += 1
+        if count >= 450: # Firestore batch limit is 500
+             batch.commit()
+             batch = db.batch()
+             count = 0
+             
+    if count > 0:
+        batch.commit()
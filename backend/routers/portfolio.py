@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from auth import verify_token
+from services import portfolio_service
+from utils.executors import run_io
+from utils.serialization import FastJSONResponse
+
+router = APIRouter(
+    prefix="/api/portfolio",
+    tags=["portfolio"]
+)
+
+@router.get("/")
+async def get_portfolio(refresh: bool = False, token: dict = Depends(verify_token)):
+    """
+    Returns the user's roll-up across every analysis in their history:
+    combined Benford conformity, total volume and monthly trend.
+    Served from a materialized aggregate kept up to date on upload, append
+    and delete; refresh=true recomputes it from the uploads.
+    """
+    uid = token.get("uid")
+    if not uid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid user token"
+        )
+
+    try:
+        portfolio = await run_io(portfolio_service.get_portfolio, uid, refresh)
+        return FastJSONResponse(portfolio)
+    except Exception as e:
+        print(f"Error fetching portfolio: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch portfolio"
+        )
@@ -0,0 +1,184 @@
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+from utils import timing
+
+# Global budget of upload bytes analysed at once. Each analysis holds its
+# upload's size (at least ADMISSION_MIN_WEIGHT_BYTES, at most the whole
+# budget), so a few large uploads or many small ones fit, not both.
+ADMISSION_BUDGET_BYTES = int(os.getenv("ADMISSION_BUDGET_BYTES", str(1024 * 1024 * 1024)))
+ADMISSION_MIN_WEIGHT_BYTES = int(os.getenv("ADMISSION_MIN_WEIGHT_BYTES", str(1024 * 1024)))
+# Requests waiting for budget, at most, and how long each may wait; past
+# either, the request is refused with 429 and Retry-After ADMISSION_RETRY_AFTER.
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "10"))
+# Per-user token bucket: analysis requests per minute, and the burst allowed
+# on top (0 disables the limit).
+USER_RATE_PER_MINUTE = float(os.getenv("USER_RATE_PER_MINUTE", "30"))
+USER_BURST = int(os.getenv("USER_BURST", "10"))
+# Users tracked before idle (full) buckets are dropped
+MAX_TRACKED_USERS = 10000
+
+REJECT_REASONS = ("rate_limited", "queue_full", "queue_timeout")
+
+# All state lives on the event loop, so it needs no locks
+_in_use = 0
+_waiters = deque()  # [weight, future], first come first served
+_buckets = {}  # uid -> (tokens, updated)
+_stats = {"admitted": 0, "queued": 0, **{reason: 0 for reason in REJECT_REASONS}}
+
+def check_rate(uid: str):
+    """
+    Takes a token from the user's bucket, or refuses the request with 429
+    and the seconds until the next token as Retry-After.
+    """
+    if USER_RATE_PER_MINUTE <= 0:
+        return
+    now = time.monotonic()
+    rate = USER_RATE_PER_MINUTE / 60
+    tokens, updated = _buckets.get(uid, (USER_BURST, now))
+    tokens = min(USER_BURST, tokens + (now - updated) * rate)
+    if tokens < 1:
+        _reject("rate_limited", "Too many analysis requests, please slow down", math.ceil((1 - tokens) / rate))
+
+    _buckets[uid] = (tokens - 1, now)
+    if len(_buckets) > MAX_TRACKED_USERS:
+        _evict_full_buckets(now, rate)
+
+def refund(uid: str):
+    """
+    Hands back the token check_rate took, for a request refused before it
+    was analysed.
+    """
+    if USER_RATE_PER_MINUTE <= 0 or uid not in _buckets:
+        return
+    tokens, updated = _buckets[uid]
+    _buckets[uid] = (min(USER_BURST, tokens + 1), updated)
+
+@asynccontextmanager
+async def reserve(size: int, timeout: float | None = ADMISSION_QUEUE_TIMEOUT, uid: str | None = None):
+    """
+    Holds `size` bytes of the global budget for the duration of the block,
+    waiting in line while the budget is used up. Raises 429 if the queue is
+    full or the wait exceeds timeout, refunding uid's rate token. timeout=None
+    (background jobs, which have their own queue) waits as long as it takes
+    and ignores the queue bound.
+    """
+    weight = min(max(size, ADMISSION_MIN_WEIGHT_BYTES), ADMISSION_BUDGET_BYTES)
+    with timing.stage("admission"):
+        try:
+            await _acquire(weight, timeout)
+        except HTTPException:
+            if uid is not None:
+                refund(uid)
+            raise
+    try:
+        yield
+    finally:
+        _release(weight)
+
+async def _acquire(weight: int, timeout: float | None):
+    global _in_use
+
+    if not _waiters and _in_use + weight <= ADMISSION_BUDGET_BYTES:
+        _in_use += weight
+        _stats["admitted"] += 1
+        return
+    if timeout is not None and len(_waiters) >= ADMISSION_QUEUE_SIZE:
+        _reject("queue_full", "Server is busy, please retry later", ADMISSION_RETRY_AFTER)
+
+    entry = [weight, asyncio.get_running_loop().create_future()]
+    _waiters.append(entry)
+    _stats["queued"] += 1
+    try:
+        await asyncio.wait_for(entry[1], timeout)
+    except BaseException as e:
+        if entry[1].done() and not entry[1].cancelled():
+            # Granted just as the wait ended: hand the budget back
+            _release(weight)
+        else:
+            entry[1].cancel()
+            if entry in _waiters:
+                _waiters.remove(entry)
+            # Waiters behind this one may fit now
+            _grant()
+        if isinstance(e, asyncio.TimeoutError):
+            _reject("queue_timeout", "Server is busy, please retry later", ADMISSION_RETRY_AFTER)
+        raise
+    _stats["admitted"] += 1
+
+def _release(weight: int):
+    global _in_use
+    _in_use -= weight
+    _grant()
+
+def _grant():
+    """
+    Admits waiters from the head of the queue while their weight fits.
+    """
+    global _in_use
+    while _waiters:
+        weight, future = _waiters[0]
+        if future.done():
+            _waiters.popleft()
+            continue
+        if _in_use + weight > ADMISSION_BUDGET_BYTES:
+            break
+        _waiters.popleft()
+        _in_use += weight
+        future.set_result(None)
+
+def _reject(reason: str, detail: str, retry_after: int):
+    _stats[reason] += 1
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, retry_after))}
+    )
+
+def _evict_full_buckets(now: float, rate: float):
+    for uid in [uid for uid, (tokens, updated) in _buckets.items()
+                if tokens + (now - updated) * rate >= USER_BURST]:
+        del _buckets[uid]
+
+def get_stats() -> dict:
+    """
+    Budget in use, queue depth and the admitted/queued/rejected counters.
+    """
+    return {
+        **_stats,
+        "in_use_bytes": _in_use,
+        "budget_bytes": ADMISSION_BUDGET_BYTES,
+        "queue_depth": len(_waiters),
+        "tracked_users": len(_buckets),
+    }
+
+def render_metrics() -> str:
+    """
+    The admission gauges and counters in Prometheus text format.
+    """
+    stats = get_stats()
+    lines = [
+        "# HELP finanalysis_admission_budget_bytes Upload bytes that may be analysed at once.",
+        "# TYPE finanalysis_admission_budget_bytes gauge",
+        f"finanalysis_admission_budget_bytes {stats['budget_bytes']}",
+        "# HELP finanalysis_admission_in_use_bytes Upload bytes being analysed.",
+        "# TYPE finanalysis_admission_in_use_bytes gauge",
+        f"finanalysis_admission_in_use_bytes {stats['in_use_bytes']}",
+        "# HELP finanalysis_admission_queue_depth Analyses waiting for budget.",
+        "# TYPE finanalysis_admission_queue_depth gauge",
+        f"finanalysis_admission_queue_depth {stats['queue_depth']}",
+        "# HELP finanalysis_admission_requests_total Analyses admitted, and how many of them had to wait.",
+        "# TYPE finanalysis_admission_requests_total counter",
+        f'finanalysis_admission_requests_total{{result="admitted"}} {stats["admitted"]}',
+        f'finanalysis_admission_requests_total{{result="queued"}} {stats["queued"]}',
+        "# HELP finanalysis_admission_rejected_total Requests refused with 429, by reason.",
+        "# TYPE finanalysis_admission_rejected_total counter",
+    ]
+    lines += [f'finanalysis_admission_rejected_total{{reason="{reason}"}} {stats[reason]}' for reason in REJECT_REASONS]
+    return "\n".join(lines) + "\n"
@@ -1,7 +1,7 @@
 
 import os
-import google.generativeai as genai
 import json
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,6 +13,8 @@ class AIService:
             print("Warning: GEMINI_API_KEY not found in environment variables.")
             self.model = None
         else:
+            import google.generativeai as genai
+
             genai.configure(api_key=api_key)
             # gemini-2.0-flash hit quota limits (429).
             # Switching to 'gemini-flash-latest' (alias for stable 1.5-flash) for better quotas.
@@ -50,6 +52,10 @@ class AIService:
         """
         benford = data.get("benford_analysis", {})
         summary = data.get("spending_summary", {})
+        signals = [
+            f"{signal['type']}: {signal['count']} ({signal['severity']})"
+            for signal in data.get("detection_signals", []) if signal.get("severity") != "NONE"
+        ]
         
         prompt = f"""
         You are an expert Financial Forensic Auditor. Analyze the following summary of a financial dataset and provide a risk assessment.
@@ -63,6 +69,9 @@ class AIService:
         - Verdict: {benford.get('verdict', 'N/A')}
         - MAD Score: {benford.get('mad_score', 'N/A')} (Lower is better, >0.015 is suspicious)
         
+        DETECTION SIGNALS:
+        - {'; '.join(signals) if signals else 'None triggered'}
+        
         TASK:
         Provide a JSON response with the following structure (do NOT use Markdown formatting, just raw JSON):
         {{
@@ -99,4 +108,16 @@ class AIService:
                 "recommendations": ["Review full logs."]
             }
 
-ai_service = AIService()
+_ai_service = None
+_ai_service_lock = threading.Lock()
+
+def get_ai_service() -> AIService:
+    """
+    Returns the shared AIService, creating it (and loading the Gemini SDK) on first use.
+    """
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AIService()
+    return _ai_service
@@ -2,6 +2,14 @@
 import pandas as pd
 import numpy as np
 import math
+from services.date_parser import parse_dates
+
+# Bump whenever a change alters analysis results; cached reports keyed on an
+# older version are then recomputed (see services.result_cache), and stored
+# analysis states of an older version can no longer be appended to.
+ANALYSIS_VERSION = "5"
+
+_SMALLEST_NORMAL = np.finfo(np.float64).tiny
 
 def calculate_benford_stats(series: pd.Series) -> dict:
     """
@@ -14,29 +22,75 @@ def calculate_benford_stats(series: pd.Series) -> dict:
             "verdict": "Pass" | "Suspicious" | "Fail"
         }
     """
-    # 1. Clean data: Remove NaNs, zeros, and take absolute values
-    clean_series = series.dropna().abs()
-    clean_series = clean_series[clean_series > 0]
-    
-    if clean_series.empty:
-        return {"error": "No valid numeric data found for analysis"}
+    # 1. Clean data: coerce to float; non-positive and non-finite values are
+    # dropped by the digit engine below (abs is taken there)
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
 
     # 2. Extract leading digits
-    # Convert to string, take first char, convert back to int
-    leading_digits = clean_series.astype(str).str[0].astype(int)
-    
-    # Filter only 1-9 (though clean_series > 0 check usually handles this, 0.5 -> '0'?)
-    # str(0.5) is '0.5', first char '0'. Benford is usually 1-9.
-    leading_digits = leading_digits[leading_digits.between(1, 9)]
-    
-    if leading_digits.empty:
+    digit_counts = leading_digit_histogram(values)
+
+    return _benford_from_counts(digit_counts, int(digit_counts.sum()))
+
+def leading_digits(values: np.ndarray) -> np.ndarray:
+    """
+    Extracts the leading (most significant) digit of each value arithmetically.
+    Expects positive, finite, normal floats; works for sub-1 (0.57 -> 5) and
+    very large/small magnitudes alike, without building per-row strings.
+    Subnormals (below ~2.2e-308) are clipped to the smallest normal float:
+    scaling them up would overflow.
+    """
+    values = np.maximum(np.asarray(values, dtype=np.float64), _SMALLEST_NORMAL)
+    exponents = np.floor(np.log10(values))
+
+    # Scale into [1, 10). Powers of ten are exact for the exponent, so divide
+    # for e >= 0 and multiply for e < 0 to keep the rounding error to one ulp.
+    mantissa = np.where(
+        exponents >= 0,
+        values / np.power(10.0, np.maximum(exponents, 0)),
+        values * np.power(10.0, np.maximum(-exponents, 0))
+    )
+
+    # log10 can land one decade off right at powers of ten (e.g. 999.9999999999999)
+    mantissa = np.where(mantissa >= 10, mantissa / 10, mantissa)
+    mantissa = np.where(mantissa < 1, mantissa * 10, mantissa)
+
+    # Absorb representation error such as 0.3 * 10 == 2.9999999999999996: only
+    # mantissas a few ulps below an integer are snapped to it, so values with
+    # many significant digits (19999999999.5) keep their digit.
+    nearest = np.round(mantissa)
+    mantissa = np.where(np.abs(mantissa - nearest) <= 4 * np.spacing(nearest), nearest, mantissa)
+    digits = np.floor(mantissa).astype(np.int64)
+    # A mantissa snapped up to 10 is a power of ten
+    digits = np.where(digits >= 10, 1, digits)
+    return np.clip(digits, 1, 9)
+
+def leading_digit_histogram(values: np.ndarray) -> np.ndarray:
+    """
+    Returns the leading-digit counts (index = digit, 0 unused) for the
+    non-zero, finite values of a float array. Signs are ignored, and
+    subnormal magnitudes (no amount is that small) are left out.
+    """
+    values = np.abs(np.asarray(values, dtype=np.float64))
+    values = values[np.isfinite(values) & (values >= _SMALLEST_NORMAL)]
+    return np.bincount(leading_digits(values), minlength=10)[:10]
+
+def _benford_from_counts(digit_counts: np.ndarray, valid_count: int) -> dict:
+    """
+    Builds the Benford report from a leading-digit histogram (index = digit).
+    Shared by the in-memory path and the chunked accumulators.
+    """
+    if valid_count == 0:
+        return {"error": "No valid numeric data found for analysis"}
+
+    # Filter only 1-9
+    counts = np.asarray(digit_counts[1:10], dtype=np.int64)
+    total_count = int(counts.sum())
+
+    if total_count == 0:
          return {"error": "No valid leading digits (1-9) found"}
 
-    total_count = len(leading_digits)
-    
     # 3. Calculate Actual Frequencies
-    actual_counts = leading_digits.value_counts().sort_index()
-    actual_freq = (actual_counts / total_count).to_dict()
+    actual_freq = {digit: float(counts[digit - 1]) / total_count for digit in range(1, 10)}
     
     # 4. Calculate Expected Frequencies & Deviation
     distribution = {}
@@ -78,85 +132,281 @@ def calculate_benford_stats(series: pd.Series) -> dict:
         "total_rows_analyzed": total_count
     }
 
-def calculate_spending_summary(df: pd.DataFrame) -> dict:
+def calculate_spending_summary(df: pd.DataFrame, header: list | None = None) -> dict:
     """
     Calculates spending summary stats.
     Requires: 'Amount' column. Optional: 'Date', 'Category'.
+    header is the upload's original column names, keying the cached date format.
     """
-    summary = {}
-    
     if "Amount" not in df.columns:
         return {}
 
-    # 1. Total Spend (Sum of negative numbers usually, but here likely absolute if mixed? 
-    # Let's assume input is standard: Debits are negative or positive depending on bank. 
-    # For now, let's sum numeric values. If we standardized columns, Amount is typically numeric.
-    # We will compute Total Volume (Sum of Abs) and Net Flow.
-    
-    # Clean numeric
-    amounts = pd.to_numeric(df["Amount"], errors='coerce').fillna(0)
-    
-    summary["total_volume"] = float(amounts.abs().sum())
-    summary["net_flow"] = float(amounts.sum())
-    summary["transaction_count"] = int(len(df))
-    summary["avg_transaction"] = float(amounts.mean()) if not df.empty else 0
-
-    # 2. Date Range & Trend
-    if "Date" in df.columns:
-        try:
-            # Check format first? Standardizer usually handles conversion to datetime objects if possible.
-            # But standardizer just regexes names, doesn't parse content yet? 
-            # Oh, the plan said "Standardizer... Convert data types". 
-            # Let's verify standardizer.py content. 
-            # Wait, standardizer logic in `standardizer.py` (checked earlier in `view_code_item` Step 821) 
-            # only renamed columns, didn't convert types. 
-            # I should probably robustly convert to datetime here or in standardizer.
-            # Let's do it here safely.
-            dates = pd.to_datetime(df["Date"], errors='coerce')
-            valid_dates = dates.dropna()
-            
-            if not valid_dates.empty:
-                summary["date_range"] = {
-                    "start": valid_dates.min().isoformat(),
-                    "end": valid_dates.max().isoformat()
-                }
-                
-                # Monthly Trend
-                # Group by Month-Year
-                # Create a temporary dataframe for grouping
-                temp_df = pd.DataFrame({"Date": dates, "Amount": amounts})
-                temp_df = temp_df.dropna(subset=["Date"])
-                
-                # Resample or GroupBy
-                # monthly = temp_df.set_index('Date').resample('M')['Amount'].sum() # 'M' is deprecated in favor of 'ME'
-                # Let's use string formatting for safer grouping without relying on deprecated pandas aliases
-                temp_df["Month"] = temp_df["Date"].dt.strftime("%Y-%m")
-                monthly_trend = temp_df.groupby("Month")["Amount"].sum().to_dict()
-                summary["monthly_trend"] = monthly_trend
-                
-        except Exception as e:
-            print(f"Date parsing failed in summary: {e}")
-
-    # 3. Category Breakdown
-    if "Category" in df.columns:
-        # Fill NA
-        cats = df["Category"].fillna("Uncategorized").astype(str)
-        # Group by Category, sum Amounts
-        # We probably want sum of ABS amounts to see volume per category? 
-        # Or just sum? Usually sum of expenses. 
-        # If dataset has income (positive) and expense (negative), summing might cancel out.
-        # Let's assume simpler: Breakdown by Count for now, or Sum of Abs?
-        # Let's do Count and Sum.
-        
-        # We need to join with amounts
-        temp_cat = pd.DataFrame({"Category": cats, "Amount": amounts})
-        breakdown = temp_cat.groupby("Category")["Amount"].agg(['sum', 'count'])
-        
-        # Convert to simple dict usually preferred for JSON
-        # Top 5 by volume
-        breakdown["abs_sum"] = breakdown["sum"].abs()
-        top_cats = breakdown.sort_values("abs_sum", ascending=False).head(6)
-        
-        summary["top_categories"] = top_cats.drop(columns=["abs_sum"]).to_dict(orient="index")
+    accumulator = SpendingAccumulator()
+    accumulator.update(df, header)
+    return accumulator.result()
+
+def _date_template(header: list | None):
+    return tuple(header) if header is not None else None
+
+class BenfordAccumulator:
+    """
+    Folds the leading-digit histogram of an Amount column chunk by chunk.
+    Accumulators built on separate partitions combine with merge().
+    """
+    def __init__(self):
+        self.digit_counts = np.zeros(10, dtype=np.int64)
+        self.valid_count = 0
+
+    def update(self, series: pd.Series):
+        values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        counts = leading_digit_histogram(values)
+
+        self.digit_counts += counts
+        self.valid_count += int(counts.sum())
+
+    def merge(self, other: "BenfordAccumulator") -> "BenfordAccumulator":
+        self.digit_counts += other.digit_counts
+        self.valid_count += other.valid_count
+        return self
+
+    def result(self) -> dict:
+        return _benford_from_counts(self.digit_counts, self.valid_count)
+
+    def to_dict(self) -> dict:
+        return {"digit_counts": self.digit_counts.tolist(), "valid_count": self.valid_count}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BenfordAccumulator":
+        accumulator = cls()
+        accumulator.digit_counts = np.asarray(data["digit_counts"], dtype=np.int64)
+        accumulator.valid_count = int(data["valid_count"])
+        return accumulator
+
+class SpendingAccumulator:
+    """
+    Folds the spending summary (totals, date range, monthly trend and
+    category breakdown) chunk by chunk.
+    Accumulators built on separate partitions combine with merge().
+    """
+    def __init__(self):
+        self.transaction_count = 0
+        self.total_volume = 0.0
+        self.net_flow = 0.0
+        self.date_min = None
+        self.date_max = None
+        self.monthly_trend = pd.Series(dtype="float64")
+        self.categories = None
+        self.unparsed_dates = None
 
-    return summary
+    def update(self, df: pd.DataFrame, header: list | None = None):
+        """
+        Folds one chunk. Returns its parsed Date column (None without one),
+        so the detection checks don't parse the dates again.
+        header is the upload's original column names (see parse_dates).
+        """
+        dates = None
+
+        # 1. Total Spend
+        # We compute Total Volume (Sum of Abs) and Net Flow.
+        # Clean numeric
+        # As NumPy floats: Arrow-backed columns keep coerced NaN apart from nulls
+        amounts = pd.Series(
+            pd.to_numeric(df["Amount"], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan),
+            index=df.index
+        ).fillna(0)
+
+        self.total_volume += float(amounts.abs().sum())
+        self.net_flow += float(amounts.sum())
+        self.transaction_count += int(len(df))
+
+        # 2. Date Range & Trend
+        if "Date" in df.columns:
+            try:
+                # The standardizer only renames columns, so convert to datetime here.
+                # The inferred format is cached per original header, so later
+                # chunks and later uploads of the same layout skip inference
+                # (the standardized names are the same for every layout).
+                dates, unparsed = parse_dates(df["Date"], template=_date_template(header))
+                self.unparsed_dates = (self.unparsed_dates or 0) + unparsed
+                valid_dates = dates.dropna()
+
+                if not valid_dates.empty:
+                    self._update_date_range(valid_dates.min(), valid_dates.max())
+
+                    # Monthly Trend
+                    # Group by Month-Year without relying on deprecated pandas
+                    # aliases ('M' vs 'ME')
+                    temp_df = pd.DataFrame({"Date": dates, "Amount": amounts})
+                    temp_df = temp_df.dropna(subset=["Date"])
+                    # Integer yyyymm keys; only the distinct months are formatted
+                    temp_df["Month"] = temp_df["Date"].dt.year * 100 + temp_df["Date"].dt.month
+                    monthly = temp_df.groupby("Month")["Amount"].sum()
+                    monthly.index = [f"{month // 100:04d}-{month % 100:02d}" for month in monthly.index]
+                    self.monthly_trend = self.monthly_trend.add(monthly, fill_value=0)
+
+            except Exception as e:
+                print(f"Date parsing failed in summary: {e}")
+                dates = None
+
+        # 3. Category Breakdown
+        if "Category" in df.columns:
+            cats = df["Category"]
+            if isinstance(cats.dtype, pd.CategoricalDtype):
+                # Read as categorical: group on the codes, label as strings
+                cats = cats.cat.rename_categories(cats.cat.categories.astype(str))
+                if cats.isna().any() and "Uncategorized" not in cats.cat.categories:
+                    cats = cats.cat.add_categories(["Uncategorized"])
+                cats = cats.fillna("Uncategorized")
+            else:
+                # Fill NA
+                cats = cats.fillna("Uncategorized").astype(str)
+            # Count and Sum per category. Summing signed amounts can cancel out
+            # income against expenses, so the ranking below uses the abs of the sum.
+            temp_cat = pd.DataFrame({"Category": cats, "Amount": amounts})
+            breakdown = temp_cat.groupby("Category", observed=True)["Amount"].agg(['sum', 'count'])
+            breakdown.index = breakdown.index.astype(str)
+
+            self._update_categories(breakdown)
+
+        return dates
+
+    def merge(self, other: "SpendingAccumulator") -> "SpendingAccumulator":
+        self.transaction_count += other.transaction_count
+        self.total_volume += other.total_volume
+        self.net_flow += other.net_flow
+
+        if other.date_min is not None:
+            self._update_date_range(other.date_min, other.date_max)
+        self.monthly_trend = self.monthly_trend.add(other.monthly_trend, fill_value=0)
+
+        if other.categories is not None:
+            self._update_categories(other.categories)
+        if other.unparsed_dates is not None:
+            self.unparsed_dates = (self.unparsed_dates or 0) + other.unparsed_dates
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "transaction_count": self.transaction_count,
+            "total_volume": self.total_volume,
+            "net_flow": self.net_flow,
+            "date_min": self.date_min.isoformat() if self.date_min is not None else None,
+            "date_max": self.date_max.isoformat() if self.date_max is not None else None,
+            "monthly_trend": {month: float(total) for month, total in self.monthly_trend.items()},
+            "categories": {
+                "index": self.categories.index.tolist(),
+                "sum": self.categories["sum"].astype(float).tolist(),
+                "count": self.categories["count"].astype(float).tolist()
+            } if self.categories is not None else None,
+            "unparsed_dates": self.unparsed_dates
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SpendingAccumulator":
+        accumulator = cls()
+        accumulator.transaction_count = int(data["transaction_count"])
+        accumulator.total_volume = float(data["total_volume"])
+        accumulator.net_flow = float(data["net_flow"])
+        if data["date_min"] is not None:
+            accumulator.date_min = pd.Timestamp(data["date_min"])
+            accumulator.date_max = pd.Timestamp(data["date_max"])
+        accumulator.monthly_trend = pd.Series(data["monthly_trend"], dtype="float64")
+        categories = data["categories"]
+        if categories is not None:
+            accumulator.categories = pd.DataFrame(
+                {"sum": categories["sum"], "count": categories["count"]},
+                index=pd.Index(categories["index"], dtype=object, name="Category")
+            )
+        accumulator.unparsed_dates = data["unparsed_dates"]
+        return accumulator
+
+    def _update_date_range(self, start, end):
+        self.date_min = start if self.date_min is None else min(self.date_min, start)
+        self.date_max = end if self.date_max is None else max(self.date_max, end)
+
+    def _update_categories(self, breakdown: pd.DataFrame):
+        if self.categories is None:
+            self.categories = breakdown
+        else:
+            self.categories = self.categories.add(breakdown, fill_value=0)
+
+    def result(self) -> dict:
+        summary = {}
+
+        summary["total_volume"] = self.total_volume
+        summary["net_flow"] = self.net_flow
+        summary["transaction_count"] = self.transaction_count
+        summary["avg_transaction"] = self.net_flow / self.transaction_count if self.transaction_count else 0
+
+        if self.date_min is not None:
+            summary["date_range"] = {
+                "start": self.date_min.isoformat(),
+                "end": self.date_max.isoformat()
+            }
+            summary["monthly_trend"] = self.monthly_trend.sort_index().to_dict()
+
+        if self.unparsed_dates is not None:
+            # Non-empty Date values that no format could parse
+            summary["unparsed_dates"] = self.unparsed_dates
+
+        if self.categories is not None:
+            breakdown = self.categories.copy()
+            breakdown["count"] = breakdown["count"].astype("int64")
+
+            # Top 6 by volume
+            breakdown["abs_sum"] = breakdown["sum"].abs()
+            top_cats = breakdown.sort_values("abs_sum", ascending=False).head(6)
+
+            summary["top_categories"] = top_cats.drop(columns=["abs_sum"]).to_dict(orient="index")
+
+        return summary
+
+def dump_state(benford_acc: BenfordAccumulator, spending_acc: SpendingAccumulator, detection_acc) -> dict:
+    """
+    The sufficient statistics of an analysis (JSON-serializable), from which
+    the report can be rebuilt and new rows merged in (see merge_states).
+    Its size is bounded, whatever the size of the file.
+    """
+    return {
+        "analysis_version": ANALYSIS_VERSION,
+        "benford": benford_acc.to_dict(),
+        "spending": spending_acc.to_dict(),
+        "detection": detection_acc.to_dict()
+    }
+
+def load_state(state: dict) -> tuple:
+    """
+    Rebuilds the (benford, spending, detection) accumulators of a dumped state.
+    """
+    from services.detection_engine import DetectionAccumulator
+
+    return (
+        BenfordAccumulator.from_dict(state["benford"]),
+        SpendingAccumulator.from_dict(state["spending"]),
+        DetectionAccumulator.from_dict(state["detection"])
+    )
+
+def merge_states(base: dict, batch: dict) -> dict:
+    """
+    Merges the state of a new batch of rows into a stored state; the batch's
+    rows come after the base's. Raises ValueError for states of another
+    ANALYSIS_VERSION.
+    """
+    for state in (base, batch):
+        if state.get("analysis_version") != ANALYSIS_VERSION:
+            raise ValueError(f"Analysis state version {state.get('analysis_version')} is not {ANALYSIS_VERSION}")
+    accumulators = load_state(base)
+    for accumulator, other in zip(accumulators, load_state(batch)):
+        accumulator.merge(other)
+    return dump_state(*accumulators)
+
+def report_from_state(state: dict) -> dict:
+    """
+    The analysis report (Benford, spending summary, detection) of a dumped state.
+    """
+    benford_acc, spending_acc, detection_acc = load_state(state)
+    return {
+        "benford_analysis": benford_acc.result(),
+        "spending_summary": spending_acc.result(),
+        **detection_acc.result()
+    }
@@ -0,0 +1,138 @@
+
+import io
+from contextlib import contextmanager
+import pandas as pd
+
+# Bytes per record batch when streaming a CSV through Arrow
+ARROW_BLOCK_BYTES = 16 * 1024 * 1024
+
+def available() -> bool:
+    """
+    True when pyarrow is installed (it is an optional dependency).
+    """
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def read_csv(source, read_options: dict) -> pd.DataFrame:
+    """
+    Reads the selected CSV columns with Arrow's multi-threaded reader.
+    read_options is the usecols/dtype dict built for pandas.read_csv.
+    """
+    from pyarrow import csv
+
+    with _arrow_errors():
+        table = csv.read_csv(
+            _as_input(source),
+            parse_options=_parse_options(),
+            convert_options=_convert_options(read_options)
+        )
+    return to_pandas(table)
+
+def iter_csv(source, read_options: dict):
+    """
+    Streams the selected CSV columns as DataFrames of about ARROW_BLOCK_BYTES of input each.
+    """
+    from pyarrow import csv
+
+    with _arrow_errors():
+        reader = csv.open_csv(
+            _as_input(source),
+            read_options=csv.ReadOptions(block_size=ARROW_BLOCK_BYTES),
+            parse_options=_parse_options(),
+            convert_options=_convert_options(read_options)
+        )
+        for batch in reader:
+            yield to_pandas(batch)
+
+def read_head(stream, kind: str, rows: int = 5) -> pd.DataFrame:
+    """
+    Returns the first rows of a Parquet or Feather file, all columns, as plain pandas dtypes.
+    """
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    start = stream.tell()
+    with _arrow_errors():
+        if kind == "parquet":
+            batch = next(pyarrow.parquet.ParquetFile(stream).iter_batches(batch_size=rows), None)
+        else:
+            reader = pyarrow.ipc.open_file(stream)
+            batch = reader.get_batch(0) if reader.num_record_batches else None
+    stream.seek(start)
+
+    if batch is None:
+        return pd.DataFrame()
+    return batch.slice(0, rows).to_pandas()
+
+def read_columns(stream, kind: str, columns: list) -> pd.DataFrame:
+    """
+    Reads only `columns` of a Parquet or Feather file, as Arrow-backed columns.
+    """
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    with _arrow_errors():
+        if kind == "parquet":
+            table = pyarrow.parquet.read_table(stream, columns=columns)
+        else:
+            table = pyarrow.feather.read_table(stream, columns=columns)
+    return to_pandas(table)
+
+def to_pandas(table) -> pd.DataFrame:
+    """
+    Wraps Arrow data in a DataFrame without converting it to NumPy: columns
+    are ArrowDtype, except dictionary columns, which become categoricals.
+    """
+    import pyarrow as pa
+
+    return table.to_pandas(types_mapper=lambda t: None if pa.types.is_dictionary(t) else pd.ArrowDtype(t))
+
+@contextmanager
+def _arrow_errors():
+    """
+    Raises malformed input as pandas' ParserError, like the pandas reader.
+    Value conversion errors stay ValueErrors, so callers can retry the
+    column as text.
+    """
+    import pyarrow as pa
+
+    try:
+        yield
+    except pa.ArrowInvalid as e:
+        if "conversion error" in str(e):
+            raise
+        raise pd.errors.ParserError(str(e)) from e
+    except pa.ArrowException as e:
+        raise pd.errors.ParserError(str(e)) from e
+
+def _as_input(source):
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    return source
+
+def _parse_options():
+    from pyarrow import csv
+
+    # Quoted fields may contain newlines, as with the pandas reader
+    return csv.ParseOptions(newlines_in_values=True)
+
+def _convert_options(read_options: dict):
+    import pyarrow as pa
+    from pyarrow import csv
+
+    # Every column gets an explicit type, so a stray value in a later block
+    # can't contradict a type inferred from the first one
+    types = {
+        "float64": pa.float64(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+    }
+    dtype = read_options.get("dtype") or {}
+    return csv.ConvertOptions(
+        include_columns=read_options["usecols"],
+        column_types={col: types.get(dtype.get(col), pa.string()) for col in read_options["usecols"]},
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False
+    )
@@ -0,0 +1,154 @@
+
+import os
+import threading
+import warnings
+from collections import OrderedDict
+import pandas as pd
+
+# Rows sampled to infer a column's date format, the share of a sample a
+# cached format must parse to be reused, and how many header templates keep
+# their inferred format.
+DATE_SAMPLE_ROWS = int(os.getenv("DATE_SAMPLE_ROWS", "200"))
+DATE_FORMAT_MIN_HIT_RATE = 0.9
+DATE_FORMAT_CACHE_SIZE = int(os.getenv("DATE_FORMAT_CACHE_SIZE", "1024"))
+
+# Tried in order when inferring; month-first before day-first, like pandas' default
+CANDIDATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m/%d/%Y %H:%M",
+    "%d/%m/%Y %H:%M",
+    "%m/%d/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%m/%d/%y",
+    "%d/%m/%y",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%d-%b-%Y",
+    "%d %b %Y",
+    "%d-%b-%y",
+    "%b %d, %Y",
+    "%d %B %Y",
+    "%B %d, %Y",
+    "%Y%m%d",
+]
+
+_formats = OrderedDict()  # header template -> inferred format
+_formats_lock = threading.Lock()
+
+def parse_dates(values: pd.Series, template=None) -> tuple[pd.Series, int]:
+    """
+    Converts a date column to datetimes.
+    The format is inferred from a sample (or reused from an earlier file with
+    the same header template) and applied to the whole column at once; only
+    the rows it can't parse are parsed one by one.
+    Returns the datetimes (NaT where unparseable) and the number of
+    non-empty values that could not be parsed.
+    """
+    if not (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+        # Already datetimes (Excel) or numbers: nothing to infer
+        dates = pd.to_datetime(values, errors="coerce")
+        return dates, int((dates.isna() & values.notna()).sum())
+
+    text = values.astype("string").str.strip()
+    present = text.notna() & (text != "")
+    if not present.any():
+        return pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]"), 0
+
+    text = text.where(present)
+    sample = _sample(text[present])
+    date_format = _cached_format(template)
+    if date_format is None or _hit_rate(sample, date_format) < DATE_FORMAT_MIN_HIT_RATE:
+        date_format = infer_format(sample)
+
+    if date_format is None:
+        dates = _parse_each(text)
+        return dates, int((present & dates.isna()).sum())
+
+    dates = pd.to_datetime(text, format=date_format, errors="coerce")
+    failed = present & dates.isna()
+    if failed.sum() > (1 - DATE_FORMAT_MIN_HIT_RATE) * present.sum():
+        # The sample was ambiguous (e.g. only days <= 12): infer again from
+        # the rows that failed, and keep whichever format parses more
+        retry_format = infer_format(_sample(text[failed]))
+        if retry_format is not None and retry_format != date_format:
+            retry = pd.to_datetime(text, format=retry_format, errors="coerce")
+            if retry.notna().sum() > dates.notna().sum():
+                date_format, dates = retry_format, retry
+                failed = present & dates.isna()
+    _remember_format(template, date_format)
+
+    if failed.any():
+        fallback = _parse_each(text[failed])
+        try:
+            dates = dates.copy()
+            dates[failed] = fallback
+        except (TypeError, ValueError):
+            # e.g. timezone-aware stragglers in a naive column: leave them unparsed
+            pass
+    return dates, int((present & dates.isna()).sum())
+
+def infer_format(sample: pd.Series) -> str | None:
+    """
+    Returns the format that parses the most sample values (pandas' guesses,
+    then CANDIDATE_FORMATS order on ties), or None if none parses any.
+    """
+    from pandas.tseries.api import guess_datetime_format
+
+    candidates = list(CANDIDATE_FORMATS)
+    # pandas' own guess for a few values covers layouts not listed above
+    for value in sample.iloc[::max(1, len(sample) // 5)]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            guessed = guess_datetime_format(value)
+        if guessed and guessed not in candidates:
+            candidates.insert(0, guessed)
+
+    best_format, best_hits = None, 0
+    for date_format in candidates:
+        hits = int(pd.to_datetime(sample, format=date_format, errors="coerce").notna().sum())
+        if hits > best_hits:
+            best_format, best_hits = date_format, hits
+            if hits == len(sample):
+                break
+    return best_format
+
+def _sample(text: pd.Series) -> pd.Series:
+    # Evenly spaced rather than the first rows, which often share one day
+    step = max(1, len(text) // DATE_SAMPLE_ROWS)
+    return text.iloc[::step].head(DATE_SAMPLE_ROWS)
+
+def _hit_rate(sample: pd.Series, date_format: str) -> float:
+    return float(pd.to_datetime(sample, format=date_format, errors="coerce").notna().mean())
+
+def _parse_each(text: pd.Series) -> pd.Series:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        try:
+            return pd.to_datetime(text, format="mixed", errors="coerce")
+        except (TypeError, ValueError):
+            return pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+
+def _cached_format(template) -> str | None:
+    if template is None:
+        return None
+    with _formats_lock:
+        date_format = _formats.get(template)
+        if date_format is not None:
+            _formats.move_to_end(template)
+        return date_format
+
+def _remember_format(template, date_format: str):
+    if template is None:
+        return
+    with _formats_lock:
+        _formats[template] = date_format
+        _formats.move_to_end(template)
+        while len(_formats) > DATE_FORMAT_CACHE_SIZE:
+            _formats.popitem(last=False)
@@ -0,0 +1,514 @@
+
+import numpy as np
+import pandas as pd
+
+# Per-row flags, combined as a bitmask (see flag_names)
+FLAG_OUTLIER = 1
+FLAG_REPEATED_AMOUNT = 2
+FLAG_VENDOR_CONCENTRATION = 4
+FLAG_ROUND_NUMBER = 8
+FLAG_WEEKEND = 16
+
+FLAG_LABELS = {
+    FLAG_OUTLIER: "OUTLIER",
+    FLAG_REPEATED_AMOUNT: "REPEATED_AMOUNT",
+    FLAG_VENDOR_CONCENTRATION: "VENDOR_CONCENTRATION",
+    FLAG_ROUND_NUMBER: "LARGE_ROUND_NUMBER",
+    FLAG_WEEKEND: "WEEKEND",
+}
+
+# Ranking weight of each flag in suspicious_transactions (ties: larger |z| first)
+FLAG_WEIGHTS = {
+    FLAG_OUTLIER: 4,
+    FLAG_REPEATED_AMOUNT: 2,
+    FLAG_ROUND_NUMBER: 2,
+    FLAG_VENDOR_CONCENTRATION: 1,
+    FLAG_WEEKEND: 1,
+}
+
+# Thresholds from the PRD's forensic checks
+OUTLIER_Z_SCORE = 3.0
+# An amount is "repeated" when it occurs at least this often and well above
+# the count expected if amounts were spread evenly (mean + 3 sd, Poisson)
+REPEATED_AMOUNT_MIN_COUNT = 5
+VENDOR_CONCENTRATION_SHARE = 0.4
+# Amounts >= ROUND_NUMBER_MIN ending in 00; about 1 in 100 whole amounts do
+# by chance, and the check fires at ROUND_NUMBER_BIAS_RATIO times that
+ROUND_NUMBER_MIN = 100
+ROUND_NUMBER_EXPECTED_SHARE = 0.01
+ROUND_NUMBER_BIAS_RATIO = 3.0
+ROUND_NUMBER_MIN_COUNT = 5
+# 2 of 7 days fall on a weekend; the share of weekend rows is graded by its
+# binomial z-score over that baseline
+WEEKEND_EXPECTED_SHARE = 2 / 7
+WEEKEND_Z_MEDIUM = 3.0
+WEEKEND_Z_HIGH = 5.0
+
+# A check flags rows only when its signal is graded this severe
+FLAGGING_SEVERITIES = ("MEDIUM", "HIGH")
+
+# Detection state is bounded, whatever the size of the file; the summaries
+# below are deliberately approximate past their caps.
+# Distinct amounts counted, at most. Past that the counts are a Misra-Gries
+# summary: each undercounts by at most rows / AMOUNT_COUNTS_MAX, and every
+# amount occurring more often than that is kept.
+AMOUNT_COUNTS_MAX = 50_000
+# Hashes kept to estimate how many distinct amounts there are (k minimum
+# values): exact below this many, within about 3% above.
+DISTINCT_SKETCH_SIZE = 1024
+# Outliers are counted on amounts bucketed to this relative width (0.1%),
+# so the count is off only for amounts within 0.05% of the 3 sd bound.
+OUTLIER_BIN_WIDTH = 0.001
+
+SUSPICIOUS_TRANSACTIONS_LIMIT = 10
+# Candidate rows kept per flag while folding (see _pick_candidates)
+_CANDIDATES_PER_FLAG = SUSPICIOUS_TRANSACTIONS_LIMIT * 5
+
+def flag_names(flags: int) -> list[str]:
+    """
+    Returns the labels of the flags set in a bitmask.
+    """
+    return [label for flag, label in FLAG_LABELS.items() if flags & flag]
+
+def detect_anomalies(df: pd.DataFrame, dates: pd.Series | None = None, header: list | None = None) -> dict:
+    """
+    Runs the forensic checks on a fully loaded, standardized DataFrame.
+    Requires: 'Amount' column. Optional: 'Date' (or its parsed `dates`), 'Vendor'.
+    header is the upload's original column names, keying the cached date format.
+    """
+    accumulator = DetectionAccumulator()
+    accumulator.update(df, dates, header)
+    return accumulator.result()
+
+class DetectionAccumulator:
+    """
+    Folds the forensic checks (outliers, repeated amounts, vendor
+    concentration, round numbers, weekend activity) chunk by chunk into
+    bounded, mergeable summaries: running moments of the amounts, log-scale
+    amount buckets for outliers, capped amount counts and a distinct-amount
+    sketch for repeats, plain counters for the rest. suspicious_transactions
+    is ranked from bounded pools of candidate rows, one per flag, that could
+    carry that flag. Repeated amounts and concentrated vendors are judged on
+    the counts folded so far, so their pools start at the chunk where an
+    amount or vendor qualifies.
+    Accumulators built on separate partitions combine with merge(), in file order.
+    """
+    def __init__(self):
+        self.row_count = 0
+        self.valid_count = 0
+        self.amount_mean = 0.0
+        self.amount_m2 = 0.0  # sum of squared deviations from the mean
+        self.amount_bins = pd.Series(dtype="int64")  # bucket (see _amount_bins) -> occurrences
+        self.amount_counts = pd.Series(dtype="int64")  # amount -> occurrences (capped, see AMOUNT_COUNTS_MAX)
+        self.amount_hashes = np.empty(0, dtype=np.uint64)  # smallest hashes of the distinct amounts
+        self.round_rows = 0
+        self.round_eligible_rows = 0  # amounts >= ROUND_NUMBER_MIN
+        self.dated_rows = 0
+        self.weekend_rows = 0
+        self.vendor_totals = None  # vendor -> sum of |amount|
+        self.candidates = {}  # flag -> candidate rows, in file order
+
+    def update(self, df: pd.DataFrame, dates: pd.Series | None = None, header: list | None = None):
+        amounts = pd.to_numeric(df["Amount"], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = np.isfinite(amounts)
+
+        # + 0.0 makes -0.0 the same amount as 0.0
+        values = amounts[valid] + 0.0
+        if len(values):
+            mean = float(values.mean())
+            self._update_moments(len(values), mean, float(((values - mean) ** 2).sum()))
+        self._update_bins(pd.Series(_amount_bins(values)).value_counts(sort=False))
+        self._update_counts(pd.Series(values).value_counts(sort=False))
+        self._update_hashes(np.unique(pd.util.hash_array(values)))
+        self.round_rows += int(_round_mask(values).sum())
+        self.round_eligible_rows += int((np.abs(values) >= ROUND_NUMBER_MIN).sum())
+
+        weekend = np.zeros(len(df), dtype=bool)
+        if dates is None and "Date" in df.columns:
+            from services.date_parser import parse_dates
+            dates, _ = parse_dates(df["Date"], template=tuple(header) if header is not None else None)
+        if dates is not None:
+            weekend = _weekend_mask(dates)
+            self.dated_rows += int(dates.notna().sum())
+            self.weekend_rows += int(weekend.sum())
+
+        vendors = None
+        if "Vendor" in df.columns:
+            vendors = df["Vendor"]
+            if isinstance(vendors.dtype, pd.CategoricalDtype):
+                vendors = vendors.cat.rename_categories(vendors.cat.categories.astype(str))
+            temp = pd.DataFrame({"Vendor": vendors, "Amount": np.abs(np.where(valid, amounts, 0.0))})
+            totals = temp.groupby("Vendor", observed=True)["Amount"].sum()
+            totals.index = totals.index.astype(str)
+            self._update_vendors(totals)
+
+        # Rows that could carry each flag, judged on what is known so far
+        eligible = {
+            FLAG_OUTLIER: valid,
+            FLAG_REPEATED_AMOUNT: valid & (self._running_counts(amounts) >= REPEATED_AMOUNT_MIN_COUNT),
+            FLAG_ROUND_NUMBER: _round_mask(amounts),
+            FLAG_WEEKEND: valid & weekend,
+        }
+        if vendors is not None:
+            totals = self.vendor_totals
+            concentrated = totals.index[totals > VENDOR_CONCENTRATION_SHARE * totals.sum()]
+            eligible[FLAG_VENDOR_CONCENTRATION] = valid & vendors.astype(str).isin(concentrated).to_numpy()
+
+        for flag, mask in eligible.items():
+            positions = np.flatnonzero(mask)
+            positions = positions[_pick_candidates(flag, amounts[positions], weekend[positions])]
+            if len(positions):
+                self._update_candidates(flag, pd.DataFrame({
+                    "row": positions + self.row_count + 1,
+                    "amount": amounts[positions],
+                    "date": dates.iloc[positions].to_numpy() if dates is not None else pd.NaT,
+                    "vendor": vendors.iloc[positions].astype(object).to_numpy() if vendors is not None else None,
+                    "weekend": weekend[positions],
+                }))
+        self.row_count += len(df)
+
+    def merge(self, other: "DetectionAccumulator") -> "DetectionAccumulator":
+        self._update_moments(other.valid_count, other.amount_mean, other.amount_m2)
+        self._update_bins(other.amount_bins)
+        self._update_counts(other.amount_counts)
+        self._update_hashes(other.amount_hashes)
+        self.round_rows += other.round_rows
+        self.round_eligible_rows += other.round_eligible_rows
+        self.dated_rows += other.dated_rows
+        self.weekend_rows += other.weekend_rows
+        if other.vendor_totals is not None:
+            self._update_vendors(other.vendor_totals)
+        for flag, candidates in other.candidates.items():
+            # The other partition's rows come after ours
+            shifted = candidates.copy()
+            shifted["row"] += self.row_count
+            self._update_candidates(flag, shifted)
+        self.row_count += other.row_count
+        return self
+
+    def to_dict(self) -> dict:
+        candidates = {}
+        for flag, pool in self.candidates.items():
+            dates = pd.to_datetime(pool["date"])
+            candidates[FLAG_LABELS[flag]] = {
+                "row": pool["row"].astype("int64").tolist(),
+                "amount": pool["amount"].tolist(),
+                "date": [None if pd.isna(date) else date.isoformat() for date in dates],
+                "vendor": [None if pd.isna(vendor) else str(vendor) for vendor in pool["vendor"]],
+                "weekend": pool["weekend"].astype(bool).tolist(),
+            }
+        return {
+            "row_count": self.row_count,
+            "valid_count": self.valid_count,
+            "amount_mean": self.amount_mean,
+            "amount_m2": self.amount_m2,
+            # Parallel lists: each bucket / counted amount and how often it occurs
+            "amount_bins": self.amount_bins.index.astype("int64").tolist(),
+            "amount_bin_counts": self.amount_bins.astype("int64").tolist(),
+            "amounts": self.amount_counts.index.astype("float64").tolist(),
+            "amount_counts": self.amount_counts.astype("int64").tolist(),
+            "amount_hashes": self.amount_hashes.tolist(),
+            "round_rows": self.round_rows,
+            "round_eligible_rows": self.round_eligible_rows,
+            "dated_rows": self.dated_rows,
+            "weekend_rows": self.weekend_rows,
+            "vendor_totals": {vendor: float(total) for vendor, total in self.vendor_totals.items()}
+                             if self.vendor_totals is not None else None,
+            "candidates": candidates
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DetectionAccumulator":
+        accumulator = cls()
+        accumulator.row_count = int(data["row_count"])
+        accumulator.valid_count = int(data["valid_count"])
+        accumulator.amount_mean = float(data["amount_mean"])
+        accumulator.amount_m2 = float(data["amount_m2"])
+        accumulator.amount_bins = pd.Series(
+            data["amount_bin_counts"], index=pd.Index(data["amount_bins"], dtype="int64"), dtype="int64"
+        )
+        accumulator.amount_counts = pd.Series(
+            data["amount_counts"], index=pd.Index(data["amounts"], dtype="float64"), dtype="int64"
+        )
+        accumulator.amount_hashes = np.array(data["amount_hashes"], dtype=np.uint64)
+        accumulator.round_rows = int(data["round_rows"])
+        accumulator.round_eligible_rows = int(data["round_eligible_rows"])
+        accumulator.dated_rows = int(data["dated_rows"])
+        accumulator.weekend_rows = int(data["weekend_rows"])
+        if data["vendor_totals"] is not None:
+            accumulator.vendor_totals = pd.Series(data["vendor_totals"], dtype="float64")
+        flags = {label: flag for flag, label in FLAG_LABELS.items()}
+        for label, pool in data["candidates"].items():
+            accumulator.candidates[flags[label]] = pd.DataFrame({
+                "row": pd.Series(pool["row"], dtype="int64"),
+                "amount": pd.Series(pool["amount"], dtype="float64"),
+                "date": pd.to_datetime(pd.Series(pool["date"], dtype=object)),
+                "vendor": pd.Series(pool["vendor"], dtype=object),
+                "weekend": pd.Series(pool["weekend"], dtype=bool),
+            })
+        return accumulator
+
+    def _update_vendors(self, totals: pd.Series):
+        if self.vendor_totals is None:
+            self.vendor_totals = totals
+        else:
+            self.vendor_totals = self.vendor_totals.add(totals, fill_value=0)
+
+    def _update_moments(self, count: int, mean: float, m2: float):
+        """
+        Folds in the count, mean and squared deviations of more amounts
+        (Chan et al.'s parallel variance update).
+        """
+        if not count:
+            return
+        if not self.valid_count:
+            self.valid_count, self.amount_mean, self.amount_m2 = count, mean, m2
+            return
+        total = self.valid_count + count
+        delta = mean - self.amount_mean
+        self.amount_mean += delta * count / total
+        self.amount_m2 += m2 + delta ** 2 * self.valid_count * count / total
+        self.valid_count = total
+
+    def _update_bins(self, bins: pd.Series):
+        self.amount_bins = self.amount_bins.add(bins, fill_value=0).astype("int64")
+
+    def _update_counts(self, counts: pd.Series):
+        counts = self.amount_counts.add(counts, fill_value=0).astype("int64")
+        excess = len(counts) - AMOUNT_COUNTS_MAX
+        if excess > 0:
+            # Misra-Gries: take the (AMOUNT_COUNTS_MAX + 1)-th largest count off
+            # every amount and forget those left at zero
+            cut = np.partition(counts.to_numpy(), excess - 1)[excess - 1]
+            counts = counts[counts > cut] - cut
+        self.amount_counts = counts
+
+    def _update_hashes(self, hashes: np.ndarray):
+        self.amount_hashes = np.unique(np.concatenate([self.amount_hashes, hashes]))[:DISTINCT_SKETCH_SIZE]
+
+    def _distinct_amounts(self) -> float:
+        """
+        The number of distinct amounts, estimated from the smallest hashes.
+        """
+        hashes = self.amount_hashes
+        if len(hashes) < DISTINCT_SKETCH_SIZE:
+            return len(hashes)
+        return (DISTINCT_SKETCH_SIZE - 1) * 2.0 ** 64 / (float(hashes[-1]) + 1)
+
+    def _running_counts(self, amounts: np.ndarray) -> np.ndarray:
+        """
+        How often each amount has occurred so far (0 for NaN).
+        """
+        return self.amount_counts.reindex(amounts).to_numpy(dtype=np.float64, na_value=0)
+
+    def _update_candidates(self, flag: int, candidates: pd.DataFrame):
+        if flag in self.candidates:
+            candidates = pd.concat([self.candidates[flag], candidates], ignore_index=True)
+        keep = _pick_candidates(flag, candidates["amount"].to_numpy(), candidates["weekend"].to_numpy(dtype=bool))
+        self.candidates[flag] = candidates.iloc[keep].reset_index(drop=True)
+
+    def result(self) -> dict:
+        checks = self._checks()
+        return {
+            "detection_signals": checks["signals"],
+            "suspicious_transactions": self._suspicious(checks)
+        }
+
+    def _checks(self) -> dict:
+        """
+        Evaluates the checks on the folded summaries: the signals, plus what
+        _row_flags needs to flag individual rows. A check flags rows only
+        when its signal is MEDIUM or HIGH.
+        """
+        valid_count = self.valid_count
+        checks = {"signals": [], "mean": 0.0, "std": 0.0, "repeated_amounts": set(),
+                  "concentrated_vendors": set(), "active": 0}
+        if valid_count == 0:
+            return checks
+        signals = checks["signals"]
+
+        def add(signal: dict, flag: int):
+            signals.append(signal)
+            if signal["severity"] in FLAGGING_SEVERITIES:
+                checks["active"] |= flag
+
+        # 1. Outliers: |z| > 3 over every valid amount
+        mean = self.amount_mean
+        std = float(np.sqrt(self.amount_m2 / valid_count))
+        bin_values = _bin_values(self.amount_bins.index.to_numpy(dtype=np.int64))
+        beyond = np.abs(bin_values - mean) > OUTLIER_Z_SCORE * std if std > 0 else np.zeros(len(bin_values), dtype=bool)
+        outliers = int(self.amount_bins.to_numpy()[beyond].sum())
+        # About 0.3% of normally distributed amounts lie beyond 3 sd
+        add(_signal("OUTLIER", outliers, outliers / valid_count, 0.003, 0.01), FLAG_OUTLIER)
+        checks.update({"mean": mean, "std": std})
+
+        # 2. Repeated amounts
+        values = self.amount_counts.index.to_numpy(dtype=np.float64)
+        counts = self.amount_counts.to_numpy(dtype=np.int64)
+        expected = valid_count / self._distinct_amounts()
+        threshold = max(REPEATED_AMOUNT_MIN_COUNT, expected + 3 * np.sqrt(expected))
+        repeated = counts >= threshold
+        repeated_rows = int(counts[repeated].sum())
+        signal = _signal("REPEATED_AMOUNT", int(repeated.sum()), repeated_rows / valid_count, 0.01, 0.05)
+        signal["rows"] = repeated_rows
+        signal["top_amounts"] = [
+            {"amount": float(amount), "count": int(count)}
+            for amount, count in self.amount_counts[repeated].nlargest(5).items()
+        ]
+        add(signal, FLAG_REPEATED_AMOUNT)
+        checks["repeated_amounts"] = set(values[repeated].tolist())
+
+        # 3. Vendor concentration (share of total |amount|)
+        if self.vendor_totals is not None and len(self.vendor_totals) > 1 and self.vendor_totals.sum() > 0:
+            shares = (self.vendor_totals / self.vendor_totals.sum()).sort_values(ascending=False)
+            over = shares[shares > VENDOR_CONCENTRATION_SHARE]
+            signal = _signal("VENDOR_CONCENTRATION", len(over), float(shares.iloc[0]),
+                             VENDOR_CONCENTRATION_SHARE, 0.6)
+            signal["vendors"] = [{"vendor": vendor, "share": round(float(share), 4)} for vendor, share in over.items()]
+            add(signal, FLAG_VENDOR_CONCENTRATION)
+            checks["concentrated_vendors"] = set(over.index)
+
+        # 4. Round number bias among amounts large enough to end in 00
+        eligible_rows = self.round_eligible_rows
+        round_rows = self.round_rows
+        share = round_rows / eligible_rows if eligible_rows else 0.0
+        ratio = share / ROUND_NUMBER_EXPECTED_SHARE
+        biased = round_rows >= ROUND_NUMBER_MIN_COUNT and ratio > ROUND_NUMBER_BIAS_RATIO
+        signal = _signal("ROUND_NUMBER_BIAS", round_rows if biased else 0, ratio, ROUND_NUMBER_BIAS_RATIO, 10.0)
+        signal.update({"share": round(share, 4), "expected_share": ROUND_NUMBER_EXPECTED_SHARE})
+        add(signal, FLAG_ROUND_NUMBER)
+
+        # 5. Transactions dated on a weekend, beyond the 2 in 7 expected
+        if self.dated_rows:
+            share = self.weekend_rows / self.dated_rows
+            expected = self.dated_rows * WEEKEND_EXPECTED_SHARE
+            z_score = (self.weekend_rows - expected) / np.sqrt(expected * (1 - WEEKEND_EXPECTED_SHARE))
+            signal = _signal("WEEKEND_TRANSACTION", self.weekend_rows, z_score, WEEKEND_Z_MEDIUM, WEEKEND_Z_HIGH)
+            signal.update({"share": round(share, 4), "expected_share": round(WEEKEND_EXPECTED_SHARE, 4),
+                           "z_score": round(float(z_score), 2)})
+            add(signal, FLAG_WEEKEND)
+
+        return checks
+
+    def _suspicious(self, checks: dict) -> list:
+        if not self.candidates or not checks["active"]:
+            return []
+        # A row can sit in several pools
+        candidates = pd.concat(self.candidates.values(), ignore_index=True).drop_duplicates("row", ignore_index=True)
+        amounts = candidates["amount"].to_numpy()
+        flags = _row_flags(checks, amounts, candidates["vendor"], candidates["weekend"].to_numpy(dtype=bool))
+        std = checks["std"]
+        z_scores = (amounts - checks["mean"]) / std if std > 0 else np.zeros_like(amounts)
+
+        score = np.zeros(len(candidates))
+        for flag, weight in FLAG_WEIGHTS.items():
+            score += np.where(flags & flag, weight, 0)
+        order = np.lexsort((candidates["row"].to_numpy(), -np.abs(z_scores), -score))
+        order = [i for i in order if flags[i]][:SUSPICIOUS_TRANSACTIONS_LIMIT]
+
+        transactions = []
+        for i in order:
+            date = candidates["date"].iloc[i]
+            vendor = candidates["vendor"].iloc[i]
+            transactions.append({
+                "row": int(candidates["row"].iloc[i]),
+                "date": None if pd.isna(date) else pd.Timestamp(date).isoformat(),
+                "amount": float(amounts[i]),
+                "vendor": None if pd.isna(vendor) else str(vendor),
+                "z_score": round(float(z_scores[i]), 2),
+                "flags": flag_names(int(flags[i]))
+            })
+        return transactions
+
+def _row_flags(checks: dict, amounts: np.ndarray, vendors, weekend: np.ndarray) -> np.ndarray:
+    """
+    Vectorized per-row flags for the checks that fired.
+    """
+    flags = np.zeros(len(amounts), dtype=np.uint8)
+    active = checks["active"]
+    if active & FLAG_OUTLIER and checks["std"] > 0:
+        with np.errstate(invalid="ignore"):
+            flags[np.abs(amounts - checks["mean"]) > OUTLIER_Z_SCORE * checks["std"]] |= FLAG_OUTLIER
+    if active & FLAG_REPEATED_AMOUNT:
+        flags[np.isin(amounts, list(checks["repeated_amounts"]))] |= FLAG_REPEATED_AMOUNT
+    if active & FLAG_VENDOR_CONCENTRATION and vendors is not None:
+        flags[pd.Series(vendors).isin(checks["concentrated_vendors"]).to_numpy()] |= FLAG_VENDOR_CONCENTRATION
+    if active & FLAG_ROUND_NUMBER:
+        flags[_round_mask(amounts)] |= FLAG_ROUND_NUMBER
+    if active & FLAG_WEEKEND:
+        flags[weekend] |= FLAG_WEEKEND
+    return flags
+
+def _weekend_mask(dates: pd.Series) -> np.ndarray:
+    return dates.dt.dayofweek.to_numpy(dtype=np.float64, na_value=np.nan) >= 5
+
+def _signal(signal_type: str, count: int, level: float, medium: float, high: float) -> dict:
+    """
+    A detection signal; severity grades `level` (a share or ratio) against
+    the medium/high thresholds, NONE when the check found nothing.
+    """
+    if not count:
+        severity = "NONE"
+    elif level >= high:
+        severity = "HIGH"
+    elif level >= medium:
+        severity = "MEDIUM"
+    else:
+        severity = "LOW"
+    return {"type": signal_type, "count": count, "severity": severity}
+
+def _round_mask(amounts: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore"):
+        return (np.abs(amounts) >= ROUND_NUMBER_MIN) & (np.mod(amounts, 100) == 0)
+
+def _pick_candidates(flag: int, amounts: np.ndarray, weekend: np.ndarray) -> np.ndarray:
+    """
+    Positions (in order) of the rows, given in file order, that a flag's pool
+    keeps: the largest and smallest amounts for outliers (the only rows that
+    can be), otherwise the largest |amount| rows of each round/weekend
+    combination, as whether those flags count is only known at the end.
+    Ties go to the earliest rows, so the pick doesn't depend on how the file
+    was chunked.
+    """
+    k = _CANDIDATES_PER_FLAG
+    positions = np.arange(len(amounts))
+    if flag == FLAG_OUTLIER:
+        return np.unique(np.concatenate([_top_k(positions, amounts, k), _top_k(positions, -amounts, k)]))
+    if len(positions) <= k:
+        return positions
+    kind = _round_mask(amounts) * 2 + weekend
+    order = np.lexsort((positions, -np.abs(amounts), kind))
+    kinds = kind[order]
+    rank = positions - np.searchsorted(kinds, kinds)
+    return np.sort(order[rank < k])
+
+# Bucket numbers are offset so every nonzero magnitude's is positive; the
+# sign carries the amount's
+_BIN_LOG_WIDTH = np.log1p(OUTLIER_BIN_WIDTH)
+_BIN_OFFSET = 1_000_000
+
+def _amount_bins(values: np.ndarray) -> np.ndarray:
+    """
+    The log-scale bucket of each finite amount, OUTLIER_BIN_WIDTH wide (0 for zero).
+    """
+    with np.errstate(divide="ignore"):
+        magnitude = np.floor(np.log(np.abs(values)) / _BIN_LOG_WIDTH)
+    return np.where(values == 0, 0, np.sign(values) * (magnitude + _BIN_OFFSET)).astype(np.int64)
+
+def _bin_values(bins: np.ndarray) -> np.ndarray:
+    """
+    The amount in the middle of each bucket.
+    """
+    return np.sign(bins) * np.exp((np.abs(bins) - _BIN_OFFSET + 0.5) * _BIN_LOG_WIDTH) * (bins != 0)
+
+def _top_k(positions: np.ndarray, keys: np.ndarray, k: int) -> np.ndarray:
+    """
+    The positions of the k largest keys, in O(n). Ties go to the earliest
+    positions, so the pick doesn't depend on how the file was chunked.
+    """
+    if len(positions) <= k:
+        return positions
+    kth = np.partition(keys, len(keys) - k)[len(keys) - k]
+    above = positions[keys > kth]
+    ties = positions[keys == kth][:k - len(above)]
+    return np.concatenate([above, ties])
@@ -0,0 +1,85 @@
+
+import io
+import zipfile
+import pandas as pd
+
+def sheet_names(source) -> list[str]:
+    """
+    Lists the worksheets of an .xlsx workbook, in order.
+    """
+    workbook = _open(source)
+    try:
+        return [worksheet.title for worksheet in workbook.worksheets]
+    finally:
+        workbook.close()
+
+def iter_frames(source, sheet_name: str | None = None, chunk_rows: int = 100000):
+    """
+    Streams one worksheet (the first by default) as DataFrames of up to
+    chunk_rows rows, using openpyxl's read-only mode so the workbook is never
+    loaded whole. The first row is the header, as with pandas.read_excel.
+    """
+    workbook = _open(source)
+    try:
+        try:
+            worksheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        except (KeyError, IndexError):
+            raise pd.errors.ParserError(f"Worksheet not found: {sheet_name}")
+
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _column_names(header)
+        width = len(columns)
+
+        buffer = []
+        blank_rows = 0
+        for row in rows:
+            if all(value is None for value in row):
+                # Kept only if data follows (trailing formatted rows are dropped)
+                blank_rows += 1
+                continue
+            if blank_rows:
+                buffer.extend([(None,) * width] * blank_rows)
+                blank_rows = 0
+            buffer.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+def _open(source):
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    try:
+        return load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError) as e:
+        raise pd.errors.ParserError(f"Invalid Excel file: {e}") from e
+
+def _column_names(header: tuple) -> list:
+    """
+    Header cells as pandas names them: trailing empty cells dropped, blanks
+    become "Unnamed: i" and repeats get ".1", ".2" suffixes.
+    """
+    header = list(header)
+    while header and header[-1] is None:
+        header.pop()
+
+    columns = []
+    seen = {}
+    for i, name in enumerate(header):
+        name = f"Unnamed: {i}" if name is None else name
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
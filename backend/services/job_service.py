@@ -0,0 +1,195 @@
+
+import os
+import time
+import asyncio
+from fastapi import HTTPException, status
+
+# Background workers draining the job queue, the queue bound, and how long
+# finished jobs stay in memory for status polling.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+
+# Pipeline stages, in order
+STAGES = ["parsing", "ai_insights", "saving"]
+
+_jobs = {}
+_queue = None
+_workers = []
+
+def start_workers():
+    """
+    Starts the background job workers (called on application startup).
+    """
+    global _queue
+    _queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+    for _ in range(JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+async def stop_workers():
+    """
+    Cancels the background job workers (called on application shutdown).
+    """
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+    # Jobs still queued won't run: delete their spooled uploads
+    while _queue is not None and not _queue.empty():
+        _, upload = _queue.get_nowait()
+        upload.close()
+
+async def submit_job(uid: str, filename: str, upload, all_sheets: bool = False) -> dict:
+    """
+    Queues an upload for background analysis and returns its job record.
+    upload is a utils.uploads.SpooledUpload; the job deletes it once analysed.
+    The job id is the id of the uploads document it will be saved to.
+    """
+    from services import upload_service
+    from utils.executors import run_io
+
+    if _queue is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Background analysis is not available"
+        )
+    if _queue.full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analysis queue is full, please retry later"
+        )
+
+    _evict_finished_jobs()
+
+    job_id = await run_io(upload_service.new_upload_id)
+    job = {
+        "job_id": job_id,
+        "upload_id": job_id,
+        "uid": uid,
+        "filename": filename,
+        "all_sheets": all_sheets,
+        "status": "queued",
+        "stages": {stage: "pending" for stage in STAGES},
+        "error": None,
+        "created_at": time.time(),
+        "finished_at": None,
+        "result": None
+    }
+    _jobs[job_id] = job
+
+    # The uploads document shows the job until the analysis is saved over it
+    try:
+        await run_io(upload_service.update_upload, job_id, _job_fields(job, include_owner=True))
+    except BaseException:
+        # Never queued: don't keep a record that would never be evicted
+        del _jobs[job_id]
+        raise
+
+    _queue.put_nowait((job, upload))
+    return job
+
+def get_job(job_id: str) -> dict | None:
+    """
+    Returns the in-memory job record, or None if this process doesn't know it.
+    """
+    return _jobs.get(job_id)
+
+async def _worker():
+    from services import admission
+    from utils import timing
+
+    while True:
+        job, upload = await _queue.get()
+        try:
+            # Stage timings of background jobs go to the metrics under their own label
+            start = time.perf_counter()
+            with timing.collect() as stages:
+                # Waits for its share of the analysis budget like any upload
+                async with admission.reserve(upload.size, timeout=None):
+                    await _run_job(job, upload.path)
+            if timing.TIMING_ENABLED:
+                timing.observe("background job", stages, time.perf_counter() - start)
+        except Exception as e:
+            print(f"Background job {job['job_id']} crashed: {e}")
+        finally:
+            upload.close()
+            _queue.task_done()
+
+async def _run_job(job: dict, path: str):
+    from importlib import import_module
+    from services import upload_service
+    from utils.executors import run_io
+
+    # Loads pandas on first use: imported off the event loop
+    parsing_service = await run_io(import_module, "services.parsing_service")
+
+    async def on_stage(stage: str):
+        await _start_stage(job, stage)
+
+    job["status"] = "processing"
+    try:
+        preview_data = await parsing_service.preview_file_async(
+            path, job["filename"], on_stage, all_sheets=job["all_sheets"]
+        )
+
+        await _start_stage(job, "saving")
+        job["stages"]["saving"] = "done"
+        upload_id = await run_io(
+            upload_service.save_upload_metadata,
+            job["uid"], job["filename"], preview_data, job["job_id"],
+            {"stages": job["stages"]}
+        )
+        if not upload_id:
+            # Marked failed in the uploads document below, so it doesn't stay "processing"
+            job["stages"]["saving"] = "failed"
+            raise RuntimeError("Failed to save the analysis")
+
+        preview_data["upload_id"] = upload_id
+        job["status"] = "analyzed"
+        job["result"] = preview_data
+
+    except Exception as e:
+        for stage, stage_status in job["stages"].items():
+            if stage_status == "running":
+                job["stages"][stage] = "failed"
+        job["status"] = "failed"
+        job["error"] = e.detail if isinstance(e, HTTPException) else str(e)
+        await run_io(upload_service.update_upload, job["job_id"], _job_fields(job))
+
+    finally:
+        job["finished_at"] = time.time()
+
+async def _start_stage(job: dict, stage: str):
+    """
+    Marks the previous stages done and `stage` running, in memory and in Firestore.
+    Stages served from the result cache are skipped, and show as done.
+    """
+    from services import upload_service
+    from utils.executors import run_io
+
+    for name in STAGES[:STAGES.index(stage)]:
+        job["stages"][name] = "done"
+    job["stages"][stage] = "running"
+    await run_io(upload_service.update_upload, job["job_id"], _job_fields(job))
+
+def _job_fields(job: dict, include_owner: bool = False) -> dict:
+    fields = {
+        "status": job["status"],
+        "stages": dict(job["stages"]),
+        "error": job["error"]
+    }
+    if include_owner:
+        from firebase_admin import firestore
+        fields.update({
+            "uid": job["uid"],
+            "filename": job["filename"],
+            "upload_type": "direct_upload",
+            "timestamp": firestore.SERVER_TIMESTAMP
+        })
+    return fields
+
+def _evict_finished_jobs():
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    for job_id in [job_id for job_id, job in _jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+        del _jobs[job_id]
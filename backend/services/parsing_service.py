@@ -1,93 +1,783 @@
 
 import os
 import io
+import asyncio
 import pandas as pd
 from fastapi import HTTPException, status
+from utils import timing, uploads
 
-def preview_file(file_content: bytes | io.BytesIO, filename: str):
+# Rows per chunk when streaming CSVs, and the upload size above which
+# preview_file switches to the chunked path automatically.
+CHUNK_ROWS = int(os.getenv("PARSE_CHUNK_ROWS", "100000"))
+STREAMING_THRESHOLD_BYTES = int(os.getenv("STREAMING_THRESHOLD_BYTES", str(50 * 1024 * 1024)))
+# Streamed CSVs are split into at least this many bytes per partition when
+# analysed on several processes (see utils.executors.ANALYSIS_WORKERS).
+MIN_PARTITION_BYTES = int(os.getenv("MIN_PARTITION_BYTES", str(8 * 1024 * 1024)))
+# Rows per chunk when streaming .xlsx sheets (rows arrive as Python tuples,
+# so chunks are smaller than for CSV)
+EXCEL_CHUNK_ROWS = int(os.getenv("EXCEL_CHUNK_ROWS", "20000"))
+
+# CSV reader: "c" (pandas) or "pyarrow" (Arrow's multi-threaded reader,
+# when pyarrow is installed). Parquet and Feather uploads always use Arrow.
+PARSE_ENGINE = os.getenv("PARSE_ENGINE", "c")
+
+# The only columns the analysis reads, by standard name, and the dtype each is
+# read as (None: pandas' default). Everything else is read just for the preview rows.
+ANALYSIS_DTYPES = {
+    "Date": None,
+    "Amount": "float64",
+    "Category": "category",
+    "Vendor": "category",
+}
+
+_arrow_engine = None
+
+def preview_file(file_content: bytes | io.BytesIO | str, filename: str, streaming: bool | None = None,
+                 workers: int | None = None, all_sheets: bool = False):
     """
     Parses the file content (CSV/Excel) and returns a preview.
-    file_content can be bytes or BytesIO.
+    file_content can be bytes, BytesIO, or the path of a spooled upload
+    (utils.uploads), which is read in place through a memory map.
+    streaming forces (True) or disables (False) chunked CSV parsing;
+    by default it is used for uploads larger than STREAMING_THRESHOLD_BYTES.
+    workers caps the processes a streamed CSV (or the sheets of a workbook)
+    is split across (defaults to ANALYSIS_WORKERS; 1 keeps it in this process).
+    all_sheets analyses every sheet of an .xlsx workbook instead of the first:
+    the report covers all of them, with one report per sheet in sheet_reports.
+    """
+    preview = parse_and_analyze(file_content, filename, streaming, workers, all_sheets)
+    return add_ai_insights(preview)
+
+def parse_and_analyze(file_content: bytes | io.BytesIO | str, filename: str, streaming: bool | None = None,
+                      workers: int | None = None, all_sheets: bool = False) -> dict:
     """
+    The CPU-bound part of preview_file: parsing, standardizing and the analysis engine.
+    """
+    path = file_content if isinstance(file_content, str) else None
+    stream = None
     try:
-        # Convert bytes to BytesIO if needed
-        if isinstance(file_content, bytes):
-            stream = io.BytesIO(file_content)
-        else:
-            stream = file_content
+        stream = _open_stream(file_content)
+
+        if streaming is None:
+            streaming = _stream_size(stream) > STREAMING_THRESHOLD_BYTES
 
-        if filename.endswith('.csv'):
-            df = pd.read_csv(stream)
-        elif filename.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(stream)
+        if filename.endswith('.csv') and streaming:
+            return _preview_csv_chunked(stream, filename, workers, path)
+        elif filename.endswith('.csv'):
+            return _preview_csv(stream, filename)
+        elif filename.endswith('.xlsx'):
+            return _preview_xlsx(stream, filename, all_sheets, workers, path)
+        elif filename.endswith('.xls'):
+            # Legacy binary workbooks: no streaming reader, load the first sheet
+            with timing.stage("parse"):
+                df = pd.read_excel(stream)
+            return _preview_dataframe(df, filename)
+        elif filename.endswith(('.parquet', '.feather')):
+            return _preview_columnar(stream, filename, filename.rsplit('.', 1)[1])
         else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Unsupported file format"
             )
 
-        if df.empty:
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File is empty"
-            )
+    except Exception as e:
+        _raise_parse_error(e)
+    finally:
+        if path is not None and stream is not None:
+            stream.close()
 
-        # Standardize columns
-        from services.standardizer import standardize_columns, validate_standardized_data
-        
-        df_standardized, column_mapping = standardize_columns(df)
-        
-        # Check validation
-        missing_columns = validate_standardized_data(df_standardized)
-
-        # Run Analysis Engine (Benford's Law & Spending Summary)
-        benford_stats = None
-        spending_summary = None
-        
-        if "Amount" in df_standardized.columns:
-             from services.analysis_engine import calculate_benford_stats, calculate_spending_summary
-             benford_stats = calculate_benford_stats(df_standardized["Amount"])
-             spending_summary = calculate_spending_summary(df_standardized)
-
-        # Prepare preview data
-        preview = {
-            "filename": filename,
-            "original_columns": df.columns.tolist(),
-            "mapped_columns": column_mapping,
-            "missing_required_columns": missing_columns,
-            "preview_rows": df_standardized.head(5).replace({float('nan'): None}).to_dict(orient='records'),
-            "analysis_report": {
+async def preview_file_async(file_content: bytes | str, filename: str, on_stage=None, all_sheets: bool = False) -> dict:
+    """
+    preview_file for the routers (file_content: bytes, or the path of a
+    spooled upload). Repeat uploads of the same bytes are served
+    from the result cache; otherwise parsing/analysis run on the process pool
+    and the Gemini call on the I/O thread pool.
+    on_stage(name) is awaited as each stage ("parsing", "ai_insights") starts.
+    """
+    from services import result_cache
+    from utils.executors import analysis_slot, run_io
+
+    with timing.stage("result_cache"):
+        key = await run_io(_cache_key, file_content, "all_sheets" if all_sheets else "")
+        preview = await run_io(result_cache.get, key, filename)
+
+    if preview is None:
+        if on_stage:
+            await on_stage("parsing")
+        async with analysis_slot():
+            preview = await parse_and_analyze_async(file_content, filename, all_sheets)
+
+    if not result_cache.has_ai_insights(preview):
+        if on_stage:
+            await on_stage("ai_insights")
+        preview = await run_io(add_ai_insights, preview)
+        await run_io(result_cache.put, key, preview)
+
+    return preview
+
+async def analyze_batch_async(file_content: bytes | str, filename: str) -> dict:
+    """
+    Analyses a batch of rows to append to a saved upload: only the batch is
+    parsed (on the process pool, behind the analysis slot), and no AI
+    insights are generated for it; the preview's analysis_state is what gets merged.
+    """
+    from utils.executors import analysis_slot
+
+    async with analysis_slot():
+        return await parse_and_analyze_async(file_content, filename)
+
+async def parse_and_analyze_async(file_content: bytes | str, filename: str, all_sheets: bool = False) -> dict:
+    """
+    parse_and_analyze for the routers, run off the event loop. Large CSVs are
+    split into partitions, and workbooks analysed with all_sheets into
+    sheets, that are folded as separate process-pool tasks; everything else
+    runs as a single process-pool task. A spooled upload is passed to the
+    workers by path (and partitions as byte ranges of it), not pickled.
+    """
+    from utils.executors import analysis_workers, run_cpu, run_io
+
+    try:
+        workers = analysis_workers()
+        path = file_content if isinstance(file_content, str) else None
+        size = os.path.getsize(path) if path else len(file_content)
+        if filename.endswith('.csv') and size > STREAMING_THRESHOLD_BYTES and workers > 1:
+            stream = _open_stream(file_content)
+            try:
+                plan = await run_io(_plan_csv, stream, workers, path)
+            finally:
+                stream.close()
+            if len(plan["partitions"]) > 1:
+                results = await asyncio.gather(*(
+                    run_cpu(_fold_csv_chunks, partition, plan["column_mapping"], plan["read_options"],
+                            plan["original_columns"])
+                    for partition in plan["partitions"]
+                ))
+                return await run_io(_finish_csv, filename, plan, results)
+
+        if filename.endswith('.xlsx') and all_sheets and workers > 1:
+            from services import excel_reader
+            names = await run_io(excel_reader.sheet_names, file_content)
+            results = await asyncio.gather(*(run_cpu(_fold_sheet, file_content, name) for name in names))
+            return await run_io(_finish_sheets, filename, results, all_sheets)
+
+        return await run_cpu(parse_and_analyze, file_content, filename, all_sheets=all_sheets)
+
+    except Exception as e:
+        _raise_parse_error(e)
+
+def add_ai_insights(preview: dict) -> dict:
+    """
+    Adds Gemini insights to the analysis report (blocking network call).
+    """
+    # We perform this *after* preparing the basic preview, so if it fails, we still have data.
+    benford_stats = preview["analysis_report"]["benford_analysis"]
+    spending_summary = preview["analysis_report"]["spending_summary"]
+    if benford_stats and spending_summary:
+        try:
+            from services.ai_service import get_ai_service
+            analysis_data_for_ai = {
                 "benford_analysis": benford_stats,
-                "spending_summary": spending_summary
+                "spending_summary": spending_summary,
+                "detection_signals": preview["analysis_report"].get("detection_signals", [])
             }
-        }
+            with timing.stage("ai_insights"):
+                ai_insights = get_ai_service().generate_insights(analysis_data_for_ai)
+            preview["analysis_report"]["ai_insights"] = ai_insights
+        except Exception as e:
+            print(f"AI Service failed: {e}")
+            # Fallback or leave empty, frontend handles missing insights
 
-        # AI INTEGRATION
-        # We perform this *after* preparing the basic preview, so if it fails, we still have data.
-        if benford_stats and spending_summary:
-            try:
-                from services.ai_service import ai_service
-                analysis_data_for_ai = {
-                    "benford_analysis": benford_stats,
-                    "spending_summary": spending_summary
-                }
-                ai_insights = ai_service.generate_insights(analysis_data_for_ai)
-                preview["analysis_report"]["ai_insights"] = ai_insights
-            except Exception as e:
-                print(f"AI Service failed: {e}")
-                # Fallback or leave empty, frontend handles missing insights
-
-        
-        return preview
-
-    except pd.errors.ParserError:
+    return preview
+
+def _raise_parse_error(e: Exception):
+    """
+    Maps a parsing failure to the HTTP error returned to the client.
+    """
+    if isinstance(e, HTTPException):
+        raise e
+    if isinstance(e, pd.errors.ParserError):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to parse file. Invalid format."
         )
-    except Exception as e:
-        print(f"Error parsing file: {e}")
+    print(f"Error parsing file: {e}")
+    raise HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Failed to parse file: {str(e)}"
+    )
+
+def _open_stream(file_content):
+    """
+    A seekable binary stream over the upload: bytes are wrapped, a spooled
+    upload's path is memory-mapped.
+    """
+    if isinstance(file_content, bytes):
+        return io.BytesIO(file_content)
+    if isinstance(file_content, str):
+        return uploads.open_mapped(file_content)
+    return file_content
+
+def _cache_key(file_content, variant: str) -> str:
+    from services import result_cache
+
+    if isinstance(file_content, str):
+        # Hash the spooled upload in place
+        with uploads.map_file(file_content) as mapping:
+            return result_cache.cache_key(mapping, variant)
+    return result_cache.cache_key(file_content, variant)
+
+def _stream_size(stream) -> int:
+    """
+    Returns the number of bytes left in a seekable stream.
+    """
+    position = stream.tell()
+    size = stream.seek(0, io.SEEK_END) - position
+    stream.seek(position)
+    return size
+
+def _preview_dataframe(df: pd.DataFrame, filename: str) -> dict:
+    """
+    Standardizes and analyses a fully loaded DataFrame.
+    """
+    if df.empty:
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is empty"
+        )
+
+    # Standardize columns
+    from services.standardizer import standardize_columns, validate_standardized_data
+
+    with timing.stage("standardize"):
+        df_standardized, column_mapping = standardize_columns(df)
+
+    # Check validation
+    missing_columns = validate_standardized_data(df_standardized)
+
+    # Run Analysis Engine (Benford's Law, Spending Summary & forensic checks)
+    return _build_preview(
+        filename,
+        df.columns.tolist(),
+        column_mapping,
+        missing_columns,
+        df_standardized.head(5),
+        len(df),
+        *_analyse(df_standardized, df.columns.tolist())
+    )
+
+def _preview_csv(stream, filename: str) -> dict:
+    """
+    Two-phase CSV read: the header and preview rows first, then only the
+    columns the analysis uses, with compact dtypes.
+    """
+    plan = _plan_csv(stream, 1)
+    df = _read_csv_columns(plan["stream"], plan["read_options"])
+    return _preview_columns(filename, plan, df)
+
+def _preview_columnar(stream, filename: str, kind: str) -> dict:
+    """
+    Parquet / Feather uploads: the same two phases, reading the analysis
+    columns straight into Arrow-backed DataFrame columns.
+    """
+    from services import arrow_reader
+
+    if not arrow_reader.available():
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to parse file: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet and Feather uploads are not enabled on this server"
+        )
+
+    with timing.stage("parse"):
+        head = arrow_reader.read_head(stream, kind)
+    plan = _plan_header(head)
+    with timing.stage("parse"):
+        df = arrow_reader.read_columns(stream, kind, plan["read_options"]["usecols"])
+    return _preview_columns(filename, plan, df)
+
+def _preview_columns(filename: str, plan: dict, df: pd.DataFrame) -> dict:
+    """
+    Analyses the columns read for a plan (see _plan_header) and builds the preview.
+    """
+    if df.empty:
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is empty"
+        )
+
+    df_standardized = df.rename(columns=plan["column_mapping"])
+
+    return _build_preview(
+        filename,
+        plan["original_columns"],
+        plan["column_mapping"],
+        plan["missing_columns"],
+        plan["head"],
+        len(df),
+        *_analyse(df_standardized, plan["original_columns"])
+    )
+
+def _analyse(df_standardized: pd.DataFrame, header: list) -> tuple:
+    """
+    Runs the analysis on a fully loaded, standardized DataFrame (header:
+    the original column names).
+    Returns (benford_stats, spending_summary, detection, state), all None
+    without an Amount column.
+    """
+    if "Amount" not in df_standardized.columns:
+        return None, None, None, None
+
+    from services.analysis_engine import BenfordAccumulator, SpendingAccumulator, dump_state
+    from services.detection_engine import DetectionAccumulator
+
+    benford_acc = BenfordAccumulator()
+    spending_acc = SpendingAccumulator()
+    detection_acc = DetectionAccumulator()
+    _fold_chunk(df_standardized, benford_acc, spending_acc, detection_acc, header)
+    with timing.stage("report"):
+        return (
+            benford_acc.result(),
+            spending_acc.result(),
+            detection_acc.result(),
+            dump_state(benford_acc, spending_acc, detection_acc)
         )
+
+def _fold_chunk(chunk: pd.DataFrame, benford_acc, spending_acc, detection_acc, header: list | None = None):
+    """
+    Folds one standardized chunk into the accumulators, timing each analysis
+    stage. header is the upload's original column names: the key the
+    inferred date format is cached under.
+    """
+    with timing.stage("benford"):
+        benford_acc.update(chunk["Amount"])
+    with timing.stage("spending"):
+        dates = spending_acc.update(chunk, header)
+    with timing.stage("detection"):
+        detection_acc.update(chunk, dates, header)
+
+def _preview_xlsx(stream, filename: str, all_sheets: bool, workers: int | None = None,
+                  path: str | None = None) -> dict:
+    """
+    Streams .xlsx worksheets row by row into the chunked analysis. With
+    all_sheets, each sheet is folded separately (on the process pool when
+    several workers are available) and the results are combined. path is
+    the spooled upload's, which the workers open instead of receiving the bytes.
+    """
+    from services import excel_reader
+    from utils.executors import analysis_workers, get_process_pool
+
+    if not all_sheets:
+        return _finish_sheets(filename, [_fold_sheet(stream, None)], all_sheets)
+
+    content = path or stream.read()
+    names = excel_reader.sheet_names(content)
+    workers = analysis_workers() if workers is None else workers
+    if workers > 1 and len(names) > 1:
+        results = list(get_process_pool().map(_fold_sheet, [content] * len(names), names))
+    else:
+        results = [_fold_sheet(content, name) for name in names]
+    return _finish_sheets(filename, results, all_sheets)
+
+def _fold_sheet(source, sheet_name: str | None) -> dict:
+    """
+    Maps one worksheet's header and folds its rows into fresh accumulators.
+    Runs in worker processes, so it only takes and returns picklable values.
+    """
+    from itertools import chain
+    from services import excel_reader
+    from services.analysis_engine import BenfordAccumulator, SpendingAccumulator
+    from services.detection_engine import DetectionAccumulator
+
+    frames = excel_reader.iter_frames(source, sheet_name, EXCEL_CHUNK_ROWS)
+    with timing.stage("parse"):
+        first = next(frames, None)
+    result = {"sheet": sheet_name, "row_count": 0}
+    if first is None:
+        return result
+
+    plan = _plan_header(first.head(5))
+    usecols = plan["read_options"]["usecols"]
+    benford_acc = BenfordAccumulator()
+    spending_acc = SpendingAccumulator()
+    detection_acc = DetectionAccumulator()
+    row_count = 0
+
+    for chunk in chain([first], timing.iterate("parse", frames)):
+        chunk = chunk[usecols].rename(columns=plan["column_mapping"])
+        row_count += len(chunk)
+        if "Amount" in chunk.columns:
+            _fold_chunk(chunk, benford_acc, spending_acc, detection_acc, plan["original_columns"])
+
+    plan.pop("read_options")
+    result.update(plan)
+    result.update({
+        "row_count": row_count,
+        "benford": benford_acc,
+        "spending": spending_acc,
+        "detection": detection_acc
+    })
+    return result
+
+def _finish_sheets(filename: str, results: list, all_sheets: bool) -> dict:
+    """
+    Builds the preview of a workbook from its folded sheets: the first sheet,
+    or with all_sheets every sheet with data combined, plus one report per
+    sheet in analysis_report["sheet_reports"].
+    """
+    from services.analysis_engine import BenfordAccumulator, SpendingAccumulator, dump_state
+    from services.detection_engine import DetectionAccumulator
+
+    sheets = [result for result in results if result["row_count"]]
+    if not sheets:
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is empty"
+        )
+
+    reports = {}
+    benford_acc = BenfordAccumulator()
+    spending_acc = SpendingAccumulator()
+    detection_acc = DetectionAccumulator()
+    analysed = []
+    for sheet in sheets:
+        has_amount = "Amount" in sheet["head"].columns
+        reports[sheet["sheet"]] = {
+            "row_count": sheet["row_count"],
+            "mapped_columns": sheet["column_mapping"],
+            "missing_required_columns": sheet["missing_columns"],
+            "benford_analysis": sheet["benford"].result() if has_amount else None,
+            "spending_summary": sheet["spending"].result() if has_amount else None,
+            "detection": sheet["detection"].result() if has_amount else None
+        }
+        if has_amount:
+            benford_acc.merge(sheet["benford"])
+            spending_acc.merge(sheet["spending"])
+            detection_acc.merge(sheet["detection"])
+            analysed.append(sheet)
+
+    first = sheets[0]
+    if not all_sheets:
+        report = reports[first["sheet"]]
+        has_amount = report["benford_analysis"] is not None
+        return _build_preview(
+            filename,
+            first["original_columns"],
+            first["column_mapping"],
+            first["missing_columns"],
+            first["head"],
+            first["row_count"],
+            report["benford_analysis"],
+            report["spending_summary"],
+            report.pop("detection"),
+            dump_state(first["benford"], first["spending"], first["detection"]) if has_amount else None
+        )
+
+    # Required columns are only missing if no analysed sheet has them
+    missing_columns = first["missing_columns"]
+    if analysed:
+        missing_columns = [col for col in analysed[0]["missing_columns"] if all(col in sheet["missing_columns"] for sheet in analysed)]
+
+    preview = _build_preview(
+        filename,
+        first["original_columns"],
+        first["column_mapping"],
+        missing_columns,
+        first["head"],
+        sum(sheet["row_count"] for sheet in sheets),
+        benford_acc.result() if analysed else None,
+        spending_acc.result() if analysed else None,
+        detection_acc.result() if analysed else None,
+        dump_state(benford_acc, spending_acc, detection_acc) if analysed else None
+    )
+    for report in reports.values():
+        report.update(report.pop("detection") or {})
+    preview["analysis_report"]["sheet_reports"] = reports
+    return preview
+
+def _preview_csv_chunked(stream, filename: str, workers: int | None = None, path: str | None = None) -> dict:
+    """
+    Streams a CSV in CHUNK_ROWS-sized chunks, folding each chunk into the
+    analysis accumulators so peak memory stays bounded by the chunk size.
+    Large files are split on line boundaries and the partitions are folded
+    on the shared process pool, then merged.
+    """
+    from utils.executors import analysis_workers, get_process_pool
+
+    plan = _plan_csv(stream, analysis_workers() if workers is None else workers, path)
+    partitions = plan["partitions"]
+
+    if len(partitions) > 1:
+        pool = get_process_pool()
+        results = list(pool.map(
+            _fold_csv_chunks,
+            partitions,
+            [plan["column_mapping"]] * len(partitions),
+            [plan["read_options"]] * len(partitions),
+            [plan["original_columns"]] * len(partitions)
+        ))
+    else:
+        results = [_fold_csv_chunks(plan["stream"], plan["column_mapping"], plan["read_options"],
+                                    plan["original_columns"])]
+
+    return _finish_csv(filename, plan, results)
+
+def _plan_csv(stream, workers: int, path: str | None = None) -> dict:
+    """
+    Maps the CSV header (its first rows are also the preview rows), picks the
+    columns and dtypes the analysis reads, and, when several workers are
+    available, splits the file into partitions. When the stream is a spooled
+    upload at path, partitions are (path, byte ranges) for the workers to map
+    themselves; otherwise they are bytes.
+    """
+    # The header is the same for every chunk, so map it once from the first rows
+    start = stream.tell()
+    head_df = pd.read_csv(stream, nrows=5)
+    stream.seek(start)
+
+    plan = _plan_header(head_df)
+
+    partitions = []
+    if workers > 1 and path is not None:
+        with uploads.map_file(path) as mapping:
+            parts = min(workers, max(1, len(mapping) // MIN_PARTITION_BYTES))
+            header_end, bounds = _partition_bounds(mapping, parts)
+        partitions = [(path, [(0, header_end), (a, b)]) for a, b in zip(bounds, bounds[1:]) if b > a]
+    elif workers > 1:
+        content = stream.read()
+        partitions = _partition_csv(content, min(workers, max(1, len(content) // MIN_PARTITION_BYTES)))
+        if len(partitions) == 1:
+            stream = io.BytesIO(content)
+
+    plan.update({
+        "partitions": partitions,
+        "stream": stream
+    })
+    return plan
+
+def _plan_header(head_df: pd.DataFrame) -> dict:
+    """
+    Maps the header of the first rows and picks the columns and dtypes to read.
+    """
+    from services.standardizer import standardize_columns, validate_standardized_data
+
+    with timing.stage("standardize"):
+        head, column_mapping = standardize_columns(head_df)
+    return {
+        "original_columns": head_df.columns.tolist(),
+        "head": head,
+        "column_mapping": column_mapping,
+        "missing_columns": validate_standardized_data(head),
+        "read_options": _analysis_read_options(head_df.columns.tolist(), column_mapping)
+    }
+
+def _finish_csv(filename: str, plan: dict, results: list) -> dict:
+    """
+    Merges the per-partition accumulators and builds the preview.
+    """
+    from services.analysis_engine import BenfordAccumulator, SpendingAccumulator, dump_state
+    from services.detection_engine import DetectionAccumulator
+
+    row_count = 0
+    benford_acc = BenfordAccumulator()
+    spending_acc = SpendingAccumulator()
+    detection_acc = DetectionAccumulator()
+    # Partitions are merged in file order, so detection row numbers stay global
+    with timing.stage("report"):
+        for part_rows, part_benford, part_spending, part_detection in results:
+            row_count += part_rows
+            benford_acc.merge(part_benford)
+            spending_acc.merge(part_spending)
+            detection_acc.merge(part_detection)
+
+    if row_count == 0:
+         raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is empty"
+        )
+
+    benford_stats = None
+    spending_summary = None
+    detection = None
+    state = None
+
+    if "Amount" in plan["head"].columns:
+        with timing.stage("report"):
+            benford_stats = benford_acc.result()
+            spending_summary = spending_acc.result()
+            detection = detection_acc.result()
+            state = dump_state(benford_acc, spending_acc, detection_acc)
+
+    return _build_preview(
+        filename,
+        plan["original_columns"],
+        plan["column_mapping"],
+        plan["missing_columns"],
+        plan["head"],
+        row_count,
+        benford_stats,
+        spending_summary,
+        detection,
+        state
+    )
+
+def _fold_csv_chunks(source, column_mapping: dict, read_options: dict, header: list | None = None):
+    """
+    Reads a CSV (stream, bytes, or a (path, byte ranges) partition of a
+    spooled upload) in chunks and folds it into fresh accumulators.
+    Only the analysis columns are read, so the original header (keying the
+    cached date format) is passed in.
+    Runs in worker processes, so it only takes and returns picklable values.
+    """
+    if isinstance(source, tuple):
+        with uploads.open_mapped(*source) as stream:
+            return _fold_csv_chunks(stream, column_mapping, read_options, header)
+    from services.analysis_engine import BenfordAccumulator, SpendingAccumulator
+    from services.detection_engine import DetectionAccumulator
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    start = source.tell()
+
+    while True:
+        benford_acc = BenfordAccumulator()
+        spending_acc = SpendingAccumulator()
+        detection_acc = DetectionAccumulator()
+        row_count = 0
+        try:
+            if _use_arrow():
+                from services import arrow_reader
+                chunks = arrow_reader.iter_csv(source, read_options)
+            else:
+                chunks = pd.read_csv(source, chunksize=CHUNK_ROWS, **read_options)
+            for chunk in timing.iterate("parse", chunks):
+                chunk = chunk.rename(columns=column_mapping)
+                row_count += len(chunk)
+                if "Amount" in chunk.columns:
+                    _fold_chunk(chunk, benford_acc, spending_acc, detection_acc, header)
+            return row_count, benford_acc, spending_acc, detection_acc
+        except ValueError as e:
+            # Non-numeric amounts: start over reading them as text
+            read_options = _without_float_dtypes(read_options, e)
+            source.seek(start)
+
+def _analysis_read_options(columns: list, column_mapping: dict) -> dict:
+    """
+    read_csv arguments that load only the mapped analysis columns, with compact dtypes.
+    """
+    usecols = [col for col in columns if column_mapping.get(col) in ANALYSIS_DTYPES]
+    dtype = {col: ANALYSIS_DTYPES[column_mapping[col]] for col in usecols if ANALYSIS_DTYPES[column_mapping[col]]}
+    # Nothing to analyse: still read one column to count the rows
+    return {"usecols": usecols or columns[:1], "dtype": dtype}
+
+def _read_csv_columns(stream, read_options: dict) -> pd.DataFrame:
+    def read(source, options):
+        if _use_arrow():
+            from services import arrow_reader
+            return arrow_reader.read_csv(source, options)
+        return pd.read_csv(source, **options)
+
+    start = stream.tell()
+    with timing.stage("parse"):
+        try:
+            return read(stream, read_options)
+        except ValueError as e:
+            # Non-numeric amounts ("$1,200", "n/a"): read them as text, the
+            # analysis coerces them
+            read_options = _without_float_dtypes(read_options, e)
+            stream.seek(start)
+            return read(stream, read_options)
+
+def _use_arrow() -> bool:
+    global _arrow_engine
+    if _arrow_engine is None:
+        from services import arrow_reader
+        _arrow_engine = PARSE_ENGINE == "pyarrow" and arrow_reader.available()
+        if PARSE_ENGINE == "pyarrow" and not _arrow_engine:
+            print("PARSE_ENGINE=pyarrow but pyarrow is not installed; using the pandas reader")
+    return _arrow_engine
+
+def _without_float_dtypes(read_options: dict, error: ValueError) -> dict:
+    float_columns = [col for col, dtype in read_options["dtype"].items() if dtype == "float64"]
+    if isinstance(error, pd.errors.ParserError) or not float_columns:
+        raise error
+    dtype = {col: dtype for col, dtype in read_options["dtype"].items() if col not in float_columns}
+    return {**read_options, "dtype": dtype}
+
+def _partition_csv(content: bytes, parts: int) -> list[bytes]:
+    """
+    Splits CSV bytes into up to `parts` self-contained CSVs (header + rows).
+    """
+    header_end, bounds = _partition_bounds(content, parts)
+    if len(bounds) == 2:
+        return [content]
+
+    header = content[:header_end]
+    return [header + content[a:b] for a, b in zip(bounds, bounds[1:]) if b > a]
+
+def _partition_bounds(content, parts: int) -> tuple[int, list[int]]:
+    """
+    Where to split CSV content (bytes or a memory map) into up to `parts`
+    partitions: returns the end of the header and the partition boundaries.
+    Cuts only at newlines outside quoted fields (even number of quotes so far),
+    so embedded newlines never split a record.
+    """
+    header_end = content.find(b"\n") + 1
+    if parts <= 1 or header_end == 0:
+        return header_end, [header_end, len(content)]
+
+    step = (len(content) - header_end) // parts
+    bounds = [header_end]
+    quotes = 0
+    counted_to = header_end
+
+    for i in range(1, parts):
+        cut = content.find(b"\n", max(header_end + i * step, bounds[-1]))
+        while cut != -1:
+            quotes += _count_quotes(content, counted_to, cut)
+            counted_to = cut
+            if quotes % 2 == 0:
+                break
+            # Inside a quoted field: move on to the next newline
+            cut = content.find(b"\n", cut + 1)
+        if cut == -1:
+            break
+        bounds.append(cut + 1)
+
+    bounds.append(len(content))
+    return header_end, bounds
+
+def _count_quotes(content, start: int, end: int) -> int:
+    if isinstance(content, bytes):
+        return content.count(b'"', start, end)
+    # A memory map has no count(): count it a window at a time
+    return sum(
+        content[a:min(a + MIN_PARTITION_BYTES, end)].count(b'"')
+        for a in range(start, end, MIN_PARTITION_BYTES)
+    )
+
+def _build_preview(filename, original_columns, column_mapping, missing_columns,
+                   head, row_count, benford_stats, spending_summary, detection=None, state=None) -> dict:
+    """
+    Assembles the preview payload shared by the in-memory and chunked paths.
+    detection is the forensic checks' result (detection_signals and
+    suspicious_transactions), merged into the analysis report.
+    state is the analysis' sufficient statistics (see analysis_engine.dump_state),
+    kept as analysis_state for appending to the upload later; it is stored
+    apart from the document and not returned to clients.
+    """
+    preview = {
+        "filename": filename,
+        "original_columns": original_columns,
+        "mapped_columns": column_mapping,
+        "missing_required_columns": missing_columns,
+        "row_count": row_count,
+        "preview_rows": head.replace({float('nan'): None}).to_dict(orient='records'),
+        "analysis_report": {
+            "benford_analysis": benford_stats,
+            "spending_summary": spending_summary
+        }
+    }
+    if detection is not None:
+        preview["analysis_report"].update(detection)
+    if state is not None:
+        preview["analysis_state"] = state
+    return preview
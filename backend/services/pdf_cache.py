@@ -0,0 +1,49 @@
+
+import os
+import hashlib
+from utils.cache import LRUCache, DiskCache, TieredCache
+
+# Bump when PDFService.generate_report output changes, to invalidate cached PDFs.
+PDF_LAYOUT_VERSION = "1"
+
+# Memory budget for rendered PDFs, and the on-disk tier ("" disables it).
+PDF_CACHE_MEMORY_BYTES = int(os.getenv("PDF_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(".cache", "pdf_reports"))
+PDF_CACHE_DISK_BYTES = int(os.getenv("PDF_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+
+_cache = None
+
+def _get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        disk = DiskCache(PDF_CACHE_DIR, PDF_CACHE_DISK_BYTES) if PDF_CACHE_DIR else None
+        _cache = TieredCache(LRUCache(PDF_CACHE_MEMORY_BYTES), disk)
+    return _cache
+
+def pdf_version(doc_id: str, update_time) -> str:
+    """
+    Identifies one rendering of an analysis: the document id plus its last
+    update time, so any change to the document yields a new version.
+    Also used as the ETag.
+    """
+    stamp = update_time.isoformat() if update_time is not None else ""
+    return hashlib.sha256(f"{doc_id}:{stamp}:{PDF_LAYOUT_VERSION}".encode("utf-8")).hexdigest()[:32]
+
+def get(version: str) -> bytes | None:
+    return _get_cache().get(version)
+
+def put(version: str, pdf_bytes: bytes):
+    try:
+        _get_cache().set(version, pdf_bytes)
+    except Exception as e:
+        print(f"Failed to cache PDF {version}: {e}")
+
+def render_pdf(data: dict) -> bytes:
+    """
+    Renders the report to bytes (picklable, so it can run on the process pool).
+    """
+    from services.pdf_service import PDFService
+    from utils import timing
+
+    with timing.stage("pdf"):
+        return PDFService.generate_report(data).getvalue()
@@ -0,0 +1,213 @@
+
+from datetime import datetime, timezone
+
+# One document per user, holding the aggregate of all their uploads
+PORTFOLIO_COLLECTION = "portfolios"
+
+def contribution(state: dict | None) -> dict | None:
+    """
+    An upload's share of the portfolio, taken from its analysis state (see
+    analysis_engine.dump_state): the Benford digit histogram, volume sums,
+    date bounds and monthly totals. Stored in the uploads document as
+    `portfolio_stats`, so it can be subtracted again on delete.
+    """
+    if not state:
+        return None
+    benford = state["benford"]
+    spending = state["spending"]
+    return {
+        "digit_counts": list(benford["digit_counts"]),
+        "valid_count": benford["valid_count"],
+        "transaction_count": spending["transaction_count"],
+        "total_volume": spending["total_volume"],
+        "net_flow": spending["net_flow"],
+        "date_min": spending["date_min"],
+        "date_max": spending["date_max"],
+        "monthly_trend": dict(spending["monthly_trend"]),
+    }
+
+def read(db, uid: str, transaction=None) -> dict | None:
+    """
+    Reads the user's portfolio document (inside a transaction, if given).
+    """
+    doc = db.collection(PORTFOLIO_COLLECTION).document(uid).get(transaction=transaction)
+    return doc.to_dict() if doc.exists else None
+
+def write(db, transaction, uid: str, portfolio: dict | None, add: dict | None = None, remove: dict | None = None):
+    """
+    Applies one upload's contribution change to a portfolio read earlier in
+    the same transaction: `remove` is taken out and `add` put in. Without a
+    portfolio document nothing is written; the first read builds it.
+    """
+    if portfolio is None or (add is None and remove is None):
+        return
+    portfolio = dict(portfolio)
+    if remove:
+        _combine(portfolio, remove, -1)
+    if add:
+        _combine(portfolio, add, 1)
+    portfolio["updated_at"] = datetime.now(timezone.utc)
+    transaction.set(db.collection(PORTFOLIO_COLLECTION).document(uid), portfolio)
+
+def get_portfolio(uid: str, refresh: bool = False) -> dict:
+    """
+    Returns the user's aggregate across all uploads (combined Benford
+    conformity, volumes and monthly trend) from the materialized portfolio
+    document: one read, whatever the size of the history. The document is
+    rebuilt from the uploads when missing, stale or when refresh is set.
+    """
+    from firebase_admin import firestore
+
+    db = firestore.client()
+    portfolio = None if refresh else read(db, uid)
+    if portfolio is None or portfolio.get("stale"):
+        portfolio = rebuild(uid)
+    return summarize(portfolio)
+
+def rebuild(uid: str) -> dict:
+    """
+    Recomputes the portfolio from every upload's portfolio_stats and saves it,
+    in one transaction: it reads the portfolio document, as every upload
+    save, append and delete does in its own transaction, so none of them
+    can land between reading the uploads and writing the result.
+    Uploads saved before portfolio_stats existed are backfilled from their
+    stored analysis state, when they have one.
+    """
+    from firebase_admin import firestore
+    from services import report_store
+
+    db = firestore.client()
+    portfolio_ref = db.collection(PORTFOLIO_COLLECTION).document(uid)
+    query = db.collection("uploads").where("uid", "==", uid)\
+              .select(["portfolio_stats", "state_blob", "status"])
+
+    @firestore.transactional
+    def commit(transaction):
+        # Reads first: a transaction can't read after it has written
+        portfolio_ref.get(transaction=transaction)
+        docs = list(query.stream(transaction=transaction))
+
+        portfolio = _empty(uid)
+        for doc in docs:
+            data = doc.to_dict()
+            if data.get("status") != "analyzed":
+                continue
+            stats = data.get("portfolio_stats")
+            if stats is None and data.get("state_blob"):
+                try:
+                    stats = contribution(report_store.load_state(data["state_blob"]))
+                    transaction.update(doc.reference, {"portfolio_stats": stats})
+                except Exception as e:
+                    print(f"Failed to backfill portfolio stats for {doc.id}: {e}")
+            if stats is None:
+                portfolio["uploads_without_stats"] += 1
+                continue
+            _combine(portfolio, stats, 1)
+
+        portfolio["updated_at"] = datetime.now(timezone.utc)
+        transaction.set(portfolio_ref, portfolio)
+        return portfolio
+
+    return commit(db.transaction())
+
+def mark_stale(uid: str):
+    """
+    Flags the user's portfolio to be rebuilt on its next read, ahead of
+    changes to their uploads that don't update it in the same transaction
+    (clearing the history). If such a change fails halfway, the portfolio
+    is still rebuilt from whatever is left.
+    """
+    from firebase_admin import firestore
+    from google.api_core.exceptions import NotFound
+
+    try:
+        firestore.client().collection(PORTFOLIO_COLLECTION).document(uid).update({"stale": True})
+    except NotFound:
+        # No portfolio yet: the first read builds it
+        pass
+
+def delete(uid: str):
+    """
+    Deletes the user's portfolio document (when their history is cleared).
+    """
+    from firebase_admin import firestore
+    firestore.client().collection(PORTFOLIO_COLLECTION).document(uid).delete()
+
+def summarize(portfolio: dict) -> dict:
+    """
+    The portfolio response: the combined Benford report and spending summary.
+    """
+    from services.analysis_engine import BenfordAccumulator
+
+    benford = BenfordAccumulator.from_dict(portfolio)
+    transaction_count = portfolio["transaction_count"]
+    spending = {
+        "total_volume": portfolio["total_volume"],
+        "net_flow": portfolio["net_flow"],
+        "transaction_count": transaction_count,
+        "avg_transaction": portfolio["net_flow"] / transaction_count if transaction_count else 0,
+        "monthly_trend": dict(sorted(portfolio["monthly_trend"].items()))
+    }
+    if portfolio.get("date_min"):
+        spending["date_range"] = {"start": portfolio["date_min"], "end": portfolio["date_max"]}
+
+    updated_at = portfolio.get("updated_at")
+    return {
+        "uploads": portfolio["uploads"],
+        "uploads_without_stats": portfolio.get("uploads_without_stats", 0),
+        "benford_analysis": benford.result() if benford.valid_count else None,
+        "spending_summary": spending,
+        "updated_at": updated_at.isoformat() if hasattr(updated_at, "isoformat") else updated_at
+    }
+
+def _empty(uid: str) -> dict:
+    return {
+        "uid": uid,
+        "uploads": 0,
+        "uploads_without_stats": 0,
+        "digit_counts": [0] * 10,
+        "valid_count": 0,
+        "transaction_count": 0,
+        "total_volume": 0.0,
+        "net_flow": 0.0,
+        "date_min": None,
+        "date_max": None,
+        "monthly_trend": {},
+        "month_uploads": {},  # month -> uploads with rows in it, to drop emptied months
+        "stale": False,
+    }
+
+def _combine(portfolio: dict, stats: dict, sign: int):
+    """
+    Adds (sign=1) or subtracts (sign=-1) one upload's stats in place.
+    """
+    portfolio["uploads"] += sign
+    portfolio["digit_counts"] = [a + sign * b for a, b in zip(portfolio["digit_counts"], stats["digit_counts"])]
+    for key in ("valid_count", "transaction_count", "total_volume", "net_flow"):
+        portfolio[key] += sign * stats[key]
+
+    trend = dict(portfolio["monthly_trend"])
+    month_uploads = dict(portfolio["month_uploads"])
+    for month, total in stats["monthly_trend"].items():
+        month_uploads[month] = month_uploads.get(month, 0) + sign
+        if month_uploads[month] > 0:
+            trend[month] = trend.get(month, 0.0) + sign * total
+        else:
+            month_uploads.pop(month)
+            trend.pop(month, None)
+    portfolio["monthly_trend"] = trend
+    portfolio["month_uploads"] = month_uploads
+
+    if portfolio["uploads"] <= 0:
+        # Nothing left: reset exactly instead of keeping float residue
+        portfolio.update({key: value for key, value in _empty(portfolio["uid"]).items() if key != "uploads_without_stats"})
+        return
+    if stats["date_min"] is None:
+        return
+    if sign > 0:
+        # ISO timestamps of one format compare in date order
+        portfolio["date_min"] = min(filter(None, [portfolio["date_min"], stats["date_min"]]))
+        portfolio["date_max"] = max(filter(None, [portfolio["date_max"], stats["date_max"]]))
+    elif stats["date_min"] == portfolio["date_min"] or stats["date_max"] == portfolio["date_max"]:
+        # Bounds can't be subtracted: the next read rebuilds them
+        portfolio["stale"] = True
@@ -0,0 +1,190 @@
+
+import os
+import gzip
+import json
+import shutil
+import tempfile
+from utils import timing
+
+# Where full analysis reports are kept: "bucket" (the Firebase Storage bucket)
+# or "local" (a directory, for development). Defaults to the bucket when one
+# is configured.
+REPORT_STORE = os.getenv("REPORT_STORE", "bucket" if os.getenv("FIREBASE_STORAGE_BUCKET") else "local")
+REPORT_STORE_DIR = os.getenv("REPORT_STORE_DIR", os.path.join(".data", "reports"))
+
+# Bump when the blob encoding changes; load() reads every format it knows.
+REPORT_FORMAT = 1
+
+# Maps with at least this many entries are stored column-wise
+COLUMNAR_MIN_ENTRIES = 2
+_COLUMNAR_KEY = "__columnar__"
+
+def summarize(report: dict) -> dict:
+    """
+    The part of an analysis report kept in the uploads document: the headline
+    numbers the history list and dashboard cards read, without the large maps.
+    """
+    benford = report.get("benford_analysis") or {}
+    spending = report.get("spending_summary") or {}
+    return {
+        "benford_analysis": {
+            key: benford[key] for key in ("verdict", "mad_score", "total_rows_analyzed", "error") if key in benford
+        },
+        "spending_summary": {
+            key: spending[key] for key in ("total_volume", "net_flow", "transaction_count", "avg_transaction", "date_range", "error") if key in spending
+        },
+        "detection_signals": [
+            {key: signal[key] for key in ("type", "count", "severity")} for signal in report.get("detection_signals") or []
+        ]
+    }
+
+def save(uid: str, doc_id: str, report: dict, version: str = "") -> dict:
+    """
+    Writes the full report (gzip'd, column-wise JSON) and returns the
+    reference to store in the uploads document as `report_blob`.
+    Appends to an upload write under a new version instead of overwriting.
+    """
+    from utils.serialization import make_serializable
+
+    return _put(_path(uid, doc_id, "json.gz", version), {"report": _encode(make_serializable(report))})
+
+def load(ref: dict) -> dict:
+    """
+    Reads a report written by save().
+    """
+    return _decode(_get(ref)["report"])
+
+def save_state(uid: str, doc_id: str, state: dict, version: str = "") -> dict:
+    """
+    Writes an analysis state (see analysis_engine.dump_state) and returns
+    the reference to store in the uploads document as `state_blob`.
+    """
+    return _put(_path(uid, doc_id, "state.json.gz", version), {"state": state})
+
+def load_state(ref: dict) -> dict:
+    """
+    Reads a state written by save_state().
+    """
+    return _get(ref)["state"]
+
+def hydrate(data: dict) -> dict:
+    """
+    Replaces the summary in an uploads document with the full report, if the
+    report lives in the store. Documents saved with the report inline are
+    returned unchanged.
+    """
+    data.pop("state_blob", None)
+    ref = data.pop("report_blob", None)
+    if ref:
+        data["analysis_report"] = load(ref)
+    return data
+
+def delete(ref: dict | None):
+    """
+    Deletes a stored report (missing blobs are ignored).
+    """
+    if not ref:
+        return
+    try:
+        if ref.get("store") == "bucket":
+            _bucket().blob(ref["path"]).delete()
+        else:
+            os.remove(os.path.join(REPORT_STORE_DIR, ref["path"]))
+    except Exception as e:
+        print(f"Failed to delete report {ref.get('path')}: {e}")
+
+def delete_user_reports(uid: str):
+    """
+    Deletes every stored report of a user, from both stores.
+    """
+    prefix = f"reports/{uid}/"
+    try:
+        if os.getenv("FIREBASE_STORAGE_BUCKET"):
+            bucket = _bucket()
+            blobs = list(bucket.list_blobs(prefix=prefix))
+            if blobs:
+                bucket.delete_blobs(blobs, on_error=lambda blob: None)
+    except Exception as e:
+        print(f"Failed to delete reports under {prefix}: {e}")
+    shutil.rmtree(os.path.join(REPORT_STORE_DIR, prefix), ignore_errors=True)
+
+def _path(uid: str, doc_id: str, suffix: str, version: str) -> str:
+    name = f"{doc_id}.{version}" if version else doc_id
+    return f"reports/{uid}/{name}.{suffix}"
+
+def _put(path: str, body: dict) -> dict:
+    from utils.serialization import dumps
+
+    data = gzip.compress(dumps({"format": REPORT_FORMAT, **body}), compresslevel=6)
+    with timing.stage("report_store"):
+        if REPORT_STORE == "bucket":
+            blob = _bucket().blob(path)
+            blob.upload_from_string(data, content_type="application/gzip")
+        else:
+            _write_local(path, data)
+    return {"store": REPORT_STORE, "path": path, "size": len(data), "format": REPORT_FORMAT}
+
+def _get(ref: dict) -> dict:
+    with timing.stage("report_store"):
+        if ref.get("store") == "bucket":
+            data = _bucket().blob(ref["path"]).download_as_bytes()
+        else:
+            with open(os.path.join(REPORT_STORE_DIR, ref["path"]), "rb") as f:
+                data = f.read()
+    return json.loads(gzip.decompress(data))
+
+def _bucket():
+    from firebase_admin import storage
+    return storage.bucket()
+
+def _write_local(path: str, data: bytes):
+    full_path = os.path.join(REPORT_STORE_DIR, path)
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    # Write atomically so a concurrent reader never sees a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, full_path)
+
+def _encode(obj):
+    """
+    Stores maps of uniform records ({key: {col: value}}) and maps of scalars
+    column-wise, so keys are written once and gzip sees runs of like values.
+    """
+    if isinstance(obj, dict):
+        if len(obj) >= COLUMNAR_MIN_ENTRIES:
+            values = list(obj.values())
+            if all(isinstance(v, dict) for v in values):
+                columns = list(values[0].keys())
+                if all(list(v.keys()) == columns and not any(isinstance(x, (dict, list)) for x in v.values()) for v in values):
+                    return {_COLUMNAR_KEY: {
+                        "index": list(obj.keys()),
+                        "columns": {col: [v[col] for v in values] for col in columns}
+                    }}
+            elif not any(isinstance(v, (dict, list)) for v in values):
+                return {_COLUMNAR_KEY: {"index": list(obj.keys()), "values": values}}
+        if _COLUMNAR_KEY in obj:
+            # A data key that collides with the marker: store the map as a table
+            return {_COLUMNAR_KEY: {"index": list(obj.keys()), "values": [_encode(v) for v in obj.values()]}}
+        return {key: _encode(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_encode(value) for value in obj]
+    return obj
+
+def _decode(obj):
+    if isinstance(obj, dict):
+        table = obj.get(_COLUMNAR_KEY) if len(obj) == 1 else None
+        if table is not None:
+            index = table["index"]
+            if "values" in table:
+                return dict(zip(index, [_decode(value) for value in table["values"]]))
+            columns = table["columns"]
+            return {
+                key: {col: values[i] for col, values in columns.items()}
+                for i, key in enumerate(index)
+            }
+        return {key: _decode(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(value) for value in obj]
+    return obj
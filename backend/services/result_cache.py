@@ -0,0 +1,62 @@
+
+import os
+import json
+import hashlib
+from services.analysis_engine import ANALYSIS_VERSION
+from utils.cache import LRUCache, DiskCache, TieredCache
+
+# Memory budget for cached previews, and the on-disk tier ("" disables it).
+RESULT_CACHE_MEMORY_BYTES = int(os.getenv("RESULT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(".cache", "analysis_results"))
+RESULT_CACHE_DISK_BYTES = int(os.getenv("RESULT_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+
+_cache = None
+
+def _get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        disk = DiskCache(RESULT_CACHE_DIR, RESULT_CACHE_DISK_BYTES) if RESULT_CACHE_DIR else None
+        _cache = TieredCache(LRUCache(RESULT_CACHE_MEMORY_BYTES), disk)
+    return _cache
+
+def cache_key(content, variant: str = "") -> str:
+    """
+    Content address of an upload (bytes, or any buffer such as a memory-mapped
+    spooled upload): hash of the bytes plus the analysis version,
+    so bumping ANALYSIS_VERSION invalidates every cached report.
+    variant separates analyses of the same bytes with different options.
+    """
+    key = f"{hashlib.sha256(content).hexdigest()}-{ANALYSIS_VERSION}"
+    return f"{key}-{variant}" if variant else key
+
+def get(key: str, filename: str) -> dict | None:
+    """
+    Returns the cached preview for this content, labelled with filename.
+    """
+    value = _get_cache().get(key)
+    if value is None:
+        return None
+    preview = json.loads(value)
+    preview["filename"] = filename
+    return preview
+
+def put(key: str, preview: dict):
+    """
+    Caches a preview (analysis_report, mapped columns, preview rows).
+    """
+    from utils.serialization import make_serializable
+
+    cached = {k: v for k, v in preview.items() if k not in ("filename", "upload_id")}
+    try:
+        _get_cache().set(key, json.dumps(make_serializable(cached)).encode("utf-8"))
+    except Exception as e:
+        print(f"Failed to cache analysis result: {e}")
+
+def has_ai_insights(preview: dict) -> bool:
+    """
+    True if the report carries real Gemini insights (not the unavailable/error
+    fallbacks), so a cached preview doesn't need another AI call.
+    """
+    ai_insights = (preview.get("analysis_report") or {}).get("ai_insights") or {}
+    summary = ai_insights.get("summary") or ""
+    return bool(summary) and "unavailable" not in summary and "Error" not in summary
@@ -1,6 +1,11 @@
 
-import pandas as pd
+import os
 import re
+import json
+import tempfile
+import threading
+from functools import lru_cache
+import pandas as pd
 
 class UnifiedTransaction:
     """
@@ -10,6 +15,7 @@ class UnifiedTransaction:
     DESCRIPTION = "Description"
     AMOUNT = "Amount"
     CATEGORY = "Category"
+    VENDOR = "Vendor"
     
     # Required columns for a valid transaction
     REQUIRED_COLUMNS = [DATE, AMOUNT]
@@ -20,40 +26,40 @@ def normalize_column_name(col_name: str) -> str:
     """
     return re.sub(r'[^a-z0-9]', '', str(col_name).lower())
 
+# Potential matches for each standard column, in priority order
+COLUMN_PATTERNS = {
+    UnifiedTransaction.DATE: [r'date', r'txn.*date', r'timestamp', r'day', r'time'],
+    UnifiedTransaction.DESCRIPTION: [r'desc', r'narrative', r'particulars', r'details', r'memo', r'transaction'],
+    UnifiedTransaction.AMOUNT: [r'amount', r'amt', r'debit', r'credit', r'value', r'cost'],
+    UnifiedTransaction.CATEGORY: [r'category', r'type', r'class'],
+    UnifiedTransaction.VENDOR: [r'vendor', r'merchant', r'payee', r'supplier', r'beneficiary', r'counterparty']
+}
+# Bump when COLUMN_PATTERNS changes: learned templates saved under another
+# version are dropped and matched again (hand-written ones carry no version)
+PATTERNS_VERSION = 2
+
+# Distinct headers whose mapping is kept in memory, and an optional JSON file
+# of known layouts ("bank templates"). Mappings found by matching that cover
+# the required columns are added to the file; its entries take precedence
+# over matching.
+HEADER_CACHE_SIZE = int(os.getenv("HEADER_CACHE_SIZE", "1024"))
+HEADER_TEMPLATES_PATH = os.getenv("HEADER_TEMPLATES_PATH", "")
+
+# One compiled alternation per standard column (checked in priority order)
+_COMPILED_PATTERNS = [
+    (standard_col, re.compile("|".join(f"(?:{pattern})" for pattern in regex_list)))
+    for standard_col, regex_list in COLUMN_PATTERNS.items()
+]
+_templates = None
+_learned = set()  # template keys added by matching rather than by hand
+_templates_lock = threading.Lock()
+
 def standardize_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
     """
     Maps DataFrame columns to the UnifiedTransaction schema.
     Returns the standardized DataFrame and the mapping used.
     """
-    column_mapping = {}
-    reverse_mapping = {}
-    
-    # potential matches for each standard column
-    patterns = {
-        UnifiedTransaction.DATE: [r'date', r'txn.*date', r'timestamp', r'day', r'time'],
-        UnifiedTransaction.DESCRIPTION: [r'desc', r'narrative', r'particulars', r'details', r'memo', r'transaction'],
-        UnifiedTransaction.AMOUNT: [r'amount', r'amt', r'debit', r'credit', r'value', r'cost'],
-        UnifiedTransaction.CATEGORY: [r'category', r'type', r'class']
-    }
-    
-    original_columns = df.columns.tolist()
-    
-    for col in original_columns:
-        normalized_col = normalize_column_name(col)
-        matched = False
-        
-        for standard_col, regex_list in patterns.items():
-            if standard_col in reverse_mapping.values():
-                continue # Already found a match for this standard column
-                
-            for pattern in regex_list:
-                if re.search(pattern, normalized_col):
-                    column_mapping[col] = standard_col
-                    reverse_mapping[col] = standard_col # keep track to avoid duplicates
-                    matched = True
-                    break
-            if matched:
-                break
+    column_mapping = map_columns(df.columns.tolist())
     
     # Create a new dataframe with standardized columns only
     # We rename columns in place to keep the original data
@@ -64,6 +70,110 @@ def standardize_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
     
     return df_standardized, column_mapping
 
+def map_columns(columns: list) -> dict:
+    """
+    Returns {original column: standard column} for a header.
+    Repeated headers are served from the cache or the template file.
+    """
+    try:
+        return dict(_cached_mapping(tuple(columns)))
+    except TypeError:
+        # Unhashable labels: match without caching
+        return dict(_match_columns(columns))
+
+@lru_cache(maxsize=HEADER_CACHE_SIZE)
+def _cached_mapping(header: tuple) -> tuple:
+    template = _get_templates().get(_template_key(header))
+    if template is not None:
+        return tuple((col, template[col]) for col in header if col in template)
+
+    mapping = _match_columns(header)
+    _learn_template(header, mapping)
+    return mapping
+
+def _match_columns(columns) -> tuple:
+    mapping = []
+    found = set()
+    
+    for col in columns:
+        normalized_col = normalize_column_name(col)
+        
+        for standard_col, matcher in _COMPILED_PATTERNS:
+            if standard_col in found:
+                continue # Already found a match for this standard column
+                
+            if matcher.search(normalized_col):
+                mapping.append((col, standard_col))
+                found.add(standard_col) # keep track to avoid duplicates
+                break
+    
+    return tuple(mapping)
+
+def _template_key(header: tuple) -> str | None:
+    # Only all-string headers are persisted (JSON keys)
+    if not all(isinstance(col, str) for col in header):
+        return None
+    return "\x1f".join(header)
+
+def _get_templates() -> dict:
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = _load_templates()
+    return _templates
+
+def _load_templates() -> dict:
+    if not HEADER_TEMPLATES_PATH:
+        return {}
+    try:
+        with open(HEADER_TEMPLATES_PATH, "r", encoding="utf-8") as f:
+            entries = json.load(f).get("templates", [])
+        templates = {}
+        for entry in entries:
+            version = entry.get("patterns_version")
+            if version is not None and version != PATTERNS_VERSION:
+                continue
+            key = _template_key(tuple(entry["header"]))
+            templates[key] = entry["mapping"]
+            if version is not None:
+                _learned.add(key)
+        return templates
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Ignoring unreadable header templates {HEADER_TEMPLATES_PATH}: {e}")
+        return {}
+
+def _learn_template(header: tuple, mapping: tuple):
+    key = _template_key(header)
+    if not HEADER_TEMPLATES_PATH or key is None:
+        return
+    if not set(UnifiedTransaction.REQUIRED_COLUMNS) <= {standard_col for _, standard_col in mapping}:
+        return
+    templates = _get_templates()
+    with _templates_lock:
+        if key in templates:
+            return
+        templates[key] = dict(mapping)
+        _learned.add(key)
+        entries = []
+        for template_key, template_mapping in templates.items():
+            entry = {"header": template_key.split("\x1f"), "mapping": template_mapping}
+            if template_key in _learned:
+                entry["patterns_version"] = PATTERNS_VERSION
+            entries.append(entry)
+        try:
+            directory = os.path.dirname(os.path.abspath(HEADER_TEMPLATES_PATH))
+            os.makedirs(directory, exist_ok=True)
+            # Write atomically; concurrent workers may each add a layout, last write wins
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"templates": entries}, f, indent=2)
+            os.replace(tmp_path, HEADER_TEMPLATES_PATH)
+        except OSError as e:
+            print(f"Failed to save header templates: {e}")
+
 def validate_standardized_data(df: pd.DataFrame) -> list[str]:
     """
     Checks if the dataframe has the minimum required columns.
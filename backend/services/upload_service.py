@@ -0,0 +1,243 @@
+
+import traceback
+import uuid
+from datetime import datetime, timezone
+from utils import timing
+
+def save_upload_metadata(uid: str, filename: str, preview_data: dict, doc_id: str | None = None, extra: dict | None = None):
+    """
+    Saves the analysis to the uploads collection (a new document, or doc_id
+    when a pending document was created for a background job).
+    The document keeps the report summary; the full report goes to the
+    report store (inline, as before, if that write fails), and so does the
+    analysis state that later appends merge into. The user's portfolio is
+    updated in the same transaction as the document.
+    Returns the document id, or None if saving failed.
+    """
+    # Never part of the document or of the response
+    analysis_state = preview_data.pop("analysis_state", None)
+
+    # SAVE METADATA TO FIRESTORE
+    try:
+        from firebase_admin import firestore
+        from services import portfolio_service, report_store
+        from utils.serialization import make_serializable
+
+        db = firestore.client()
+        collection = db.collection("uploads")
+        doc_ref = collection.document(doc_id) if doc_id else collection.document()
+        analysis_report = make_serializable(preview_data.get("analysis_report"))
+
+        # Prepare data for Firestore (remove NumPy types)
+        firestore_data = {
+            "uid": uid,
+            "filename": filename,
+            "upload_type": "direct_upload",
+            "timestamp": firestore.SERVER_TIMESTAMP,
+            "status": "analyzed",
+            "row_count": preview_data.get("row_count") or len(preview_data.get("preview_rows", [])),
+            "columns": preview_data.get("mapped_columns"),
+            "missing_columns": preview_data.get("missing_required_columns"),
+            "analysis_report": analysis_report,
+            "portfolio_stats": portfolio_service.contribution(analysis_state)
+        }
+
+        # Write the report body before the document that points to it
+        if analysis_report:
+            try:
+                firestore_data["report_blob"] = report_store.save(uid, doc_ref.id, analysis_report)
+                firestore_data["analysis_report"] = report_store.summarize(analysis_report)
+            except Exception as e:
+                print(f"Failed to store report body, saving it inline: {e}")
+
+        if analysis_state:
+            try:
+                firestore_data["state_blob"] = report_store.save_state(uid, doc_ref.id, analysis_state)
+            except Exception as e:
+                # The analysis is still saved; it just can't be appended to
+                print(f"Failed to store analysis state: {e}")
+
+        if extra:
+            firestore_data.update(extra)
+
+        @firestore.transactional
+        def commit(transaction):
+            # Reads first: a re-saved document's old share is replaced, not added twice
+            previous = doc_ref.get(transaction=transaction)
+            portfolio = portfolio_service.read(db, uid, transaction)
+            transaction.set(doc_ref, firestore_data)
+            portfolio_service.write(
+                db, transaction, uid, portfolio,
+                add=firestore_data["portfolio_stats"],
+                remove=previous.to_dict().get("portfolio_stats") if previous.exists else None
+            )
+
+        with timing.stage("firestore"):
+            commit(db.transaction())
+
+        return doc_ref.id
+
+    except Exception as e:
+        error_msg = f"Failed to save metadata to Firestore: {e}"
+        print(error_msg)
+        traceback.print_exc()
+
+        # Continue even if saving metadata fails
+        return None
+
+def new_upload_id() -> str:
+    """
+    Reserves an id for an uploads document (generated client-side, no round trip).
+    """
+    try:
+        from firebase_admin import firestore
+        return firestore.client().collection("uploads").document().id
+    except Exception as e:
+        print(f"Firestore unavailable, using a local upload id: {e}")
+        return uuid.uuid4().hex
+
+def update_upload(doc_id: str, fields: dict) -> bool:
+    """
+    Merges fields into an uploads document, creating it if needed.
+    Returns False (and logs) if the write failed.
+    """
+    try:
+        from firebase_admin import firestore
+        firestore.client().collection("uploads").document(doc_id).set(fields, merge=True)
+        return True
+    except Exception as e:
+        print(f"Failed to update upload {doc_id}: {e}")
+        return False
+
+def get_upload(doc_id: str) -> dict | None:
+    """
+    Reads an uploads document, or returns None if it doesn't exist.
+    """
+    from firebase_admin import firestore
+
+    with timing.stage("firestore"):
+        doc = firestore.client().collection("uploads").document(doc_id).get()
+    return doc.to_dict() if doc.exists else None
+
+def append_to_upload(uid: str, doc_id: str, upload: dict, filename: str, batch: dict) -> dict:
+    """
+    Merges the analysis of a new batch of rows (a preview from
+    parsing_service.analyze_batch_async) into a saved upload: the stored
+    state and the batch's state are merged, the report is rebuilt from the
+    result, and both are written as new blobs that replace the upload's.
+    Appends racing on the same upload are detected (409); the loser's blobs
+    are removed. Returns the new row count and full report.
+    """
+    from firebase_admin import firestore
+    from fastapi import HTTPException, status
+    from services import analysis_engine, portfolio_service, report_store
+    from services.parsing_service import add_ai_insights
+    from utils.serialization import make_serializable
+
+    if not upload.get("state_blob"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This analysis can't be appended to; upload the combined file instead"
+        )
+    batch_state = batch.pop("analysis_state", None)
+    if batch_state is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The new file has no Amount column to analyse"
+        )
+
+    try:
+        state = analysis_engine.merge_states(report_store.load_state(upload["state_blob"]), batch_state)
+    except ValueError as e:
+        print(f"Cannot append to upload {doc_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This analysis can't be appended to; upload the combined file instead"
+        )
+
+    # AI insights describe the whole ledger, so they are generated again
+    report = add_ai_insights({"analysis_report": analysis_engine.report_from_state(state)})["analysis_report"]
+    report = make_serializable(report)
+
+    # Unique per attempt, so a losing concurrent append never touches the winner's blobs
+    generation = (upload.get("append_count") or 0) + 1
+    version = f"{generation}-{uuid.uuid4().hex[:8]}"
+    report_ref = report_store.save(uid, doc_id, report, version)
+    state_ref = report_store.save_state(uid, doc_id, state, version)
+
+    db = firestore.client()
+    doc_ref = db.collection("uploads").document(doc_id)
+    row_count = (upload.get("row_count") or 0) + batch["row_count"]
+
+    stats = portfolio_service.contribution(state)
+
+    @firestore.transactional
+    def commit(transaction):
+        current = doc_ref.get(transaction=transaction)
+        if not current.exists or current.get("uid") != uid or (current.to_dict().get("append_count") or 0) != generation - 1:
+            return False
+        portfolio = portfolio_service.read(db, uid, transaction)
+        portfolio_service.write(db, transaction, uid, portfolio, add=stats, remove=current.to_dict().get("portfolio_stats"))
+        transaction.update(doc_ref, {
+            "portfolio_stats": stats,
+            "row_count": row_count,
+            "analysis_report": report_store.summarize(report),
+            "report_blob": report_ref,
+            "state_blob": state_ref,
+            "append_count": generation,
+            "appends": firestore.ArrayUnion([{
+                "filename": filename,
+                "row_count": batch["row_count"],
+                "mapped_columns": batch.get("mapped_columns"),
+                "appended_at": datetime.now(timezone.utc)
+            }]),
+            "updated_at": firestore.SERVER_TIMESTAMP
+        })
+        return True
+
+    with timing.stage("firestore"):
+        committed = commit(db.transaction())
+    if not committed:
+        report_store.delete(report_ref)
+        report_store.delete(state_ref)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The analysis changed while appending; please retry"
+        )
+
+    # The previous generation is no longer referenced
+    report_store.delete(upload.get("report_blob"))
+    report_store.delete(upload.get("state_blob"))
+
+    return {
+        "upload_id": doc_id,
+        "row_count": row_count,
+        "appended_rows": batch["row_count"],
+        "append_count": generation,
+        "analysis_report": report
+    }
+
+def delete_upload(uid: str, doc_id: str) -> dict | None:
+    """
+    Deletes an uploads document and takes its share out of the user's
+    portfolio, in one transaction. Returns the deleted document's data
+    (for removing its blobs), or None if it no longer exists.
+    """
+    from firebase_admin import firestore
+    from services import portfolio_service
+
+    db = firestore.client()
+    doc_ref = db.collection("uploads").document(doc_id)
+
+    @firestore.transactional
+    def commit(transaction):
+        doc = doc_ref.get(transaction=transaction)
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        portfolio = portfolio_service.read(db, uid, transaction)
+        transaction.delete(doc_ref)
+        portfolio_service.write(db, transaction, uid, portfolio, remove=data.get("portfolio_stats"))
+        return data
+
+    return commit(db.transaction())
@@ -0,0 +1,45 @@
+
+import os
+import time
+import asyncio
+
+# Set to "1" to warm the instance up in the background right after startup:
+# the analysis modules (pandas, NumPy), Firebase, the Gemini client and the
+# worker processes are loaded while the server already answers requests.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+
+def import_analysis_modules() -> int:
+    """
+    Imports the modules the analysis runs on. Also runs in each worker
+    process; returns the process id.
+    """
+    from services import analysis_engine, detection_engine, parsing_service, result_cache  # noqa: F401
+    return os.getpid()
+
+def init_clients():
+    """
+    Initializes Firebase and the Gemini client, and loads reportlab.
+    """
+    from auth import init_firebase
+    from services import pdf_service  # noqa: F401
+    from services.ai_service import get_ai_service
+
+    init_firebase()
+    get_ai_service()
+
+async def warm_up():
+    """
+    Loads everything the first requests would otherwise wait for. Failures
+    are logged, not raised: the same work happens again on first use.
+    """
+    from utils.executors import ANALYSIS_WORKERS, run_cpu, run_io
+
+    start = time.perf_counter()
+    try:
+        await run_io(import_analysis_modules)
+        await run_io(init_clients)
+        # One task per worker, so the pool spawns all of them
+        await asyncio.gather(*(run_cpu(import_analysis_modules) for _ in range(ANALYSIS_WORKERS)))
+        print(f"Warm-up finished in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
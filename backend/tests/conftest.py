@@ -0,0 +1,37 @@
+import os
+import sys
+
+# The backend modules import each other as top-level packages (services, utils)
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+REAL_DATA_DIR = os.path.abspath(os.path.join(BACKEND_DIR, "..", "real-data"))
+
+def assert_close(actual, expected, path=""):
+    """
+    Deep equality of JSON-like results, with floats compared to 1e-9
+    relative (partitions are summed in a different order).
+    """
+    import pytest
+
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict) and set(actual) == set(expected), path
+        for key in expected:
+            assert_close(actual[key], expected[key], f"{path}/{key}")
+    elif isinstance(expected, (list, tuple)):
+        assert isinstance(actual, (list, tuple)) and len(actual) == len(expected), path
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            assert_close(a, e, f"{path}/{i}")
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, rel=1e-9, nan_ok=True), path
+    else:
+        assert actual == expected, path
+
+def as_json(value):
+    """
+    A preview or state as the API serializes it (string keys, plain types).
+    """
+    import json
+    from utils.serialization import dumps, make_serializable
+
+    return json.loads(dumps(make_serializable(value)))
@@ -0,0 +1,127 @@
+import asyncio
+from collections import deque
+import pytest
+from fastapi import HTTPException
+from services import admission
+
+MB = 1024 * 1024
+
+@pytest.fixture(autouse=True)
+def fresh_admission(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_BUDGET_BYTES", 10 * MB)
+    monkeypatch.setattr(admission, "ADMISSION_MIN_WEIGHT_BYTES", MB)
+    monkeypatch.setattr(admission, "ADMISSION_QUEUE_SIZE", 2)
+    monkeypatch.setattr(admission, "USER_RATE_PER_MINUTE", 60)
+    monkeypatch.setattr(admission, "USER_BURST", 2)
+    monkeypatch.setattr(admission, "_in_use", 0)
+    monkeypatch.setattr(admission, "_waiters", deque())
+    monkeypatch.setattr(admission, "_buckets", {})
+    monkeypatch.setattr(admission, "_stats", {"admitted": 0, "queued": 0, **{r: 0 for r in admission.REJECT_REASONS}})
+
+async def _hold(log: list, name: str, size: int, seconds: float, timeout: float | None = 1.0, uid: str | None = None):
+    try:
+        async with admission.reserve(size, timeout, uid):
+            log.append(("in", name))
+            await asyncio.sleep(seconds)
+    except HTTPException as e:
+        log.append(("refused", name, e.status_code, e.headers["Retry-After"]))
+
+def test_waiters_are_granted_in_arrival_order():
+    async def scenario():
+        log = []
+        big = asyncio.create_task(_hold(log, "big", 8 * MB, 0.05))
+        await asyncio.sleep(0)
+        assert admission.get_stats()["in_use_bytes"] == 8 * MB
+        # The second request would fit, but waits behind the first
+        waiting = [asyncio.create_task(_hold(log, "first", 5 * MB, 0.01)),
+                   asyncio.create_task(_hold(log, "second", MB, 0.01))]
+        await asyncio.sleep(0)
+        assert admission.get_stats()["queue_depth"] == 2
+        await asyncio.gather(big, *waiting)
+        return log
+
+    assert asyncio.run(scenario()) == [("in", "big"), ("in", "first"), ("in", "second")]
+    stats = admission.get_stats()
+    assert (stats["admitted"], stats["queued"], stats["in_use_bytes"], stats["queue_depth"]) == (3, 2, 0, 0)
+
+def test_waits_past_the_timeout_are_refused():
+    async def scenario():
+        log = []
+        holder = asyncio.create_task(_hold(log, "holder", 10 * MB, 0.1))
+        await asyncio.sleep(0)
+        await _hold(log, "late", MB, 0, timeout=0.01)
+        assert admission.get_stats()["queue_depth"] == 0
+        await holder
+        return log
+
+    log = asyncio.run(scenario())
+    assert ("refused", "late", 429, str(admission.ADMISSION_RETRY_AFTER)) in log
+    assert admission.get_stats()["queue_timeout"] == 1
+    assert admission.get_stats()["in_use_bytes"] == 0
+
+def test_a_full_queue_refuses_at_once():
+    async def scenario():
+        log = []
+        tasks = [asyncio.create_task(_hold(log, name, 10 * MB, 0.01)) for name in ("a", "b", "c", "d")]
+        await asyncio.gather(*tasks)
+        return log
+
+    log = asyncio.run(scenario())
+    assert [entry[:3] for entry in log if entry[0] == "refused"] == [("refused", "d", 429)]
+    assert admission.get_stats()["queue_full"] == 1
+
+def test_refused_requests_get_their_rate_token_back():
+    async def scenario():
+        log = []
+        holder = asyncio.create_task(_hold(log, "holder", 10 * MB, 0.05))
+        await asyncio.sleep(0)
+        admission.check_rate("user")
+        admission.check_rate("user")
+        await _hold(log, "late", MB, 0, timeout=0.01, uid="user")
+        await holder
+
+    asyncio.run(scenario())
+    # Only the refused request's token is back
+    admission.check_rate("user")
+    with pytest.raises(HTTPException) as error:
+        admission.check_rate("user")
+    assert error.value.status_code == 429
+
+def _post_upload(path: str, chunks: int) -> tuple[int, int]:
+    """
+    Sends a multipart upload to the analysis router in `chunks` body
+    messages; returns the response status and how many were received.
+    """
+    from fastapi import FastAPI
+    from auth import verify_token
+    from routers import analysis
+
+    app = FastAPI()
+    app.include_router(analysis.router)
+    app.dependency_overrides[verify_token] = lambda: {"uid": "user"}
+
+    body = b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.csv"\r\n\r\nx\r\n--b--\r\n'
+    size = -(-len(body) // chunks)
+    parts = [body[i:i + size] for i in range(0, len(body), size)]
+    received, sent = [0], []
+
+    async def receive():
+        received[0] += 1
+        return {"type": "http.request", "body": parts[received[0] - 1], "more_body": received[0] < len(parts)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=b")],
+    }
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], received[0]
+
+def test_rate_limited_uploads_are_refused_before_the_body_is_read():
+    admission.check_rate("user")
+    admission.check_rate("user")
+    for path in ("/api/analyze/upload", "/api/analyze/uploads/doc1/append"):
+        assert _post_upload(path, 5) == (429, 0)
+    assert admission.get_stats()["rate_limited"] == 2
@@ -0,0 +1,26 @@
+import warnings
+import numpy as np
+import pytest
+from services.analysis_engine import leading_digit_histogram, leading_digits
+
+@pytest.mark.parametrize("value, digit", [
+    (0.57, 5),
+    (1000.0, 1),
+    (0.3 * 10, 3),  # 2.9999999999999996
+    (0.1 + 0.2, 3),
+    (999.9999999999999, 1),
+    (19999999999.5, 1),
+    (123456789012345.0, 1),
+    (2.9999999999, 2),
+    (1e23, 1),
+    (1.7976931348623157e308, 1),
+])
+def test_leading_digits(value, digit):
+    assert leading_digits(np.array([value]))[0] == digit
+
+def test_subnormals_are_left_out_without_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        counts = leading_digit_histogram(np.array([5e-310, -1e-320, 3.0, -45.0, 0.0, np.nan, np.inf]))
+        leading_digits(np.array([5e-310]))
+    assert counts.tolist() == [0, 0, 0, 1, 1, 0, 0, 0, 0, 0]
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+from services import date_parser
+from services.analysis_engine import SpendingAccumulator
+
+@pytest.fixture(autouse=True)
+def empty_format_cache(monkeypatch):
+    monkeypatch.setattr(date_parser, "_formats", type(date_parser._formats)())
+
+def _fold(dates: list, header: list) -> pd.Series:
+    chunk = pd.DataFrame({"Date": dates, "Amount": [1.0] * len(dates)})
+    return SpendingAccumulator().update(chunk, header)
+
+def test_formats_are_cached_per_original_header():
+    # A month-first bank, then a day-first one whose rows are mostly ambiguous
+    us = _fold(["12/25/2024", "01/31/2024"] + ["02/03/2024"] * 18, ["Txn Date", "Amount", "Category", "memo"])
+    eu = _fold(["25/12/2024"] + ["03/04/2024"] * 19, ["Posting Date", "Value", "Type"])
+
+    assert us.iloc[-1] == pd.Timestamp("2024-02-03")
+    assert eu.iloc[-1] == pd.Timestamp("2024-04-03")
+    assert set(date_parser._formats) == {
+        ("Txn Date", "Amount", "Category", "memo"),
+        ("Posting Date", "Value", "Type"),
+    }
+
+def test_same_header_reuses_the_format():
+    header = ["Posting Date", "Value", "Type"]
+    _fold(["25/12/2024", "03/04/2024"], header)
+    dates = _fold(["03/04/2024", "05/06/2024"], header)
+    assert dates.tolist() == [pd.Timestamp("2024-04-03"), pd.Timestamp("2024-06-05")]
+
+def test_no_header_caches_nothing():
+    _fold(["25/12/2024", "03/04/2024"], None)
+    assert not date_parser._formats
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_csv_uploads_cache_under_their_own_header(streaming):
+    from services import parsing_service
+
+    rows = "".join(f"2024-01-{day:02d},{day}.5,Travel,x\n" for day in range(1, 29))
+    content = ("Txn Date,Amount,Category,memo\n" + rows).encode()
+    parsing_service.parse_and_analyze(content, "a.csv", streaming=streaming, workers=1)
+    assert set(date_parser._formats) == {("Txn Date", "Amount", "Category", "memo")}
@@ -0,0 +1,108 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import REAL_DATA_DIR, assert_close
+from services import detection_engine, parsing_service
+from services.date_parser import parse_dates
+from services.detection_engine import DetectionAccumulator
+
+HIGH_CORRUPTION = os.path.join(REAL_DATA_DIR, "high_corruption_data.csv")
+
+def _ledger() -> pd.DataFrame:
+    return pd.read_csv(HIGH_CORRUPTION).rename(columns={"date": "Date", "vendor": "Vendor", "amount": "Amount"})
+
+def _ranked_by_brute_force(df: pd.DataFrame) -> list:
+    """
+    The suspicious rows, scoring every row of the file.
+    """
+    accumulator = DetectionAccumulator()
+    accumulator.update(df)
+    checks = accumulator._checks()
+    amounts = df["Amount"].to_numpy(dtype=np.float64)
+    dates, _ = parse_dates(df["Date"])
+    flags = detection_engine._row_flags(checks, amounts, df["Vendor"], detection_engine._weekend_mask(dates))
+    score = sum(np.where(flags & flag, weight, 0) for flag, weight in detection_engine.FLAG_WEIGHTS.items())
+    z_scores = np.abs(amounts - checks["mean"]) / checks["std"]
+    order = np.lexsort((np.arange(len(df)), -z_scores, -score))
+    return [(int(i) + 1, int(score[i])) for i in order[:detection_engine.SUSPICIOUS_TRANSACTIONS_LIMIT]]
+
+def test_highest_scoring_rows_rank_first():
+    df = _ledger()
+    expected = _ranked_by_brute_force(df)
+    # Repeated and round; the file's weekend share is at the baseline, so weekends don't count
+    assert [score for _, score in expected] == [4] * detection_engine.SUSPICIOUS_TRANSACTIONS_LIMIT
+
+    transactions = detection_engine.detect_anomalies(df)["suspicious_transactions"]
+    assert [t["row"] for t in transactions] == [row for row, _ in expected]
+    for t in transactions:
+        assert t["flags"] == ["REPEATED_AMOUNT", "LARGE_ROUND_NUMBER"]
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_ranking_does_not_depend_on_chunking(monkeypatch, streaming):
+    monkeypatch.setattr(parsing_service, "CHUNK_ROWS", 1000)
+    with open(HIGH_CORRUPTION, "rb") as f:
+        report = parsing_service.parse_and_analyze(f.read(), "ledger.csv", streaming=streaming, workers=1)["analysis_report"]
+    assert [t["row"] for t in report["suspicious_transactions"]] == [row for row, _ in _ranked_by_brute_force(_ledger())]
+
+def test_merged_partitions_keep_the_candidates():
+    df = _ledger()
+    whole = detection_engine.detect_anomalies(df)
+    first, second = DetectionAccumulator(), DetectionAccumulator()
+    first.update(df.iloc[:4000])
+    second.update(df.iloc[4000:])
+    merged = DetectionAccumulator.from_dict(first.merge(second).to_dict())
+    assert_close(merged.result(), whole)
+
+def _weekend_report(days: pd.DatetimeIndex) -> tuple:
+    df = pd.DataFrame({"Date": days, "Amount": np.arange(1, len(days) + 1, dtype=np.float64)})
+    report = detection_engine.detect_anomalies(df, dates=pd.Series(days))
+    signal = next(signal for signal in report["detection_signals"] if signal["type"] == "WEEKEND_TRANSACTION")
+    return signal, report["suspicious_transactions"]
+
+def test_weekend_share_is_graded_against_two_in_seven():
+    every_day = pd.date_range("2024-01-01", periods=700, freq="D")
+    signal, transactions = _weekend_report(every_day)
+    assert signal["share"] == pytest.approx(2 / 7, abs=1e-4)
+    assert signal["severity"] == "LOW"
+    # A normal share of weekend rows flags none of them
+    assert transactions == []
+
+    weekends = every_day[every_day.dayofweek >= 5]
+    signal, transactions = _weekend_report(every_day[:500].append(weekends))
+    assert signal["severity"] == "HIGH"
+    assert transactions and all("WEEKEND" in t["flags"] for t in transactions)
+
+def test_a_lone_outlier_in_a_large_ledger_flags_nothing():
+    amounts = np.random.default_rng(0).normal(100, 10, 100_000)
+    amounts[5] = 10_000.0
+    report = detection_engine.detect_anomalies(pd.DataFrame({"Amount": amounts}))
+    outliers = report["detection_signals"][0]
+    assert outliers["type"] == "OUTLIER" and outliers["severity"] == "LOW"
+    assert report["suspicious_transactions"] == []
+
+def test_state_stays_bounded(monkeypatch):
+    monkeypatch.setattr(detection_engine, "AMOUNT_COUNTS_MAX", 1000)
+    rng = np.random.default_rng(0)
+    accumulator = DetectionAccumulator()
+    for _ in range(10):
+        # Mostly distinct amounts, plus one repeated in every chunk
+        amounts = np.round(rng.uniform(0, 1e6, 10_000), 2)
+        amounts[:50] = 4321.0
+        accumulator.update(pd.DataFrame({"Amount": amounts}))
+
+    state = accumulator.to_dict()
+    assert len(state["amounts"]) <= 1000
+    assert len(state["amount_hashes"]) == detection_engine.DISTINCT_SKETCH_SIZE
+    assert accumulator._distinct_amounts() == pytest.approx(len(np.unique(amounts)) * 10, rel=0.1)
+    repeated = next(signal for signal in accumulator.result()["detection_signals"] if signal["type"] == "REPEATED_AMOUNT")
+    assert repeated["top_amounts"][0]["amount"] == 4321.0
+    # Misra-Gries undercounts by at most rows / (AMOUNT_COUNTS_MAX + 1)
+    assert 500 - 100_000 / 1001 <= repeated["top_amounts"][0]["count"] <= 500
+
+def test_outliers_are_counted_from_the_buckets():
+    amounts = np.random.default_rng(1).lognormal(5, 1.5, 50_000)
+    std = amounts.std()
+    exact = int((np.abs(amounts - amounts.mean()) > detection_engine.OUTLIER_Z_SCORE * std).sum())
+    signals = detection_engine.detect_anomalies(pd.DataFrame({"Amount": amounts}))["detection_signals"]
+    assert signals[0]["count"] == pytest.approx(exact, abs=3)
@@ -0,0 +1,26 @@
+import asyncio
+import threading
+from routers import history
+
+def test_history_queries_run_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def page(uid, limit, cursor):
+        threads.append(threading.current_thread())
+        return {"items": [], "next_cursor": None}
+
+    def owned(doc_id, uid):
+        threads.append(threading.current_thread())
+        return {"uid": uid, "filename": "a.csv"}
+
+    monkeypatch.setattr(history, "_history_page", page)
+    monkeypatch.setattr(history, "_get_owned_upload", owned)
+    monkeypatch.setattr(history.report_store, "hydrate", lambda data: data)
+
+    async def run():
+        await history.get_history(limit=5, cursor=None, token={"uid": "u1"})
+        return await history.get_history_item("doc1", token={"uid": "u1"})
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert threads and all(thread is not threading.main_thread() for thread in threads)
@@ -0,0 +1,65 @@
+import datetime
+import json
+import os
+import firebase_admin.firestore
+from routers import export, history
+
+INDEXES = os.path.join(os.path.dirname(__file__), "..", "..", "firestore.indexes.json")
+
+class _Query:
+    """
+    Records the shape of a Firestore query: equality fields, then the field
+    it is ordered (or ranged) on and in which direction.
+    """
+    def __init__(self, log: list, collection: str):
+        self.shape = {"collection": collection, "equal": [], "order": None}
+        log.append(self.shape)
+
+    def where(self, field, op, value):
+        if op == "==":
+            self.shape["equal"].append(field)
+        elif self.shape["order"] is None:
+            # A range is served in ascending order unless ordered otherwise
+            self.shape["order"] = (field, "ASCENDING")
+        return self
+
+    def order_by(self, field, direction="ASCENDING"):
+        self.shape["order"] = (field, direction)
+        return self
+
+    def select(self, fields):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def stream(self):
+        return iter([])
+
+class _Client:
+    def __init__(self, log: list):
+        self.log = log
+
+    def collection(self, name):
+        return _Query(self.log, name)
+
+def _indexed(shape: dict) -> bool:
+    with open(INDEXES) as f:
+        indexes = json.load(f)["indexes"]
+    field, direction = shape["order"]
+    wanted = [[name, "ASCENDING"] for name in shape["equal"]] + [[field, direction]]
+    return any(
+        index["collectionGroup"] == shape["collection"]
+        and [[f["fieldPath"], f["order"]] for f in index["fields"]] == wanted
+        for index in indexes
+    )
+
+def test_upload_queries_have_a_composite_index(monkeypatch):
+    log = []
+    monkeypatch.setattr(firebase_admin.firestore, "client", lambda: _Client(log))
+    history._history_page("u1", 10, None)
+    export._doc_ids_in_range("u1", datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+
+    assert len(log) == 2
+    for shape in log:
+        assert _indexed(shape), shape
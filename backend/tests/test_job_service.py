@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from services import job_service, upload_service
+from utils import uploads
+
+@pytest.fixture
+def documents(monkeypatch):
+    """
+    The uploads documents, written through a fake update_upload.
+    """
+    written = {}
+    monkeypatch.setattr(upload_service, "new_upload_id", lambda: "job1")
+    monkeypatch.setattr(upload_service, "update_upload",
+                        lambda doc_id, fields: written.setdefault(doc_id, {}).update(fields) or True)
+    monkeypatch.setattr(job_service, "_jobs", {})
+    return written
+
+def _spooled(tmp_path) -> uploads.SpooledUpload:
+    path = tmp_path / "a.csv"
+    path.write_bytes(b"Date,Amount\n2024-01-01,10\n")
+    return uploads.SpooledUpload(str(path), path.stat().st_size)
+
+def test_failed_save_fails_the_job(documents, monkeypatch, tmp_path):
+    from services import parsing_service
+
+    async def preview(*args, **kwargs):
+        return {"row_count": 1}
+
+    monkeypatch.setattr(parsing_service, "preview_file_async", preview)
+    monkeypatch.setattr(upload_service, "save_upload_metadata", lambda *args: None)
+
+    async def run():
+        job_service.start_workers()
+        try:
+            job = await job_service.submit_job("u1", "a.csv", _spooled(tmp_path))
+            await job_service._queue.join()
+            return job
+        finally:
+            await job_service.stop_workers()
+
+    job = asyncio.run(run())
+    assert job["status"] == "failed"
+    assert job["stages"]["saving"] == "failed"
+    assert job["finished_at"] is not None
+    assert documents["job1"]["status"] == "failed"
+    assert not (tmp_path / "a.csv").exists()
+
+def test_unsaved_submission_is_not_kept(documents, monkeypatch, tmp_path):
+    def unavailable(doc_id, fields):
+        raise HTTPException(status_code=503, detail="Firestore unavailable")
+
+    monkeypatch.setattr(upload_service, "update_upload", unavailable)
+
+    async def run():
+        job_service.start_workers()
+        try:
+            await job_service.submit_job("u1", "a.csv", _spooled(tmp_path))
+        finally:
+            await job_service.stop_workers()
+
+    with pytest.raises(HTTPException):
+        asyncio.run(run())
+    assert job_service.get_job("job1") is None
@@ -0,0 +1,25 @@
+import os
+import pytest
+from conftest import REAL_DATA_DIR, as_json, assert_close
+from services import analysis_engine, parsing_service
+
+def _state(content: bytes) -> dict:
+    return parsing_service.parse_and_analyze(content, "ledger.csv", streaming=False, workers=1)["analysis_state"]
+
+@pytest.mark.parametrize("name", ["clean_data_large.csv", "high_corruption_data.csv"])
+def test_merged_halves_match_the_whole_file(name):
+    with open(os.path.join(REAL_DATA_DIR, name), "rb") as f:
+        header, *rows = f.read().splitlines(keepends=True)
+    half = len(rows) // 2
+    first = _state(header + b"".join(rows[:half]))
+    second = _state(header + b"".join(rows[half:]))
+    whole = _state(header + b"".join(rows))
+
+    merged = analysis_engine.merge_states(first, second)
+    assert_close(as_json(merged), as_json(whole))
+    assert_close(as_json(analysis_engine.report_from_state(merged)), as_json(analysis_engine.report_from_state(whole)))
+
+def test_states_of_another_version_are_refused():
+    state = {"analysis_version": "0", "detection": {}}
+    with pytest.raises(ValueError):
+        analysis_engine.merge_states(state, state)
@@ -0,0 +1,128 @@
+import os
+from types import SimpleNamespace
+import pytest
+from conftest import REAL_DATA_DIR, assert_close
+from services import parsing_service, portfolio_service
+
+def _stats(name: str) -> dict:
+    with open(os.path.join(REAL_DATA_DIR, name), "rb") as f:
+        state = parsing_service.parse_and_analyze(f.read(), name, streaming=False, workers=1)["analysis_state"]
+    return portfolio_service.contribution(state)
+
+@pytest.fixture(scope="module")
+def uploads() -> list:
+    return [_stats("clean_data_large.csv"), _stats("high_corruption_data.csv")]
+
+def test_adding_then_removing_every_upload_leaves_it_empty(uploads):
+    portfolio = portfolio_service._empty("user")
+    for stats in uploads:
+        portfolio_service._combine(portfolio, stats, 1)
+    assert portfolio["uploads"] == 2
+    for stats in reversed(uploads):
+        portfolio_service._combine(portfolio, stats, -1)
+    assert portfolio == portfolio_service._empty("user")
+
+def test_removing_an_upload_leaves_the_others(uploads):
+    clean, corrupt = uploads
+    expected = portfolio_service._empty("user")
+    portfolio_service._combine(expected, clean, 1)
+
+    portfolio = portfolio_service._empty("user")
+    portfolio_service._combine(portfolio, clean, 1)
+    portfolio_service._combine(portfolio, corrupt, 1)
+    portfolio_service._combine(portfolio, corrupt, -1)
+
+    # Date bounds aren't subtracted; a portfolio whose bounds may have moved is rebuilt on read
+    bounds = ("date_min", "date_max", "stale")
+    assert portfolio["stale"] or all(portfolio[key] == expected[key] for key in bounds)
+    assert_close({k: v for k, v in portfolio.items() if k not in bounds},
+                 {k: v for k, v in expected.items() if k not in bounds})
+
+class _Snapshot:
+    def __init__(self, doc_id: str, data: dict | None):
+        self.id = doc_id
+        self.reference = SimpleNamespace(path=f"uploads/{doc_id}")
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+class _Transaction:
+    def __init__(self, log: list):
+        self.log = log
+
+    def update(self, ref, fields):
+        self.log.append(("update", ref.path))
+
+    def set(self, ref, data):
+        self.log.append(("set", ref.path, data))
+
+class _Ref:
+    def __init__(self, log: list, path: str, uploads: dict):
+        self.log, self.path, self.uploads = log, path, uploads
+
+    def document(self, doc_id):
+        return _Ref(self.log, f"{self.path}/{doc_id}", self.uploads)
+
+    def where(self, *args):
+        return self
+
+    def select(self, fields):
+        return self
+
+    def get(self, transaction=None):
+        self.log.append(("read", self.path, transaction is not None))
+        return _Snapshot(self.path, None)
+
+    def stream(self, transaction=None):
+        self.log.append(("read", self.path, transaction is not None))
+        return iter([_Snapshot(doc_id, data) for doc_id, data in self.uploads.items()])
+
+    def update(self, fields):
+        self.log.append(("update", self.path, fields))
+
+class _Client:
+    def __init__(self, log: list, uploads: dict):
+        self.log, self.uploads = log, uploads
+
+    def collection(self, name):
+        return _Ref(self.log, name, self.uploads)
+
+    def transaction(self):
+        return _Transaction(self.log)
+
+@pytest.fixture
+def fake_firestore(monkeypatch):
+    import firebase_admin.firestore
+
+    log, uploads = [], {}
+    monkeypatch.setattr(firebase_admin.firestore, "client", lambda: _Client(log, uploads))
+    monkeypatch.setattr(firebase_admin.firestore, "transactional", lambda fn: fn)
+    return log, uploads
+
+def test_rebuild_reads_and_writes_in_one_transaction(fake_firestore, uploads):
+    log, docs = fake_firestore
+    docs.update({"a": {"status": "analyzed", "portfolio_stats": uploads[0]}, "b": {"status": "pending"}})
+
+    portfolio = portfolio_service.rebuild("user")
+
+    assert portfolio["uploads"] == 1
+    # The portfolio document is read too, so saves racing the rebuild retry instead of being overwritten
+    assert log[:2] == [("read", "portfolios/user", True), ("read", "uploads", True)]
+    assert [entry[:2] for entry in log[2:]] == [("set", "portfolios/user")]
+
+def test_a_failed_clear_leaves_the_portfolio_stale(fake_firestore, monkeypatch):
+    import asyncio
+    from fastapi import HTTPException
+    from routers import history
+
+    log, _ = fake_firestore
+
+    def fail(uid):
+        raise RuntimeError("quota exceeded")
+
+    monkeypatch.setattr(history, "_delete_uploads", fail)
+    with pytest.raises(HTTPException):
+        asyncio.run(history.clear_history(token={"uid": "user"}))
+    assert log == [("update", "portfolios/user", {"stale": True})]
@@ -0,0 +1,33 @@
+import os
+import pytest
+from conftest import REAL_DATA_DIR, as_json, assert_close
+from services import parsing_service
+
+FILES = ["clean_data_large.csv", "medium_corruption_data.csv", "high_corruption_data.csv"]
+
+def _read(name: str) -> bytes:
+    with open(os.path.join(REAL_DATA_DIR, name), "rb") as f:
+        return f.read()
+
+@pytest.mark.parametrize("name", FILES)
+def test_streaming_matches_in_memory(name):
+    content = _read(name)
+    in_memory = as_json(parsing_service.parse_and_analyze(content, name, streaming=False, workers=1))
+    streamed = as_json(parsing_service.parse_and_analyze(content, name, streaming=True, workers=1))
+    assert streamed == in_memory
+
+def test_partitions_match_in_memory(monkeypatch):
+    content = _read("clean_data_large.csv")
+    monkeypatch.setattr(parsing_service, "MIN_PARTITION_BYTES", 100_000)
+    in_memory = as_json(parsing_service.parse_and_analyze(content, "a.csv", streaming=False, workers=1))
+    partitioned = as_json(parsing_service.parse_and_analyze(content, "a.csv", streaming=True, workers=3))
+    assert_close(partitioned, in_memory)
+
+def test_partitions_cut_outside_quoted_newlines():
+    content = b'a,b\n1,"x\ny"\n' * 50 + b"2,z\n" * 50
+    header_end, bounds = parsing_service._partition_bounds(content, 4)
+    parts = parsing_service._partition_csv(content, 4)
+    assert len(parts) == len(bounds) - 1 > 1
+    assert b"".join(part[header_end:] for part in parts) == content[header_end:]
+    for part in parts:
+        assert part.count(b'"') % 2 == 0
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+import tempfile
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from utils import uploads
+
+def _upload(content: bytes, max_size: int) -> SimpleNamespace:
+    # What Starlette hands FastAPI: a SpooledTemporaryFile, on disk past max_size
+    file = tempfile.SpooledTemporaryFile(max_size=max_size)
+    file.write(content)
+    file.seek(0)
+    return SimpleNamespace(file=file)
+
+def test_rolled_over_uploads_are_handed_off():
+    content = b"Date,Amount\n" + b"2024-01-01,1.5\n" * 1000
+    upload = _upload(content, max_size=1024)
+    spooled = uploads.spool(upload)
+    try:
+        # The bytes Starlette wrote are the ones parsed, not a copy
+        assert os.stat(spooled.path).st_ino == os.fstat(upload.file.fileno()).st_ino
+        assert spooled.size == len(content)
+
+        upload.file.close()
+        # Still there once Starlette closes the upload, and for worker processes
+        read = subprocess.run([sys.executable, "-c", f"import sys; sys.stdout.buffer.write(open({spooled.path!r}, 'rb').read())"],
+                              capture_output=True, check=True)
+        assert read.stdout == content
+        with uploads.open_mapped(spooled.path) as stream:
+            assert stream.read() == content
+    finally:
+        spooled.close()
+    assert spooled.fd is None
+
+def test_in_memory_uploads_are_written_out():
+    content = b"Date,Amount\n2024-01-01,1.5\n"
+    spooled = uploads.spool(_upload(content, max_size=1024 * 1024))
+    with open(spooled.path, "rb") as f:
+        assert f.read() == content
+    spooled.close()
+    assert not os.path.exists(spooled.path)
+
+@pytest.mark.parametrize("rolled", [False, True])
+def test_empty_uploads_are_refused(rolled):
+    upload = _upload(b"", max_size=1024)
+    if rolled:
+        upload.file.rollover()
+    with pytest.raises(HTTPException) as error:
+        uploads.spool(upload)
+    assert error.value.status_code == 400
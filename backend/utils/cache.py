@@ -0,0 +1,137 @@
+import os
+import threading
+import tempfile
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache of bytes values, bounded by total size.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def delete(self, key: str):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+
+class DiskCache:
+    """
+    Directory-backed cache of bytes values that survives restarts.
+    Bounded by total size; the least recently read files are evicted first.
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            # Touch so eviction sees this entry as recently used
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        # Write atomically so a concurrent reader never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(value)
+        with self._lock:
+            try:
+                self._size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+            self._size += len(value)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str):
+        with self._lock:
+            try:
+                size = os.path.getsize(self._path(key))
+                os.remove(self._path(key))
+                self._size -= size
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.startswith(".tmp-")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._size -= size
+            except FileNotFoundError:
+                pass
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional disk cache. Disk hits are promoted to memory.
+    """
+    def __init__(self, memory: LRUCache, disk: DiskCache | None = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> bytes | None:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: bytes):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except OSError as e:
+                print(f"Disk cache write failed: {e}")
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
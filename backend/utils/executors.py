@@ -0,0 +1,121 @@
+import os
+import asyncio
+import contextvars
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+from utils import timing
+
+# Number of processes used for parsing/analysis (also the number of partitions
+# a large upload is split across).
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+# Threads for blocking I/O (Gemini, Firestore) so it never runs on the event loop.
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+# Uploads analysed concurrently per server process; further uploads wait their turn.
+MAX_INFLIGHT_ANALYSES = int(os.getenv("MAX_INFLIGHT_ANALYSES", str(max(1, ANALYSIS_WORKERS))))
+
+_process_pool = None
+_io_pool = None
+_analysis_slots = asyncio.Semaphore(MAX_INFLIGHT_ANALYSES)
+_in_worker = False
+
+def _mark_worker():
+    global _in_worker
+    _in_worker = True
+
+def analysis_workers() -> int:
+    """
+    Processes available for splitting one upload. Inside a pool worker this is 1,
+    so a task never spawns a nested pool.
+    """
+    return 1 if _in_worker else ANALYSIS_WORKERS
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Returns the shared process pool, creating it on first use.
+    Workers are spawned rather than forked so they don't inherit the server's
+    threads and gRPC channels.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=ANALYSIS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_mark_worker
+        )
+    return _process_pool
+
+def get_io_pool() -> ThreadPoolExecutor:
+    """
+    Returns the shared thread pool for blocking I/O, creating it on first use.
+    """
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+    return _io_pool
+
+def analysis_slot() -> asyncio.Semaphore:
+    """
+    Async context manager bounding the number of in-flight analyses.
+    """
+    return _analysis_slots
+
+class _WorkerHTTPError(Exception):
+    """
+    Picklable stand-in for an HTTPException raised inside a worker process.
+    """
+
+def _call_in_worker(fn, args, kwargs):
+    """
+    Runs fn in a worker process. Returns its result with the stage timings
+    it recorded, which run_cpu adds to the calling request's.
+    """
+    try:
+        with timing.collect() as stages:
+            result = fn(*args, **kwargs)
+        return result, stages
+    except HTTPException as e:
+        raise _WorkerHTTPError(e.status_code, e.detail)
+
+async def run_cpu(fn, *args, **kwargs):
+    """
+    Runs a CPU-bound function on the process pool without blocking the event loop.
+    HTTPExceptions raised by the function are re-raised here.
+    """
+    global _process_pool
+    loop = asyncio.get_running_loop()
+    try:
+        result, stages = await loop.run_in_executor(get_process_pool(), _call_in_worker, fn, args, kwargs)
+        timing.add(stages)
+        return result
+    except _WorkerHTTPError as e:
+        raise HTTPException(status_code=e.args[0], detail=e.args[1])
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); start a fresh pool for the next request
+        _process_pool = None
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analysis worker crashed, please retry"
+        )
+
+async def run_io(fn, *args, **kwargs):
+    """
+    Runs a blocking I/O function on the thread pool, in a copy of the
+    caller's context (so its stage timings count towards the request).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_io_pool(), lambda: context.run(fn, *args, **kwargs))
+
+def shutdown_executors():
+    """
+    Stops the shared pools (called on application shutdown).
+    """
+    global _process_pool, _io_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+    if _io_pool is not None:
+        _io_pool.shutdown(wait=False, cancel_futures=True)
+        _io_pool = None
@@ -1,28 +1,180 @@
-import numpy as np
-import pandas as pd
+import json
+import datetime
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
 
 def make_serializable(obj):
     """
-    Recursively converts NumPy/Pandas types to native Python types for JSON/Firestore serialization.
+    Converts NumPy/Pandas types to native Python types for JSON/Firestore serialization.
+    Single pass: plain Python values are dispatched by exact type, and NumPy /
+    pandas containers are converted in bulk (tolist, vector NaN masks) rather
+    than element by element.
     """
+    converter = _CONVERTERS.get(type(obj))
+    if converter is not None:
+        return converter(obj)
+    return _convert_other(obj)
+
+def _identity(obj):
+    return obj
+
+def _convert_float(obj: float):
+    # Handle NaN - convert to None for JSON/Firestore compatibility (NaN != NaN)
+    return None if obj != obj else obj
+
+def _convert_numpy_float(obj) -> float | None:
+    return None if obj != obj else float(obj)
+
+def _convert_dict(obj: dict) -> dict:
+    converters = _CONVERTERS
+    result = {}
+    for k, v in obj.items():
+        converter = converters.get(type(v))
+        result[k if type(k) is str else str(k)] = converter(v) if converter is not None else _convert_other(v)
+    return result
+
+def _convert_list(obj) -> list:
+    converters = _CONVERTERS
+    result = []
+    for v in obj:
+        converter = converters.get(type(v))
+        result.append(converter(v) if converter is not None else _convert_other(v))
+    return result
+
+def _convert_array(arr: "np.ndarray") -> list:
+    if arr.dtype.kind == "f":
+        nan_mask = np.isnan(arr)
+        if nan_mask.any():
+            values = arr.astype(object)
+            values[nan_mask] = None
+            return values.tolist()
+        return arr.tolist()
+    if arr.dtype.kind in "iub":
+        return arr.tolist()
+    if arr.dtype.kind == "M":
+        return _convert_datetimes(pd.DatetimeIndex(arr.ravel()))
+    return _convert_list(arr.tolist())
+
+def _convert_datetimes(index: "pd.DatetimeIndex") -> list:
+    if index.hasnans:
+        return [None if pd.isna(ts) else ts.isoformat() for ts in index]
+    if (index.nanosecond == 0).all() and (index.microsecond == 0).all() and index.tz is None:
+        # Same text as Timestamp.isoformat() for whole-second values, formatted in bulk
+        return index.strftime("%Y-%m-%dT%H:%M:%S").tolist()
+    return [ts.isoformat() for ts in index]
+
+def _convert_series(series: "pd.Series") -> dict:
+    keys = [k if type(k) is str else str(k) for k in series.index.tolist()]
+    return dict(zip(keys, _convert_values(series)))
+
+def _convert_values(series: "pd.Series") -> list:
+    if isinstance(series.dtype, pd.DatetimeTZDtype) or series.dtype.kind == "M":
+        return _convert_datetimes(pd.DatetimeIndex(series))
+    if series.dtype.kind in "fiub":
+        return _convert_array(series.to_numpy())
+    return _convert_list(series.to_numpy(dtype=object, na_value=None).tolist())
+
+def _convert_dataframe(df: "pd.DataFrame") -> dict:
+    # {index: {column: value}}, the shape the analysis engine uses (orient="index")
+    columns = [c if type(c) is str else str(c) for c in df.columns]
+    column_values = [_convert_values(df[c]) for c in df.columns]
+    keys = [k if type(k) is str else str(k) for k in df.index.tolist()]
+    return {key: dict(zip(columns, row)) for key, row in zip(keys, zip(*column_values))}
+
+def _convert_other(obj):
+    if np is None:
+        _load_numpy_pandas()
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        if isinstance(value, float):
+            return _convert_float(value)
+        return make_serializable(value) if not isinstance(value, (int, bool, str)) else value
+    if isinstance(obj, pd.Timestamp):
+        return None if pd.isna(obj) else obj.isoformat()
     if isinstance(obj, dict):
-        return {str(k): make_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [make_serializable(v) for v in obj]
-    elif isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        # Handle NaN - convert to None for JSON/Firestore compatibility
-        if np.isnan(obj):
-            return None
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, np.ndarray):
-        return make_serializable(obj.tolist())
-    elif isinstance(obj, pd.Timestamp):
-        return obj.isoformat()
-    elif pd.isna(obj): # Handles pd.NA, np.nan, pd.NaT
+        return _convert_dict(obj)
+    if isinstance(obj, (list, tuple)):
+        return _convert_list(obj)
+    if isinstance(obj, np.ndarray):
+        return _convert_array(obj)
+    if isinstance(obj, pd.Series):
+        return _convert_series(obj)
+    if isinstance(obj, pd.DataFrame):
+        return _convert_dataframe(obj)
+    if obj is pd.NA or obj is pd.NaT:
         return None
-    else:
-        return obj
+    return obj
+
+# Exact-type fast paths (NumPy / pandas types are added when first seen)
+_CONVERTERS = {
+    str: _identity,
+    int: _identity,
+    bool: _identity,
+    type(None): _identity,
+    float: _convert_float,
+    dict: _convert_dict,
+    list: _convert_list,
+    tuple: _convert_list,
+}
+
+# NumPy and pandas are imported on first use, not with the app: plain
+# responses (health checks, history) never need them
+np = None
+pd = None
+
+def _load_numpy_pandas():
+    global np, pd
+    import numpy
+    import pandas
+
+    _CONVERTERS.update({
+        numpy.ndarray: _convert_array,
+        numpy.float64: _convert_numpy_float,
+        numpy.float32: _convert_numpy_float,
+        numpy.int64: int,
+        numpy.int32: int,
+        numpy.bool_: bool,
+        pandas.Timestamp: _convert_other,
+        pandas.Series: _convert_series,
+        pandas.DataFrame: _convert_dataframe,
+    })
+    np, pd = numpy, pandas
+
+def _orjson_default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        # datetime subclasses such as Firestore's DatetimeWithNanoseconds
+        return obj.isoformat()
+    value = make_serializable(obj)
+    if value is obj:
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+    return value
+
+def dumps(content) -> bytes:
+    """
+    Encodes content (NumPy/pandas values included) as compact UTF-8 JSON,
+    with orjson when installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        make_serializable(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response that encodes NumPy/pandas values directly (orjson when
+    installed). Return it from a route to skip FastAPI's jsonable_encoder pass.
+    """
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,181 @@
+import os
+import threading
+from time import perf_counter
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Set to "0" to turn stage timing off: no Server-Timing headers or metrics.
+TIMING_ENABLED = os.getenv("TIMING_ENABLED", "1") != "0"
+# Histogram bucket bounds in seconds, and how many recent durations per
+# (endpoint, stage) the p50/p95/p99 are computed over.
+TIMING_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TIMING_WINDOW = int(os.getenv("TIMING_WINDOW", "1024"))
+TIMING_QUANTILES = (0.5, 0.95, 0.99)
+
+METRIC_NAME = "finanalysis_stage_duration_seconds"
+
+# stage -> seconds, for the request (or background job) being handled
+_stages = ContextVar("timing_stages", default=None)
+_series = {}  # (endpoint, stage) -> _Series
+_series_lock = threading.Lock()
+_DONE = object()
+
+@contextmanager
+def stage(name: str):
+    """
+    Times a block as pipeline stage `name` of the current request. Repeated
+    stages (one per chunk) add up. Does nothing outside a collect() scope.
+    """
+    stages = _stages.get()
+    if stages is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + perf_counter() - start
+
+def iterate(name: str, iterable):
+    """
+    Yields from iterable, timing each step (e.g. reading the next chunk) as stage `name`.
+    """
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            item = next(iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+@contextmanager
+def collect():
+    """
+    Collects the stages timed in this context (and in threads started with
+    its copy); yields the stage -> seconds dict.
+    """
+    stages = {}
+    token = _stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _stages.reset(token)
+
+def add(stages: dict):
+    """
+    Adds stage timings measured elsewhere (a worker process) to the current request.
+    """
+    current = _stages.get()
+    if current is not None:
+        for name, seconds in stages.items():
+            current[name] = current.get(name, 0.0) + seconds
+
+def server_timing(stages: dict, total: float) -> str:
+    """
+    Server-Timing header value, durations in milliseconds.
+    """
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+class _Series:
+    __slots__ = ("buckets", "sum", "count", "recent")
+
+    def __init__(self):
+        self.buckets = [0] * len(TIMING_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=TIMING_WINDOW)
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(TIMING_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+def observe(endpoint: str, stages: dict, total: float):
+    """
+    Records one request's stage timings (and its total) in the histograms.
+    """
+    with _series_lock:
+        for name, seconds in (*stages.items(), ("total", total)):
+            series = _series.get((endpoint, name))
+            if series is None:
+                series = _series[(endpoint, name)] = _Series()
+            series.observe(seconds)
+
+def render_metrics() -> str:
+    """
+    The stage histograms in Prometheus text format, plus p50/p95/p99 over
+    the last TIMING_WINDOW requests as a summary.
+    """
+    with _series_lock:
+        snapshot = [
+            (endpoint, name, list(series.buckets), series.sum, series.count, sorted(series.recent))
+            for (endpoint, name), series in sorted(_series.items())
+        ]
+
+    histogram = [
+        f"# HELP {METRIC_NAME} Time spent per pipeline stage, by endpoint.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    summary = [
+        f"# HELP {METRIC_NAME}_recent Stage duration quantiles over the last {TIMING_WINDOW} requests.",
+        f"# TYPE {METRIC_NAME}_recent summary",
+    ]
+    for endpoint, name, buckets, total, count, recent in snapshot:
+        labels = f'endpoint="{_escape(endpoint)}",stage="{_escape(name)}"'
+        cumulative = 0
+        for bound, bucket_count in zip(TIMING_BUCKETS, buckets):
+            cumulative += bucket_count
+            histogram.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        histogram.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {count}')
+        histogram.append(f"{METRIC_NAME}_sum{{{labels}}} {total}")
+        histogram.append(f"{METRIC_NAME}_count{{{labels}}} {count}")
+
+        for quantile in TIMING_QUANTILES:
+            value = recent[min(len(recent) - 1, int(quantile * len(recent)))]
+            summary.append(f'{METRIC_NAME}_recent{{{labels},quantile="{quantile}"}} {value}')
+        summary.append(f"{METRIC_NAME}_recent_sum{{{labels}}} {sum(recent)}")
+        summary.append(f"{METRIC_NAME}_recent_count{{{labels}}} {len(recent)}")
+
+    return "\n".join(histogram + summary) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _endpoint(scope: dict) -> str:
+    # The route template, not the raw path, so ids don't multiply the series
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope['method']} {path}"
+
+class TimingMiddleware:
+    """
+    ASGI middleware that collects each request's stage timings, sends them
+    as a Server-Timing header and records them in the histograms.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TIMING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        with collect() as stages:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    total = perf_counter() - start
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(stages, total).encode("latin-1")))
+                    message = {**message, "headers": headers}
+                    observe(_endpoint(scope), stages, total)
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,210 @@
+import io
+import os
+import mmap
+import shutil
+import tempfile
+from fastapi import HTTPException, status
+
+# Largest request body accepted, enforced while the bytes arrive.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+# Uploads Starlette kept in memory (under 1 MB) are spooled to files in this
+# directory ("" uses the system temp dir); larger ones already sit on disk
+# and are handed off as they are, so concurrent large uploads hold disk
+# rather than memory.
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "")
+# Copy buffer when spooling, and read buffer of the mapped streams
+SPOOL_BUFFER_BYTES = 1024 * 1024
+
+class SpooledUpload:
+    """
+    An uploaded file saved to a temporary file. Parsers (and worker
+    processes) read it by path through a memory map; close() deletes it.
+    A handed-off upload (see spool) is named by its /proc path and kept
+    alive by `fd`, which close() closes.
+    """
+    def __init__(self, path: str, size: int, fd: int | None = None):
+        self.path = path
+        self.size = size
+        self.fd = fd
+
+    def close(self):
+        if self.fd is not None:
+            fd, self.fd = self.fd, None
+            os.close(fd)
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+def spool(upload_file) -> SpooledUpload:
+    """
+    Saves a FastAPI UploadFile where parsers can open it by path, writing
+    its bytes to disk once: an upload Starlette rolled over to disk (past
+    1 MB) is handed off, a smaller one is written out from memory.
+    Blocking: run it on the I/O pool.
+    """
+    upload = _hand_off(upload_file.file) or _copy(upload_file.file)
+    if upload.size == 0:
+        upload.close()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is empty"
+        )
+    return upload
+
+def _hand_off(source) -> SpooledUpload | None:
+    """
+    The unnamed temporary file behind a rolled-over SpooledTemporaryFile,
+    named by the /proc path of a duplicate of its descriptor, which this
+    process and the analysis workers can open. The duplicate keeps the file
+    alive after Starlette closes the upload. None for uploads still in
+    memory, or without /proc.
+    """
+    if not getattr(source, "_rolled", False):
+        return None
+    try:
+        source.flush()
+        fd = os.dup(source.fileno())
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+    path = f"/proc/{os.getpid()}/fd/{fd}"
+    if not os.path.exists(path):
+        os.close(fd)
+        return None
+    return SpooledUpload(path, os.fstat(fd).st_size, fd)
+
+def _copy(source) -> SpooledUpload:
+    """
+    Writes the upload out to a named temporary file, in constant memory.
+    """
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=UPLOAD_SPOOL_DIR or None)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            source.seek(0)
+            shutil.copyfileobj(source, out, SPOOL_BUFFER_BYTES)
+            size = out.tell()
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(path, size)
+
+def map_file(path: str) -> mmap.mmap:
+    """
+    Read-only memory map of a (non-empty) file.
+    """
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def open_mapped(path: str, ranges: list | None = None) -> io.BufferedReader:
+    """
+    Opens a file, or the given (start, end) byte ranges of it read back to
+    back, as a buffered binary stream over a memory map. Closing the
+    stream unmaps the file.
+    """
+    return io.BufferedReader(MappedReader(map_file(path), ranges), SPOOL_BUFFER_BYTES)
+
+class MappedReader(io.RawIOBase):
+    """
+    Seekable raw stream over byte ranges of a memory map, read back to back:
+    e.g. a CSV header followed by one partition. Reads copy from the mapping
+    straight into the caller's buffer; the ranges themselves are never copied.
+    """
+    def __init__(self, mapping: mmap.mmap, ranges: list | None = None):
+        self._mapping = mapping
+        self._view = memoryview(mapping)
+        self._ranges = ranges or [(0, len(mapping))]
+        self._size = sum(end - start for start, end in self._ranges)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        range_offset = 0
+        for start, end in self._ranges:
+            length = end - start
+            if self._position < range_offset + length:
+                begin = start + self._position - range_offset
+                count = min(len(buffer), end - begin)
+                buffer[:count] = self._view[begin:begin + count]
+                self._position += count
+                return count
+            range_offset += length
+        return 0
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._mapping.close()
+        super().close()
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware capping request bodies at MAX_UPLOAD_BYTES. A declared
+    Content-Length over the cap is refused before anything is read;
+    otherwise the bytes are counted as they arrive and the request fails
+    with 413 as soon as it passes the cap, before the rest is buffered.
+    """
+    def __init__(self, app, max_bytes: int | None = None):
+        self.app = app
+        self.max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside body parsing; FastAPI turns it into the response
+                    raise HTTPException(
+                        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                        detail=self._detail()
+                    )
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+    def _detail(self) -> str:
+        return f"File is too large (limit {self.max_bytes // (1024 * 1024)} MB)"
+
+    async def _reject(self, send):
+        from utils.serialization import dumps
+
+        body = dumps({"detail": self._detail()})
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_413_CONTENT_TOO_LARGE,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
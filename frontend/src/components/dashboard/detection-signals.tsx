@@ -0,0 +1,109 @@
+import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
+import {
+    Table,
+    TableBody,
+    TableCell,
+    TableHead,
+    TableHeader,
+    TableRow,
+} from "@/components/ui/table";
+import { AlertTriangle, CheckCircle2 } from "lucide-react";
+
+interface DetectionSignalsProps {
+    signals: any[];
+    transactions?: any[];
+}
+
+const SIGNAL_LABELS: Record<string, string> = {
+    OUTLIER: "Outliers",
+    REPEATED_AMOUNT: "Repeated Amounts",
+    VENDOR_CONCENTRATION: "Vendor Concentration",
+    ROUND_NUMBER_BIAS: "Round Number Bias",
+    WEEKEND_TRANSACTION: "Weekend Transactions",
+};
+
+const SEVERITY_STYLES: Record<string, string> = {
+    HIGH: "bg-red-100 text-red-700",
+    MEDIUM: "bg-yellow-100 text-yellow-700",
+    LOW: "bg-blue-100 text-blue-700",
+};
+
+export function DetectionSignals({ signals, transactions = [] }: DetectionSignalsProps) {
+    if (!signals || signals.length === 0) return null;
+
+    const formatCurrency = (amount: number) => {
+        return new Intl.NumberFormat('en-US', {
+            style: 'currency',
+            currency: 'USD', // Default to USD for MVP
+        }).format(amount);
+    };
+
+    return (
+        <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
+            <Card>
+                <CardHeader>
+                    <CardTitle className="text-base">Detection Signals</CardTitle>
+                </CardHeader>
+                <CardContent className="space-y-3 text-sm">
+                    {signals.map((signal) => (
+                        <div key={signal.type} className="flex items-center justify-between">
+                            <span className="flex items-center gap-2">
+                                {signal.severity === "NONE" ? (
+                                    <CheckCircle2 className="h-4 w-4 text-green-500" />
+                                ) : (
+                                    <AlertTriangle className="h-4 w-4 text-yellow-500" />
+                                )}
+                                {SIGNAL_LABELS[signal.type] || signal.type}
+                            </span>
+                            {signal.severity === "NONE" ? (
+                                <span className="text-xs text-muted-foreground">OK</span>
+                            ) : (
+                                <span className={`px-2 py-1 rounded text-xs font-bold ${SEVERITY_STYLES[signal.severity]}`}>
+                                    {signal.count} · {signal.severity}
+                                </span>
+                            )}
+                        </div>
+                    ))}
+                </CardContent>
+            </Card>
+
+            <Card className="md:col-span-2">
+                <CardHeader>
+                    <CardTitle className="text-base">Suspicious Transactions</CardTitle>
+                </CardHeader>
+                <CardContent>
+                    {transactions.length === 0 ? (
+                        <p className="text-sm text-muted-foreground">No transactions flagged.</p>
+                    ) : (
+                        <Table>
+                            <TableHeader>
+                                <TableRow>
+                                    <TableHead>Row</TableHead>
+                                    <TableHead>Date</TableHead>
+                                    <TableHead className="text-right">Amount</TableHead>
+                                    <TableHead>Vendor</TableHead>
+                                    <TableHead>Flags</TableHead>
+                                </TableRow>
+                            </TableHeader>
+                            <TableBody>
+                                {transactions.map((txn) => (
+                                    <TableRow key={txn.row}>
+                                        <TableCell className="text-muted-foreground">{txn.row}</TableCell>
+                                        <TableCell>{txn.date ? txn.date.slice(0, 10) : "—"}</TableCell>
+                                        <TableCell className="text-right font-medium">{formatCurrency(txn.amount)}</TableCell>
+                                        <TableCell>{txn.vendor || "—"}</TableCell>
+                                        <TableCell className="text-xs">
+                                            {txn.flags.map((flag: string) =>
+                                                flag === "OUTLIER" ? `Outlier (${Math.abs(txn.z_score)}σ)` : flag.replace(/_/g, " ").toLowerCase()
+                                            ).join(", ")}
+                                        </TableCell>
+                                    </TableRow>
+                                ))}
+                            </TableBody>
+                        </Table>
+                    )}
+                </CardContent>
+            </Card>
+        </div>
+    );
+}
@@ -5,6 +5,7 @@ import { SummaryCards } from "@/components/dashboard/summary-cards";
 import { BenfordChart } from "@/components/dashboard/benford-chart";
 import { TrendChart } from "@/components/dashboard/trend-chart";
 import { AnalysisInsights } from "@/components/dashboard/analysis-insights";
+import { DetectionSignals } from "@/components/dashboard/detection-signals";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Loader2, ArrowRight, Download } from "lucide-react";
@@ -21,34 +22,27 @@ export default function Dashboard() {
             if (!user) return;
             try {
                 const token = await user.getIdToken();
-                const analysisId = searchParams.get("id");
-
-                let url = "http://localhost:8000/api/history/";
-
-                // If ID is provided, fetch specific item. 
-                // Note: backend endpoint for specific item is /api/history/{id}
-                if (analysisId) {
-                    url = `http://localhost:8000/api/history/${analysisId}`;
+                let analysisId = searchParams.get("id");
+                const headers = { Authorization: `Bearer ${token}` };
+
+                // Without an ID, look up the latest analysis. The history list
+                // only carries summary fields, so the full report is fetched below.
+                if (!analysisId) {
+                    const listResponse = await fetch("http://localhost:8000/api/history/?limit=1", { headers });
+                    if (!listResponse.ok) {
+                        console.error("Failed to fetch data", listResponse.status);
+                        return;
+                    }
+                    const page = await listResponse.json();
+                    if (!page.items || page.items.length === 0) return;
+                    analysisId = page.items[0].id;
                 }
 
-                const response = await fetch(url, {
-                    headers: {
-                        Authorization: `Bearer ${token}`
-                    }
-                });
+                // Note: backend endpoint for specific item is /api/history/{id}
+                const response = await fetch(`http://localhost:8000/api/history/${analysisId}`, { headers });
 
                 if (response.ok) {
-                    const data = await response.json();
-
-                    if (analysisId) {
-                        // Single object returned
-                        setLatestAnalysis(data);
-                    } else {
-                        // List returned, take first
-                        if (data && data.length > 0) {
-                            setLatestAnalysis(data[0]);
-                        }
-                    }
+                    setLatestAnalysis(await response.json());
                 } else {
                     console.error("Failed to fetch data", response.status);
                 }
@@ -172,6 +166,14 @@ export default function Dashboard() {
                     </div>
                 )}
 
+                {/* Forensic Checks */}
+                {analysis_report?.detection_signals && (
+                    <DetectionSignals
+                        signals={analysis_report.detection_signals}
+                        transactions={analysis_report.suspicious_transactions}
+                    />
+                )}
+
                 <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
                     {/* Benford Chart (2 cols) */}
                     <div className="md:col-span-2">
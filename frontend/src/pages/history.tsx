@@ -21,16 +21,13 @@ interface HistoryItem {
     timestamp: string;
     row_count: number;
     status: string;
-    analysis_report?: {
-        benford_analysis?: {
-            verdict: string;
-            mad_score: number;
-        };
-        spending_summary?: {
-            total_volume: number;
-            transaction_count: number;
-        }
-    };
+    verdict?: string | null;
+    total_volume?: number | null;
+}
+
+interface HistoryResponse {
+    items: HistoryItem[];
+    next_cursor: string | null;
 }
 
 export default function HistoryPage() {
@@ -40,6 +37,40 @@ export default function HistoryPage() {
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
     const [deletingId, setDeletingId] = useState<string | null>(null);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    const fetchPage = async (cursor: string | null): Promise<HistoryResponse> => {
+        if (!user) return { items: [], next_cursor: null };
+        const token = await user.getIdToken();
+        const params = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+        const response = await fetch(`http://localhost:8000/api/history/${params}`, {
+            headers: {
+                Authorization: `Bearer ${token}`,
+            },
+        });
+
+        if (!response.ok) {
+            throw new Error("Failed to fetch history");
+        }
+
+        return response.json();
+    };
+
+    const handleLoadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await fetchPage(nextCursor);
+            setHistory(prev => [...prev, ...page.items]);
+            setNextCursor(page.next_cursor);
+        } catch (err) {
+            alert("Failed to load more history.");
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
     const handleDelete = async (id: string, e: React.MouseEvent) => {
         e.stopPropagation(); // Prevent row click
@@ -85,6 +116,7 @@ export default function HistoryPage() {
             if (!response.ok) throw new Error("Failed to clear history");
 
             setHistory([]);
+            setNextCursor(null);
         } catch (err) {
             alert("Failed to clear history.");
             console.error(err);
@@ -95,19 +127,9 @@ export default function HistoryPage() {
         const fetchHistory = async () => {
             if (!user) return;
             try {
-                const token = await user.getIdToken();
-                const response = await fetch("http://localhost:8000/api/history/", {
-                    headers: {
-                        Authorization: `Bearer ${token}`,
-                    },
-                });
-
-                if (!response.ok) {
-                    throw new Error("Failed to fetch history");
-                }
-
-                const data = await response.json();
-                setHistory(data);
+                const page = await fetchPage(null);
+                setHistory(page.items);
+                setNextCursor(page.next_cursor);
             } catch (err) {
                 console.error(err);
                 setError("Could not load history. Please try again.");
@@ -188,28 +210,28 @@ export default function HistoryPage() {
                                         <TableCell>{item.filename}</TableCell>
                                         <TableCell>{item.row_count}</TableCell>
                                         <TableCell>
-                                            {item.analysis_report?.spending_summary?.total_volume
-                                                ? new Intl.NumberFormat('en-US', { style: 'currency', currency: 'USD' }).format(item.analysis_report.spending_summary.total_volume)
+                                            {item.total_volume
+                                                ? new Intl.NumberFormat('en-US', { style: 'currency', currency: 'USD' }).format(item.total_volume)
                                                 : "-"
                                             }
                                         </TableCell>
                                         <TableCell>
-                                            {item.analysis_report?.benford_analysis ? (
+                                            {item.verdict ? (
                                                 <Badge
                                                     variant={
-                                                        item.analysis_report.benford_analysis.verdict === "Pass"
+                                                        item.verdict === "Pass"
                                                             ? "default" // shadcn default is black, maybe outline or custom class better?
-                                                            : item.analysis_report.benford_analysis.verdict === "Fail"
+                                                            : item.verdict === "Fail"
                                                                 ? "destructive"
                                                                 : "secondary"
                                                     }
                                                     className={
-                                                        item.analysis_report.benford_analysis.verdict === "Pass" ? "bg-green-100 text-green-700 hover:bg-green-100" :
-                                                            item.analysis_report.benford_analysis.verdict === "Fail" ? "bg-red-100 text-red-700 hover:bg-red-100" :
+                                                        item.verdict === "Pass" ? "bg-green-100 text-green-700 hover:bg-green-100" :
+                                                            item.verdict === "Fail" ? "bg-red-100 text-red-700 hover:bg-red-100" :
                                                                 "bg-yellow-100 text-yellow-700 hover:bg-yellow-100"
                                                     }
                                                 >
-                                                    {item.analysis_report.benford_analysis.verdict.toUpperCase()}
+                                                    {item.verdict.toUpperCase()}
                                                 </Badge>
                                             ) : (
                                                 <span className="text-muted-foreground text-xs">-</span>
@@ -232,6 +254,14 @@ export default function HistoryPage() {
                             </TableBody>
                         </Table>
                     )}
+                    {nextCursor && (
+                        <div className="flex justify-center pt-4">
+                            <Button variant="outline" size="sm" onClick={handleLoadMore} disabled={loadingMore}>
+                                {loadingMore && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}
+                                Load more
+                            </Button>
+                        </div>
+                    )}
                 </CardContent>
             </Card>
         </div>
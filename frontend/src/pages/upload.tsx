@@ -27,7 +27,7 @@ export default function UploadPage() {
         if (fileRejections.length > 0) {
             const rejection = fileRejections[0];
             if (rejection.errors[0].code === "file-invalid-type") {
-                setError("Invalid file type. Please upload a CSV or Excel file.");
+                setError("Invalid file type. Please upload a CSV, Excel, Parquet or Feather file.");
             } else if (rejection.errors[0].code === "file-too-large") {
                 setError("File is too large. Max size is 50MB.");
             } else {
@@ -46,7 +46,9 @@ export default function UploadPage() {
         accept: {
             'text/csv': ['.csv'],
             'application/vnd.ms-excel': ['.xls'],
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': ['.xlsx']
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': ['.xlsx'],
+            'application/vnd.apache.parquet': ['.parquet'],
+            'application/vnd.apache.arrow.file': ['.feather']
         },
         maxSize: 50 * 1024 * 1024, // 50MB
         maxFiles: 1,
@@ -191,7 +193,7 @@ export default function UploadPage() {
                                             {isDragActive ? "Drop the file here" : "Click to upload or drag and drop"}
                                         </h3>
                                         <p className="text-sm text-muted-foreground mb-4">
-                                            CSV or Excel files (max 50MB)
+                                            CSV, Excel, Parquet or Feather files (max 50MB)
                                         </p>
                                         {error && (
                                             <div className="flex items-center gap-2 text-destructive text-sm font-medium mt-2 justify-center">